@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Fixtures generating synthetic nbextensions trees for the benchmarks."""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals,
+)
+
+import io
+import os
+
+import pytest
+import yaml
+
+# numbers of yaml descriptors in the generated trees
+TREE_SIZES = (10, 100, 1000, 10000)
+
+
+def make_spec(require, **kwargs):
+    """Return a valid nbextension spec, resembling a real-world one."""
+    spec = {
+        'Type': 'Jupyter Notebook Extension',
+        'Main': require.rsplit('/', 1)[-1] + '.js',
+        'Name': require.replace('/', ' '),
+        'Description': 'A synthetic nbextension, ' * 8,
+        'Link': 'README.md',
+        'Icon': 'icon.png',
+        'Compatibility': '4.x, 5.x, 6.x',
+        'Parameters': [
+            {
+                'name': '{}.param_{}'.format(require, ii),
+                'description': 'A synthetic parameter',
+                'input_type': 'number',
+                'default': ii,
+            } for ii in range(5)
+        ],
+    }
+    spec.update(kwargs)
+    return spec
+
+
+def make_nbextensions_tree(root_dir, num_descriptors):
+    """
+    Populate root_dir with a synthetic nbextensions tree.
+
+    Descriptors are spread across nesting depths of up to 5 directories.
+    Every 50th nbextension directory also gets a symlink to it from the top
+    of the tree (where symlinks are supported), and a mathjax directory holds
+    descriptors which should be excluded from discovery.
+    """
+    for ii in range(num_descriptors):
+        reldir = os.path.join(*(
+            ['group{}'.format(ii % 7)] +
+            ['level{}'.format(jj) for jj in range(ii % 5)] +
+            ['nbext{}'.format(ii)]))
+        nbext_dir = os.path.join(root_dir, reldir)
+        os.makedirs(nbext_dir)
+        require = '/'.join(reldir.split(os.sep) + ['main'])
+        with io.open(os.path.join(nbext_dir, 'nbext.yaml'), 'w') as f:
+            yaml.safe_dump(make_spec(require), f, default_flow_style=False)
+        # a non-descriptor file, as the walk has to skip these
+        with io.open(os.path.join(nbext_dir, 'main.js'), 'w') as f:
+            f.write('define([], function () {});\n')
+        if ii % 50 == 0 and hasattr(os, 'symlink'):
+            try:
+                os.symlink(nbext_dir, os.path.join(
+                    root_dir, 'linked{}'.format(ii)))
+            except OSError:
+                pass  # e.g. unprivileged on Windows
+    mathjax_dir = os.path.join(root_dir, 'mathjax', 'extensions')
+    os.makedirs(mathjax_dir)
+    for ii in range(max(1, num_descriptors // 10)):
+        with io.open(os.path.join(
+                mathjax_dir, 'excluded{}.yaml'.format(ii)), 'w') as f:
+            yaml.safe_dump(make_spec('mathjax/excluded'), f)
+
+
+@pytest.fixture(scope='session', params=TREE_SIZES,
+                ids=lambda size: '{}_descriptors'.format(size))
+def nbextensions_tree(request, tmp_path_factory):
+    """Path of a synthetic nbextensions tree, shared between benchmarks."""
+    root_dir = str(tmp_path_factory.mktemp('nbextensions'))
+    make_nbextensions_tree(root_dir, request.param)
+    return root_dir
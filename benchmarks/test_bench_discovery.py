@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks for nbextension yaml descriptor discovery."""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals,
+)
+
+import os
+
+import yaml
+
+from jupyter_nbextensions_configurator import (
+    _process_nbextension_spec, get_configurable_nbextensions,
+)
+
+
+def test_discovery_unindexed(benchmark, nbextensions_tree):
+    """Discovery without any descriptor index, parsing every file."""
+    nbexts = benchmark.pedantic(
+        get_configurable_nbextensions, args=([nbextensions_tree],),
+        rounds=3, iterations=1)
+    assert nbexts
+
+
+def test_discovery_cold(benchmark, nbextensions_tree, tmp_path):
+    """Discovery building a descriptor index from scratch."""
+    index_path = str(tmp_path / 'index.json')
+
+    def setup():
+        if os.path.exists(index_path):
+            os.remove(index_path)
+
+    nbexts = benchmark.pedantic(
+        get_configurable_nbextensions, args=([nbextensions_tree],),
+        kwargs={'index_path': index_path}, setup=setup,
+        rounds=3, iterations=1)
+    assert nbexts
+
+
+def test_discovery_warm(benchmark, nbextensions_tree, tmp_path):
+    """Discovery using an up-to-date descriptor index."""
+    index_path = str(tmp_path / 'index.json')
+    get_configurable_nbextensions([nbextensions_tree], index_path=index_path)
+    nbexts = benchmark(
+        get_configurable_nbextensions, [nbextensions_tree],
+        index_path=index_path)
+    assert nbexts
+
+
+def test_process_nbextension_spec(benchmark, nbextensions_tree):
+    """Throughput of sanity-checking and preprocessing loaded specs."""
+    specs = []
+    for direct, dirs, files in os.walk(nbextensions_tree):
+        for filename in files:
+            if filename.endswith('.yaml'):
+                with open(os.path.join(direct, filename)) as f:
+                    specs.append(yaml.safe_load(f))
+
+    def process_all():
+        return [_process_nbextension_spec(dict(spec), 'group0/level0')
+                for spec in specs]
+
+    processed = benchmark(process_all)
+    assert all(isinstance(spec, dict) for spec in processed)
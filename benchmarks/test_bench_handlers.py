@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks for the nbextensions list endpoint, served by a local server."""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals,
+)
+
+import asyncio
+import os
+
+import pytest
+from jupyter_server.serverapp import ServerApp
+from tornado.httpclient import AsyncHTTPClient
+
+# numbers of simultaneous requests
+CONCURRENCY = (1, 16, 64)
+
+
+@pytest.fixture(scope='module')
+def serverapp(tmp_path_factory):
+    """A jupyter server with the configurator loaded, in this thread."""
+    tmp_dir = tmp_path_factory.mktemp('jupyter')
+    env = {
+        'JUPYTER_CONFIG_DIR': str(tmp_dir / 'config'),
+        'JUPYTER_DATA_DIR': str(tmp_dir / 'data'),
+        'JUPYTER_RUNTIME_DIR': str(tmp_dir / 'runtime'),
+    }
+    old_env = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    app = ServerApp()
+    app.initialize(argv=[
+        '--port=0', '--ServerApp.open_browser=False',
+        '--IdentityProvider.token=', '--ServerApp.log_level=WARN',
+        '--ServerApp.root_dir={}'.format(tmp_dir),
+        '--ServerApp.jpserver_extensions',
+        'jupyter_nbextensions_configurator=True',
+    ], new_httpserver=True)
+    yield app
+    app.http_server.stop()
+    for key, val in old_env.items():
+        if val is None:
+            os.environ.pop(key, None)
+        else:
+            os.environ[key] = val
+
+
+@pytest.mark.parametrize('cached', [True, False], ids=['cached', 'uncached'])
+@pytest.mark.parametrize('concurrency', CONCURRENCY,
+                         ids=lambda num: '{}_clients'.format(num))
+def test_list_handler(benchmark, serverapp, nbextensions_tree,
+                      concurrency, cached):
+    """End-to-end latency of simultaneous requests for the list."""
+    serverapp.web_app.settings['nbextensions_path'] = [nbextensions_tree]
+    nbext_index = serverapp.web_app.settings['nbextensions_configurator_index']
+    nbext_index.cache_ttl = 60 if cached else 0
+    nbext_index.invalidate()
+    url = (serverapp.connection_url +
+           'nbextensions/nbextensions_configurator/list')
+    client = AsyncHTTPClient(max_clients=max(CONCURRENCY))
+    loop = asyncio.get_event_loop()
+
+    def fetch_all():
+        return loop.run_until_complete(asyncio.gather(*[
+            client.fetch(url) for ii in range(concurrency)]))
+
+    responses = benchmark(fetch_all)
+    assert all(response.code == 200 for response in responses)
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks for walking nbextensions trees to find yaml descriptors."""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals,
+)
+
+import os
+
+import pytest
+
+from jupyter_nbextensions_configurator import _walk_nbextension_dir
+
+
+def walk_with_os_walk(root_dir, exclude_dirs=('mathjax',)):
+    """
+    Yield (root_dir, relpath, stat) tuples for yaml files, using os.walk.
+
+    This is how descriptors were found before _walk_nbextension_dir, and is
+    kept as a baseline for comparison.
+    """
+    for direct, dirs, files in os.walk(root_dir, followlinks=True):
+        # filter to exclude directories
+        dirs[:] = [d for d in dirs if d not in exclude_dirs]
+        for filename in files:
+            if os.path.splitext(filename)[1] in ['.yml', '.yaml']:
+                yaml_path = os.path.join(direct, filename)
+                yield (root_dir, os.path.relpath(yaml_path, root_dir),
+                       os.stat(yaml_path))
+
+
+def walk_with_scandir(root_dir):
+    return _walk_nbextension_dir(root_dir, {}, follow_symlinks='all')
+
+
+@pytest.mark.parametrize('walker', [walk_with_os_walk, walk_with_scandir],
+                         ids=['os_walk', 'scandir'])
+def test_walk(benchmark, nbextensions_tree, walker):
+    """Time to find and stat every descriptor file in a tree."""
+    found = benchmark(lambda: list(walker(nbextensions_tree)))
+    assert found
+    assert sorted(relpath for root, relpath, stat in found) == sorted(
+        relpath for root, relpath, stat in walk_with_os_walk(
+            nbextensions_tree))
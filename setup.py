@@ -62,6 +62,13 @@ options.
             'traitlets',
         ],
         extras_require={
+            'render': [
+                'bleach',
+                'mistune >=2',
+            ],
+            'watch': [
+                'watchdog',
+            ],
             'test': [
                 'jupyter_contrib_core[testing_utils]',
                 'nose',
@@ -6,38 +6,107 @@
 
 from __future__ import unicode_literals
 
+import atexit
+import base64
+import email.utils
+import fnmatch
+import functools
+import hashlib
 import io
 import json
 import logging
+import mimetypes
 import os.path
 import posixpath
 import re
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-import yaml
-from jupyter_server.base.handlers import APIHandler, JupyterHandler
+import jupyter_core.paths
+from jupyter_core.paths import jupyter_runtime_dir
+from jupyter_server.base.handlers import (
+    APIHandler, FileFindHandler, JupyterHandler,
+)
 from jupyter_server.utils import url_path_join as ujoin
-from jupyter_server.utils import path2url
-from notebook._version import version_info as nb_version_info
-from tornado import web
+from jupyter_server.utils import path2url, url_escape
+from tornado import httputil, web
+from tornado.ioloop import IOLoop, PeriodicCallback
+from traitlets import Bool, Enum, Float, Integer, List, Unicode, default
+from traitlets.config import LoggingConfigurable
 
-# attempt to use LibYaml if available
 try:
-    from yaml import CSafeLoader as SafeLoader
+    from jupyter_server.auth.decorator import authorized
 except ImportError:
-    from yaml import SafeLoader
-
-if nb_version_info < (5, 2, 0):
-    from notebook.base.handlers import json_errors
-else:
-    # for notebook >= 5.2.0, instead of using json_errors, we must subclass
-    # APIHandler. Since we already do this, just do nothing extra
-    def json_errors(method):
+    # jupyter_server < 2 has no authorization layer
+    def authorized(method):
         return method
 
 __version__ = '0.6.3'
 
+# yaml & notebook are only imported once needed, to keep importing this
+# module cheap for servers which only look up the extension's paths
+_yaml = None
+_notebook_json_errors = None
+
 absolute_url_re = re.compile(r'^(f|ht)tps?://')
 
+# urls in rendered markdown which aren't relative to the document
+link_absolute_url_re = re.compile(r'^#|mailto:|(f|ht)tps?://')
+image_absolute_url_re = re.compile(r'^data:|(f|ht)tps?://')
+
+# markdown containing any of these may contain math, which browsers protect
+# from the markdown renderer using notebook's mathjaxutils, so render it there
+markdown_math_re = re.compile(r'\$|\\begin\{|\\\\[(\[]')
+
+# html allowed in server-rendered markdown, in addition to bleach's defaults
+markdown_allowed_tags = {
+    'del', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'img', 'p',
+    'pre', 'span', 'sup', 'table', 'tbody', 'td', 'th', 'thead', 'tr',
+}
+markdown_allowed_attributes = {
+    '*': ['class', 'id'],
+    'a': ['href', 'title', 'target'],
+    'img': ['src', 'alt', 'title'],
+    'td': ['align'],
+    'th': ['align'],
+}
+
+# frontend config sections the configurator reads & writes
+CONFIG_SECTIONS = ('notebook', 'edit', 'tree', 'common')
+config_section_re = re.compile(r'^\w+$')
+
+# glob patterns for the names of yaml descriptor files
+DESCRIPTOR_FILE_PATTERNS = ('*.yaml', '*.yml')
+
+# file name of the descriptor index, in a runtime or data directory
+INDEX_FILENAME = 'nbextensions_configurator_index.json'
+
+# directory listings taken less than this many seconds after the directory's
+# mtime aren't trusted by later scans, since entries added within the same
+# mtime tick (a second or two, on NFS or FAT) don't change the mtime
+RACY_MTIME_WINDOW = 2
+
+# spec fields included in the list's summary mode
+SUMMARY_FIELDS = ('require', 'Name', 'Section', 'Compatibility')
+
+# spec fields holding urls of files to add content hashes for, and the keys
+# the hashes are added under
+ASSET_HASH_FIELDS = (('readme', 'readme_hash'), ('icon', 'icon_hash'))
+# cache lifetime for responses whose url includes a content hash
+ASSET_CACHE_MAX_AGE = 365 * 24 * 60 * 60
+# icons larger than this many bytes are left out of the icon bundle
+ICON_BUNDLE_MAX_SIZE = 64 * 1024
+
+# spec fields searched by the configurator page's filter, and the characters
+# separating words in them: whitespace & ascii punctuation, except _
+# (main.js splits words typed into the filter using the same pattern)
+SEARCH_FIELDS = ('Name', 'Description', 'tags', 'Section', 'Compatibility')
+search_split_re = re.compile(r'[\s!-/:-@\[-^`{-~]+')
+
 
 def _process_nbextension_spec(spec, relative_url_base=''):
     """
@@ -82,19 +151,601 @@ def _process_nbextension_spec(spec, relative_url_base=''):
     return spec
 
 
+def _build_search_index(extension_list):
+    """
+    Return an inverted index of an nbextensions list, for the page's filter.
+
+    That's a dict with keys
+      - words: maps each lowercase word in any of the SEARCH_FIELDS to the
+        positions in extension_list of the nbextensions containing it
+      - sections: maps each Section value to positions, likewise
+      - tags: maps each tag to positions, likewise
+    """
+    words, sections, tags = {}, {}, {}
+    for position, extension in enumerate(extension_list):
+        ext_tags = extension.get('tags') or []
+        if not isinstance(ext_tags, list):
+            ext_tags = [ext_tags]
+        ext_tags = [str(tag) for tag in ext_tags]
+        for tag in set(ext_tags):
+            tags.setdefault(tag, []).append(position)
+        sections.setdefault(
+            str(extension.get('Section', '')), []).append(position)
+        text = ' '.join(
+            ' '.join(ext_tags) if field == 'tags'
+            else str(extension.get(field, ''))
+            for field in SEARCH_FIELDS)
+        for word in set(search_split_re.split(text.lower())):
+            if word:
+                words.setdefault(word, []).append(position)
+    return {'words': words, 'sections': sections, 'tags': tags}
+
+
+def _get_yaml():
+    """Return the yaml module and its fastest safe loader class."""
+    global _yaml
+    if _yaml is None:
+        import yaml
+        # attempt to use LibYaml if available
+        try:
+            from yaml import CSafeLoader as SafeLoader
+        except ImportError:
+            from yaml import SafeLoader
+        _yaml = (yaml, SafeLoader)
+    return _yaml
+
+
+def _get_notebook_json_errors():
+    """Return notebook's json_errors decorator, or None if not needed."""
+    global _notebook_json_errors
+    if _notebook_json_errors is None:
+        try:
+            from notebook._version import version_info as nb_version_info
+        except ImportError:
+            nb_version_info = None
+        if nb_version_info is not None and nb_version_info < (5, 2, 0):
+            from notebook.base.handlers import json_errors
+            _notebook_json_errors = json_errors
+        else:
+            # for notebook >= 5.2.0, instead of using json_errors, we must
+            # subclass APIHandler. Since we already do this, do nothing extra
+            _notebook_json_errors = False
+    return _notebook_json_errors or None
+
+
+def json_errors(method):
+    """
+    Decorate a handler method with notebook's json_errors, if necessary.
+
+    The notebook version is only checked once the method is first called.
+    """
+    decorated = []
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not decorated:
+            notebook_json_errors = _get_notebook_json_errors()
+            decorated.append(
+                notebook_json_errors(method) if notebook_json_errors
+                else method)
+        return decorated[0](self, *args, **kwargs)
+    return wrapper
+
+
+def _encode_json(obj):
+    """Encode obj as compact json with a stable key order, as utf-8 bytes."""
+    return json.dumps(
+        obj, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+
+def _new_nbextension_index():
+    """Return an empty descriptor index."""
+    return {'version': __version__, 'roots': {}}
+
+
+def _load_nbextension_index(index_path, log=None):
+    """
+    Load a descriptor index previously saved by _save_nbextension_index.
+
+    Returns an empty index if the file is missing, can't be parsed, or was
+    written by a different version of this package (since the processed
+    specs it contains may then be out of date).
+    """
+    try:
+        with io.open(index_path, 'r', encoding='utf-8') as stream:
+            index = json.load(stream)
+    except (IOError, OSError, ValueError):
+        return _new_nbextension_index()
+    if not isinstance(index, dict) or index.get('version') != __version__:
+        if log:
+            log.debug('Ignoring out of date descriptor index {}'.format(
+                index_path))
+        return _new_nbextension_index()
+    index.setdefault('roots', {})
+    return index
+
+
+def _save_nbextension_index(index_path, index, log=None):
+    """Atomically write a descriptor index to index_path, returning success."""
+    tmp_path = None
+    try:
+        index_dir = os.path.dirname(os.path.abspath(index_path))
+        if not os.path.isdir(index_dir):
+            os.makedirs(index_dir)
+        # unique temporary file, as several threads or processes may save
+        tmp_fd, tmp_path = tempfile.mkstemp(
+            dir=index_dir, prefix=os.path.basename(index_path),
+            suffix='.tmp')
+        with io.open(tmp_fd, 'w', encoding='utf-8') as stream:
+            stream.write(json.dumps(index))
+        os.replace(tmp_path, index_path)
+    except (IOError, OSError, TypeError, ValueError) as err:
+        if log:
+            log.warning('Failed to save descriptor index {}: {}'.format(
+                index_path, err))
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    return True
+
+
+def _without_roots(index, roots):
+    """Return a shallow copy of index, without the given root directories."""
+    if not roots:
+        return index
+    return dict(index, roots={
+        root: root_index for root, root_index in index['roots'].items()
+        if root not in roots})
+
+
+def _shared_nbextension_dirs():
+    """Return the system-wide & sys.prefix nbextensions directories."""
+    return [os.path.join(path, 'nbextensions')
+            for path in (jupyter_core.paths.ENV_JUPYTER_PATH +
+                         jupyter_core.paths.SYSTEM_JUPYTER_PATH)]
+
+
+def build_shared_nbextension_index(
+        index_path=None, nbextension_dirs=None, exclude_dirs=('mathjax',),
+        log=None, include_files=DESCRIPTOR_FILE_PATTERNS, max_depth=None,
+        follow_symlinks='unique'):
+    """
+    Write a descriptor index for nbextensions directories shared by users.
+
+    Single-user servers configured with NBExtensionIndex.shared_index_path
+    load this index, rather than each scanning the same directories. It
+    should be rebuilt after installing or upgrading shared nbextensions, as
+    `jupyter nbextensions_configurator index build` does.
+
+    By default, indexes the sys.prefix & system-wide nbextensions
+    directories, writing the index into the sys.prefix jupyter data
+    directory. Returns the path written to, or None if writing failed.
+    The remaining arguments are as for get_configurable_nbextensions.
+    """
+    if index_path is None:
+        index_path = os.path.join(
+            jupyter_core.paths.ENV_JUPYTER_PATH[0], INDEX_FILENAME)
+    if nbextension_dirs is None:
+        nbextension_dirs = _shared_nbextension_dirs()
+    index = _new_nbextension_index()
+    for root_nbext_dir in nbextension_dirs:
+        if log:
+            log.info('Indexing nbextension yaml descriptor files in {}'.format(
+                root_nbext_dir))
+        index['roots'][root_nbext_dir] = _index_nbextension_dir(
+            root_nbext_dir, exclude_dirs=exclude_dirs, log=log,
+            include_files=include_files, max_depth=max_depth,
+            follow_symlinks=follow_symlinks)
+    if _save_nbextension_index(index_path, index, log=log):
+        return index_path
+
+
+def _parse_nbextension_yaml(yaml_path, relative_url_base=''):
+    """
+    Load and process a single yaml descriptor file.
+
+    Returns a tuple of (spec, warning), where spec is the processed spec, or
+    None if the file didn't describe a valid nbextension, and warning is a
+    message to log about the file, or None.
+    This is a module-level function which doesn't log, so that it can be
+    run in worker threads or processes.
+    """
+    yaml, SafeLoader = _get_yaml()
+    try:
+        # as bytes, leaving yaml to detect the encoding, which is faster
+        with open(yaml_path, 'rb') as stream:
+            extension = yaml.load(stream, Loader=SafeLoader)
+    except (IOError, OSError):
+        return None, 'Failed to read yaml file'
+    except yaml.YAMLError:
+        return None, 'Failed to load yaml file'
+    extension = _process_nbextension_spec(
+        extension, relative_url_base=relative_url_base)
+    if isinstance(extension, dict):
+        return extension, None
+    return None, None
+
+
+def _name_matcher(patterns):
+    """Return a function testing whether a name matches any glob pattern."""
+    if not patterns:
+        return lambda name: False
+    regex = re.compile('|'.join(
+        '(?:{})'.format(fnmatch.translate(pattern)) for pattern in patterns))
+    return regex.match
+
+
+def _dir_matches(reldir, patterns):
+    """
+    Return whether a directory matches any of the given glob patterns.
+
+    Patterns are matched against both the directory's name, and its path
+    relative to the nbextensions directory, using / as the separator.
+    patterns may also be a function returned by _name_matcher.
+    """
+    matches = patterns if callable(patterns) else _name_matcher(patterns)
+    name = reldir.rsplit(os.sep, 1)[-1]
+    return bool(matches(name) or (
+        name != reldir and matches(reldir.replace(os.sep, '/'))))
+
+
+def _in_scan_scope(yaml_relpath, exclude_dirs=('mathjax',),
+                   include_files=DESCRIPTOR_FILE_PATTERNS, max_depth=None):
+    """
+    Return whether a scan would consider the descriptor at yaml_relpath.
+
+    That is, whether its name matches include_files, it's at most
+    max_depth directories deep, and none of its directories are excluded.
+    """
+    parts = yaml_relpath.split(os.sep)
+    if max_depth is not None and len(parts) - 1 > max_depth:
+        return False
+    if not _name_matcher(include_files)(parts[-1]):
+        return False
+    is_excluded = _name_matcher(exclude_dirs)
+    return not any(_dir_matches(os.sep.join(parts[:ii]), is_excluded)
+                   for ii in range(1, len(parts)))
+
+
+def _walk_nbextension_dir(
+        root_dir, dirs, old_dirs=None, trust_unchanged_dirs=False,
+        exclude_dirs=('mathjax',), include_files=DESCRIPTOR_FILE_PATTERNS,
+        max_depth=None, follow_symlinks='unique', log=None):
+    """
+    Yield (root_dir, yaml_relpath, stat) for yaml files under root_dir.
+
+    Files are yielded in walk order, that is depth-first, with each
+    directory's files (in name order) before its subdirectories' (also in
+    name order). The scope of the walk is as described for
+    _index_nbextension_dir.
+
+    The listing of each directory walked is stored in the dirs dict, keyed
+    by its path relative to root_dir, recording its mtime, id, and the names
+    of its subdirectories, symlinked subdirectories, and yaml files.
+    Listings in old_dirs are reused for directories whose mtime and id
+    haven't changed, except that a listing taken within RACY_MTIME_WINDOW
+    of its directory's mtime records a None mtime, so is never reused (like
+    git's racy index entries). Otherwise, directories are listed using
+    os.scandir, so that file types come from the directory entries, and yaml
+    files are picked out by name before any other work is done for them.
+    stat is the os.stat_result for the file, or None for files in unchanged
+    directories, if trust_unchanged_dirs is True.
+    """
+    old_dirs = old_dirs or {}
+    is_yaml = _name_matcher(include_files)
+    is_excluded = _name_matcher(exclude_dirs)
+    visited = set()
+    num_cycles = num_repeats = 0
+    # depth-first, top-down traversal, like os.walk, with the ids of each
+    # directory's ancestors, to tell symlink cycles from other repeats
+    to_visit = [('', 0, ())]
+    while to_visit:
+        reldir, depth, ancestor_ids = to_visit.pop()
+        direct = root_dir + os.sep + reldir if reldir else root_dir
+        try:
+            dir_stat = os.stat(direct)
+        except OSError:
+            continue
+        dir_id = (dir_stat.st_dev, dir_stat.st_ino)
+        if follow_symlinks == 'unique':
+            if dir_id in ancestor_ids:
+                num_cycles += 1
+                if log:
+                    log.debug('Skipping symlink cycle at {}'.format(direct))
+                continue
+            elif dir_id in visited:
+                num_repeats += 1
+                continue
+            visited.add(dir_id)
+            ancestor_ids += (dir_id,)
+        listing = old_dirs.get(reldir)
+        trusted = trust_unchanged_dirs
+        if listing is not None and listing.get('id') != list(dir_id):
+            # a different directory (e.g. a retargeted symlink), which may
+            # have the same mtime as the one listed
+            listing = None
+        file_stats = {}
+        if listing is None or listing['mtime'] != dir_stat.st_mtime:
+            trusted = False
+            listing = {'mtime': dir_stat.st_mtime, 'id': list(dir_id),
+                       'dirs': [], 'links': [], 'files': []}
+            try:
+                with os.scandir(direct) as entries:
+                    for entry in entries:
+                        name = entry.name
+                        try:
+                            if entry.is_dir():
+                                listing['dirs'].append(name)
+                                if entry.is_symlink():
+                                    listing['links'].append(name)
+                            elif is_yaml(name):
+                                file_stats[name] = entry.stat()
+                                listing['files'].append(name)
+                        except OSError:
+                            continue
+            except OSError:
+                pass
+            for key in ('dirs', 'links', 'files'):
+                listing[key].sort()
+            if time.time() - dir_stat.st_mtime < RACY_MTIME_WINDOW:
+                listing['mtime'] = None
+        dirs[reldir] = listing
+        prefix = reldir + os.sep if reldir else ''
+        for filename in listing['files']:
+            stat = file_stats.get(filename)
+            if stat is None and not trusted:
+                try:
+                    stat = os.stat(os.path.join(direct, filename))
+                except OSError:
+                    continue
+            yield root_dir, prefix + filename, stat
+        if max_depth is not None and depth >= max_depth:
+            continue
+        # filter to exclude directories
+        links = listing['links'] if follow_symlinks == 'none' else ()
+        to_visit.extend(
+            (prefix + d, depth + 1, ancestor_ids)
+            for d in reversed(listing['dirs'])
+            if d not in links and not _dir_matches(prefix + d, is_excluded))
+    if log and (num_cycles or num_repeats):
+        log.debug('Skipped {} symlink cycles and {} directories already '
+                  'scanned in {}'.format(num_cycles, num_repeats, root_dir))
+
+
+def _index_nbextension_dir(
+        root_dir, exclude_dirs=('mathjax',), root_index=None, log=None,
+        executor=None, trust_unchanged_dirs=False,
+        include_files=DESCRIPTOR_FILE_PATTERNS, max_depth=None,
+        follow_symlinks='unique'):
+    """
+    Return an up-to-date descriptor index for a single nbextensions directory.
+
+    root_index should be a previous result of this function for the same
+    directory, or None.
+    Directories whose mtime hasn't changed reuse their cached listing rather
+    than being listed again (unless it was listed too soon after its mtime
+    to be sure of that), and yaml files whose mtime and size haven't
+    changed reuse their cached spec rather than being parsed again.
+    If trust_unchanged_dirs is True, yaml files in directories whose mtime
+    hasn't changed reuse their cached spec without even being checked, which
+    suits directories whose files are only ever added or removed, rather than
+    edited in place, like system-wide installations.
+    The returned index's 'files' dict maps yaml file paths (relative to
+    root_dir) to entries recording each file's mtime, size and processed spec
+    (or None if the file didn't describe a valid nbextension), in the order
+    in which they were found.
+
+    The scan is limited to files whose names match one of the include_files
+    glob patterns, in directories at most max_depth levels below root_dir
+    (or any depth, if None), skipping directories matching exclude_dirs (see
+    _dir_matches). Symlinked directories are followed if follow_symlinks is
+    'all', skipped if it's 'none', and for 'unique', followed unless they
+    lead to a directory which has already been scanned, as identified by its
+    device and inode numbers, which also stops the scan following cycles.
+    Each directory's listing records these numbers as its 'id', so that
+    _merge_nbextension_index can skip directories found in several roots.
+    The walk itself is done by _walk_nbextension_dir.
+
+    The directories are walked first, then any yaml files which need to be
+    parsed are parsed together, using executor (a concurrent.futures
+    Executor) if given. Results are merged in walk order, so are the same
+    with or without an executor.
+    """
+    include_files = list(include_files)
+    old_dirs = (root_index or {}).get('dirs', {})
+    old_files = (root_index or {}).get('files', {})
+    if (root_index or {}).get('include_files') != include_files:
+        # cached listings only include files matching the old patterns
+        old_dirs = {}
+    new_dirs, new_files = {}, {}
+    to_parse = []
+    for _, yaml_relpath, stat in _walk_nbextension_dir(
+            root_dir, new_dirs, old_dirs=old_dirs,
+            trust_unchanged_dirs=trust_unchanged_dirs,
+            exclude_dirs=exclude_dirs, include_files=include_files,
+            max_depth=max_depth, follow_symlinks=follow_symlinks, log=log):
+        cached = old_files.get(yaml_relpath)
+        if cached is not None and (stat is None or (
+                cached['mtime'] == stat.st_mtime and
+                cached['size'] == stat.st_size)):
+            new_files[yaml_relpath] = cached
+            continue
+        if stat is None:
+            try:
+                stat = os.stat(os.path.join(root_dir, yaml_relpath))
+            except OSError:
+                continue
+        # insert now to keep walk order, fill in spec once parsed
+        new_files[yaml_relpath] = {
+            'mtime': stat.st_mtime, 'size': stat.st_size, 'spec': None}
+        to_parse.append(yaml_relpath)
+
+    yaml_paths = [os.path.join(root_dir, p) for p in to_parse]
+    url_bases = [path2url(os.path.dirname(p)) for p in to_parse]
+    if executor is not None and len(to_parse) > 1:
+        results = executor.map(
+            _parse_nbextension_yaml, yaml_paths, url_bases, chunksize=8)
+    else:
+        results = map(_parse_nbextension_yaml, yaml_paths, url_bases)
+    for yaml_relpath, (spec, warning) in zip(to_parse, results):
+        if warning and log:
+            log.warning('{} {}'.format(warning, yaml_relpath))
+        new_files[yaml_relpath]['spec'] = spec
+    return {'dirs': new_dirs, 'files': new_files,
+            'include_files': include_files}
+
+
+def _walk_order_key(yaml_relpath):
+    """
+    Sort key giving the order in which _index_nbextension_dir finds files.
+
+    That is, a directory's files in name order, before its subdirectories'
+    files, with the subdirectories also taken in name order.
+    """
+    parts = yaml_relpath.split(os.sep)
+    return [(1, part) for part in parts[:-1]] + [(0, parts[-1])]
+
+
+def _reindex_nbextension_yaml(root_dir, yaml_relpath, root_index, log=None):
+    """
+    Update root_index in place for a single created, modified or deleted file.
+
+    Returns True if root_index was changed, False otherwise.
+    """
+    files = root_index['files']
+    cached = files.get(yaml_relpath)
+    try:
+        stat = os.stat(os.path.join(root_dir, yaml_relpath))
+    except OSError:
+        return files.pop(yaml_relpath, None) is not None
+    if (cached is not None and cached['mtime'] == stat.st_mtime and
+            cached['size'] == stat.st_size):
+        return False
+    spec, warning = _parse_nbextension_yaml(
+        os.path.join(root_dir, yaml_relpath),
+        path2url(os.path.dirname(yaml_relpath)))
+    if warning and log:
+        log.warning('{} {}'.format(warning, yaml_relpath))
+    files[yaml_relpath] = {
+        'mtime': stat.st_mtime, 'size': stat.st_size, 'spec': spec}
+    if cached is None:
+        # new files must be moved to their place in walk order, so that
+        # the last of any duplicates is the same as for a full scan
+        root_index['files'] = dict(
+            sorted(files.items(), key=lambda item: _walk_order_key(item[0])))
+    return True
+
+
+def _merge_nbextension_index(nbextension_dirs, index, log=None,
+                             unique_dirs=False):
+    """
+    Return a dict of nbextensions from a descriptor index, keyed by require.
+
+    This doesn't touch the filesystem, so index should be up to date for all
+    of nbextension_dirs. Each value is a dict with keys 'yaml_path' and
+    'extension', where extension is a copy of the indexed spec.
+    Where several descriptors have the same require value, the last one wins.
+    If unique_dirs is True, descriptors are skipped if they're in a directory
+    already found in an earlier nbextensions directory (through a symlink,
+    or because one nbextensions directory contains another).
+    """
+    extension_dict = {}
+    # don't check directories twice. See
+    #   github.com/Jupyter-contrib/jupyter_nbextensions_configurator/issues/25
+    already_checked = set()
+    seen_dir_ids = set()
+    for root_nbext_dir in nbextension_dirs:
+        if root_nbext_dir in already_checked:
+            continue
+        else:
+            already_checked.add(root_nbext_dir)
+        root_index = index['roots'].get(root_nbext_dir)
+        if root_index is None:
+            continue
+        redundant_dirs = set()
+        if unique_dirs:
+            dir_ids = {}
+            for reldir, listing in root_index['dirs'].items():
+                dir_id = tuple(listing.get('id') or ())
+                if dir_id in seen_dir_ids:
+                    redundant_dirs.add(reldir)
+                elif dir_id:
+                    dir_ids[reldir] = dir_id
+            seen_dir_ids.update(dir_ids.values())
+            if redundant_dirs and log:
+                log.debug(
+                    'Skipping {} directories in {} already found in other '
+                    'nbextensions directories'.format(
+                        len(redundant_dirs), root_nbext_dir))
+        for yaml_relpath, entry in root_index['files'].items():
+            if entry['spec'] is None:
+                continue
+            if redundant_dirs and (
+                    os.path.dirname(yaml_relpath) in redundant_dirs):
+                continue
+            # copy, so as not to alter the index when flagging duplicates
+            extension = dict(entry['spec'])
+            yaml_path = os.path.join(root_nbext_dir, yaml_relpath)
+            require = extension['require']
+
+            if log:
+                if require in extension_dict:
+                    msg = 'nbextension {!r} has duplicate listings'.format(
+                        extension['require'])
+                    msg += ' in both {!r} and {!r}'.format(
+                        yaml_path, extension_dict[require]['yaml_path'])
+                    log.warning(msg)
+                    extension['duplicate'] = True
+                else:
+                    log.debug('Found nbextension {!r} in {}'.format(
+                        extension['Name'], yaml_relpath))
+
+            extension_dict[require] = {
+                'yaml_path': yaml_path, 'extension': extension}
+    return extension_dict
+
+
 def get_configurable_nbextensions(
-        nbextension_dirs, exclude_dirs=('mathjax',), as_dict=False, log=None):
+        nbextension_dirs, exclude_dirs=('mathjax',), as_dict=False, log=None,
+        index_path=None, executor=None, index=None, shared_roots=(),
+        include_files=DESCRIPTOR_FILE_PATTERNS, max_depth=None,
+        follow_symlinks='unique'):
     """Build a list of configurable nbextensions based on YAML descriptor files.
 
     descriptor files must:
-      - be located under one of nbextension_dirs
-      - have the file extension '.yaml' or '.yml'
+      - be located under one of nbextension_dirs, at most max_depth
+        directories deep (if not None), and not in a directory matching one
+        of the exclude_dirs glob patterns
+      - have a name matching one of the include_files glob patterns, which
+        by default match the file extensions '.yaml' and '.yml'
       - contain (at minimum) the following keys:
         - Type: must be 'IPython Notebook Extension' or
                 'Jupyter Notebook Extension'
         - Main: relative url of the nbextension's main javascript file
+
+    If index_path is given, it names a json file used to persist an index of
+    the descriptor files between calls, so that only directories and files
+    which have changed since the previous call need to be listed and parsed.
+    Alternatively, or as well, an in-memory index can be passed as index, in
+    which case it is updated in place, and index_path is only written to.
+
+    shared_roots names directories whose index entries came from a shared
+    index (see build_shared_nbextension_index). They are checked only for
+    added or removed files, and aren't written to index_path.
+
+    If executor (a concurrent.futures Executor) is given, it is used to parse
+    the yaml files in parallel. This doesn't alter the results, including
+    which of any duplicate descriptors is used.
+
+    follow_symlinks is one of 'all', 'none' or 'unique', as described for
+    _index_nbextension_dir.
     """
-    extension_dict = {}
+    if index is None:
+        if index_path:
+            index = _load_nbextension_index(index_path, log=log)
+        else:
+            index = _new_nbextension_index()
+    index_changed = False
 
     # Traverse through nbextension subdirectories to find all yaml files
     # However, don't check directories twice. See
@@ -109,49 +760,125 @@ def get_configurable_nbextensions(
             log.debug(
                 'Looking for nbextension yaml descriptor files in {}'.format(
                     root_nbext_dir))
-        for direct, dirs, files in os.walk(root_nbext_dir, followlinks=True):
-            # filter to exclude directories
-            dirs[:] = [d for d in dirs if d not in exclude_dirs]
-            for filename in files:
-                if os.path.splitext(filename)[1] not in ['.yml', '.yaml']:
-                    continue
-                yaml_path = os.path.join(direct, filename)
-                yaml_relpath = os.path.relpath(yaml_path, root_nbext_dir)
-                with io.open(yaml_path, 'r', encoding='utf-8') as stream:
-                    try:
-                        extension = yaml.load(stream, Loader=SafeLoader)
-                    except yaml.YAMLError:
-                        if log:
-                            log.warning(
-                                'Failed to load yaml file {}'.format(
-                                    yaml_relpath))
-                        continue
-                extension = _process_nbextension_spec(
-                    extension,
-                    relative_url_base=path2url(os.path.dirname(yaml_relpath)))
-                if not isinstance(extension, dict):
-                    continue
-                require = extension['require']
+        old_root_index = index['roots'].get(root_nbext_dir)
+        root_index = _index_nbextension_dir(
+            root_nbext_dir, exclude_dirs=exclude_dirs,
+            root_index=old_root_index, log=log, executor=executor,
+            trust_unchanged_dirs=root_nbext_dir in shared_roots,
+            include_files=include_files, max_depth=max_depth,
+            follow_symlinks=follow_symlinks)
+        if root_index != old_root_index:
+            index['roots'][root_nbext_dir] = root_index
+            index_changed = True
+    if index_path and index_changed:
+        _save_nbextension_index(
+            index_path, _without_roots(index, shared_roots), log=log)
 
-                if log:
-                    if require in extension_dict:
-                        msg = 'nbextension {!r} has duplicate listings'.format(
-                            extension['require'])
-                        msg += ' in both {!r} and {!r}'.format(
-                            yaml_path, extension_dict[require]['yaml_path'])
-                        log.warning(msg)
-                        extension['duplicate'] = True
-                    else:
-                        log.debug('Found nbextension {!r} in {}'.format(
-                            extension['Name'], yaml_relpath))
-
-                extension_dict[require] = {
-                    'yaml_path': yaml_path, 'extension': extension}
+    extension_dict = _merge_nbextension_index(
+        nbextension_dirs, index, log=log,
+        unique_dirs=follow_symlinks == 'unique')
     if as_dict:
         return extension_dict
     return [val['extension'] for val in extension_dict.values()]
 
 
+def _absolutize_url(url, relative_url_root, absolute_re):
+    """Join a relative url onto the url of the document containing it."""
+    if not relative_url_root or absolute_re.match(url):
+        return url
+    if url.startswith('/'):
+        return posixpath.normpath(url)
+    joined = posixpath.normpath(
+        posixpath.join(posixpath.dirname(relative_url_root), url))
+    # normpath strips any trailing slash, which is meaningful in urls
+    return joined + '/' if url.endswith('/') else joined
+
+
+def _get_markdown_renderer():
+    """
+    Return a function rendering markdown to sanitized html, or None.
+
+    Server-side rendering needs both mistune (version 2 or later), to
+    render, and bleach, to sanitize the result, so returns None if either is
+    unavailable.
+    """
+    try:
+        import bleach
+        import mistune
+        from bleach.html5lib_shim import Filter
+    except ImportError:
+        return None
+    if not hasattr(mistune, 'html'):
+        # mistune < 2
+        return None
+
+    class ReadmeFilter(Filter):
+        """
+        Post-process rendered markdown as the client-side renderer does.
+
+        Adds ids & anchor links to headings, makes relative link & image urls
+        absolute, and makes links open in new tabs.
+        """
+
+        relative_url_root = None
+
+        def __iter__(self):
+            heading = None
+            for token in Filter.__iter__(self):
+                if token['type'] in ('StartTag', 'EmptyTag'):
+                    attrs = token['data']
+                    if token['name'] in ('a', 'img'):
+                        attr, absolute_re = {
+                            'a': ((None, 'href'), link_absolute_url_re),
+                            'img': ((None, 'src'), image_absolute_url_re),
+                        }[token['name']]
+                        if attrs.get(attr):
+                            attrs[attr] = _absolutize_url(
+                                attrs[attr], self.relative_url_root,
+                                absolute_re)
+                        if (token['name'] == 'a' and attrs.get(attr) and
+                                not attrs[attr].startswith('#')):
+                            attrs[(None, 'target')] = '_blank'
+                    elif re.match(r'^h[1-6]$', token['name']):
+                        heading = [token]
+                        continue
+                if heading is None:
+                    yield token
+                    continue
+                heading.append(token)
+                if token['type'] == 'EndTag' and re.match(
+                        r'^h[1-6]$', token['name']):
+                    text = ''.join(
+                        tok['data'] for tok in heading
+                        if tok['type'] in ('Characters', 'SpaceCharacters'))
+                    anchor = text.replace(' ', '-')
+                    heading[0]['data'][(None, 'id')] = anchor
+                    for tok in heading[:-1]:
+                        yield tok
+                    yield {'type': 'StartTag', 'name': 'a', 'data': {
+                        (None, 'class'): 'anchor-link',
+                        (None, 'href'): '#' + anchor}}
+                    yield {'type': 'Characters', 'data': '¶'}
+                    yield {'type': 'EndTag', 'name': 'a', 'data': {}}
+                    yield token
+                    heading = None
+
+    cleaner_kwargs = dict(
+        tags=set(bleach.ALLOWED_TAGS).union(markdown_allowed_tags),
+        attributes=markdown_allowed_attributes,
+        protocols=set(bleach.ALLOWED_PROTOCOLS).union(['data']),
+    )
+
+    def render_markdown(md_text, relative_url_root=None):
+        # new filter class each time, so that cleaners are thread-safe
+        url_filter = type(str('ReadmeFilter'), (ReadmeFilter,), {
+            'relative_url_root': relative_url_root})
+        cleaner = bleach.Cleaner(filters=[url_filter], **cleaner_kwargs)
+        return cleaner.clean(mistune.html(md_text))
+
+    return render_markdown
+
+
 class ConfiguratorLogger(logging.LoggerAdapter):
     """Logging adapter to prepend the serverextension name to log messages."""
 
@@ -162,26 +889,1232 @@ class ConfiguratorLogger(logging.LoggerAdapter):
         return '[{}] {}'.format(__name__, msg), kwargs
 
 
+class NBExtensionIndex(LoggingConfigurable):
+    """
+    Server-side index and cache of the configurable nbextensions.
+
+    Keeps the nbextension yaml descriptor index in memory (persisting it to
+    index_path), along with the already-encoded json list for each distinct
+    nbextensions_path seen, so that repeated requests need neither a
+    filesystem scan nor re-serialization.
+
+    A cached list is discarded once it is older than cache_ttl seconds, or as
+    soon as the mtime of one of its nbextensions directories changes (as
+    happens when an nbextension is installed or uninstalled). Alternatively,
+    if watch is enabled, the nbextensions directories are watched for
+    changes, and cached lists are updated as the changes happen.
+    """
+
+    cache_ttl = Float(
+        10, config=True,
+        help='Time in seconds for which a cached nbextensions list is served '
+             'without rescanning the nbextensions directories. '
+             'Set to 0 to disable caching.')
+
+    cache_size = Integer(
+        8, config=True,
+        help='Maximum number of distinct nbextensions_path values for which '
+             'to cache nbextensions lists. The least recently used list is '
+             'discarded first.')
+
+    index_path = Unicode(
+        config=True,
+        help='Path of the json file used to persist the nbextension yaml '
+             'descriptor index between scans and server restarts. '
+             'Set to an empty string to disable the persistent index.')
+
+    @default('index_path')
+    def _index_path_default(self):
+        runtime_dir = getattr(self.parent, 'runtime_dir', None)
+        return os.path.join(
+            runtime_dir or jupyter_runtime_dir(), INDEX_FILENAME)
+
+    shared_index_path = Unicode(
+        '', config=True,
+        help='Path of a read-only descriptor index for nbextensions '
+             'directories shared between users, as written by '
+             '`jupyter nbextensions_configurator index build --sys-prefix`. '
+             'Shared directories are then only checked for added or '
+             'removed files, rather than being scanned in full by every '
+             'server. Empty to disable.')
+
+    scan_threads = Integer(
+        2, config=True,
+        help='Maximum number of threads used to scan nbextensions '
+             'directories, so that slow scans don\'t block the server.')
+
+    parse_workers = Integer(
+        0, config=True,
+        help='Number of workers used to parse yaml descriptor files in '
+             'parallel. Set to 0 to parse them one after another.')
+
+    parse_processes = Bool(
+        False, config=True,
+        help='Whether the parse_workers should be processes rather than '
+             'threads. Processes can help when the LibYAML-based loader is '
+             'unavailable, and parsing is CPU-bound.')
+
+    watch = Bool(
+        False, config=True,
+        help='Whether to watch nbextensions directories for changes, '
+             'updating cached nbextensions lists as they happen, rather than '
+             'rescanning on request. Uses the watchdog package if it is '
+             'installed, otherwise polls every poll_interval seconds.')
+
+    poll_interval = Float(
+        5, config=True,
+        help='Time in seconds between polls of watched nbextensions '
+             'directories, when the watchdog package is unavailable.')
+
+    render_markdown = Bool(
+        False, config=True,
+        help='Whether to render nbextensions\' markdown readmes to html on '
+             'the server, rather than in the browser. Requires the mistune '
+             '(2 or later) and bleach packages.')
+
+    asset_hashes = Bool(
+        True, config=True,
+        help='Whether to add hashes of the contents of nbextensions\' readme '
+             'and icon files to their specs, so that the configurator page '
+             'can fetch them from urls which browsers may cache for long.')
+
+    readme_cache_size = Integer(
+        32, config=True,
+        help='Maximum number of server-rendered readmes to cache.')
+
+    warm_up = Bool(
+        False, config=True,
+        help='Whether to scan the nbextensions directories in the '
+             'background once the server has started, so that the first '
+             'visit to the configurator doesn\'t wait for a full scan.')
+
+    warm_up_delay = Float(
+        5, config=True,
+        help='Time in seconds after the server starts at which to begin '
+             'the background warm-up scan.')
+
+    exclude_dirs = List(
+        Unicode(), ['mathjax'], config=True,
+        help='Glob patterns for directories not to search for yaml '
+             'descriptor files. Each is matched against both directory '
+             'names, and paths relative to the nbextensions directory.')
+
+    include_files = List(
+        Unicode(), list(DESCRIPTOR_FILE_PATTERNS), config=True,
+        help='Glob patterns for the names of yaml descriptor files.')
+
+    max_depth = Integer(
+        None, allow_none=True, config=True,
+        help='Maximum number of directory levels below each nbextensions '
+             'directory to search for yaml descriptor files, or None for '
+             'no limit.')
+
+    follow_symlinks = Enum(
+        ['all', 'none', 'unique'], 'unique', config=True,
+        help='Which symlinked directories to search for yaml descriptor '
+             'files: all of them, none of them, or only those leading to '
+             'directories which haven\'t already been searched (as '
+             'identified by inode), which also avoids symlink cycles.')
+
+    def __init__(self, **kwargs):
+        super(NBExtensionIndex, self).__init__(**kwargs)
+        self._cache = OrderedDict()
+        self._in_flight = {}
+        self._executor = None
+        self._parse_executor = None
+        self._parse_executor_lock = threading.Lock()
+        # the descriptor index, guarded by _index_lock, as it's updated from
+        # the scan_threads executor
+        self._index = None
+        self._index_lock = threading.Lock()
+        self._shared_roots = frozenset()
+        # watching state, only used from the IOLoop's thread
+        self._loop = None
+        self._watched = set()
+        self._observer = None
+        self._poller = None
+        self._pending = {}
+        self._flush_handle = None
+        # warm-up state, the event being checked from the scan_threads
+        self._warm_up_handle = None
+        self._warm_up_cancelled = threading.Event()
+        # rendered readmes, guarded by _readme_lock
+        self._markdown_renderer = None
+        self._readme_cache = OrderedDict()
+        self._readme_lock = threading.Lock()
+        # hashes of readme & icon files, by path, guarded by _asset_lock
+        self._asset_hashes = {}
+        self._asset_lock = threading.Lock()
+        # spec hashes of recently served lists, by version, for
+        # get_list_changes. Only used from the IOLoop's thread
+        self._list_versions = OrderedDict()
+
+    def scan_options(self):
+        """Return keyword arguments limiting the scan, as configured."""
+        return dict(
+            exclude_dirs=tuple(self.exclude_dirs),
+            include_files=tuple(self.include_files),
+            max_depth=self.max_depth, follow_symlinks=self.follow_symlinks)
+
+    def _get_executor(self):
+        """Return the executor used to scan nbextensions directories."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(1, self.scan_threads))
+        return self._executor
+
+    def _get_parse_executor(self):
+        """Return the executor used to parse yaml files, or None."""
+        if self.parse_workers < 1:
+            return None
+        with self._parse_executor_lock:
+            if self._parse_executor is None:
+                executor_class = (
+                    ProcessPoolExecutor if self.parse_processes
+                    else ThreadPoolExecutor)
+                self._parse_executor = executor_class(
+                    max_workers=self.parse_workers)
+        return self._parse_executor
+
+    def _get_index(self):
+        """Return the in-memory descriptor index. Hold _index_lock to call."""
+        if self._index is None:
+            if self.index_path:
+                index = _load_nbextension_index(self.index_path, log=self.log)
+            else:
+                index = _new_nbextension_index()
+            if self.shared_index_path:
+                shared_index = _load_nbextension_index(
+                    self.shared_index_path, log=self.log)
+                self._shared_roots = frozenset(shared_index['roots'])
+                self.log.debug(
+                    'Using shared descriptor index {} for {}'.format(
+                        self.shared_index_path, sorted(self._shared_roots)))
+                index['roots'].update(shared_index['roots'])
+            self._index = index
+        return self._index
+
+    @staticmethod
+    def _get_dir_mtimes(nbextension_dirs):
+        """Return a tuple of the mtimes of the given directories."""
+        mtimes = []
+        for nbext_dir in nbextension_dirs:
+            try:
+                mtimes.append(os.stat(nbext_dir).st_mtime)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def invalidate(self, nbextension_dirs=None):
+        """Discard the cached list for nbextension_dirs, or all if None."""
+        if nbextension_dirs is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(tuple(nbextension_dirs), None)
+
+    def _get_fresh(self, key):
+        """Return the cache entry for key if it's still fresh, else None."""
+        cached = self._cache.get(key)
+        if cached is None:
+            return None
+        # watched lists are kept up to date as changes happen
+        if not (self.watch and self._watched.issuperset(key)):
+            if (time.time() - cached['time'] >= self.cache_ttl or
+                    cached['dir_mtimes'] != self._get_dir_mtimes(key)):
+                return None
+        self._cache.move_to_end(key)
+        return cached
+
+    @staticmethod
+    def _make_entry(key, extension_list, dir_mtimes, previous=None):
+        """Encode an nbextensions list as a new cache entry."""
+        now = time.time()
+        list_json = _encode_json(extension_list)
+        etag = '"{}"'.format(hashlib.sha1(list_json).hexdigest())
+        # keep the old modification time if the list hasn't actually changed
+        if previous is not None and previous['etag'] == etag:
+            last_modified = previous['last_modified']
+        else:
+            last_modified = now
+        return {
+            'time': now, 'dir_mtimes': dir_mtimes, 'json': list_json,
+            'etag': etag, 'last_modified': last_modified,
+            'extensions': extension_list, 'projections': {},
+        }
+
+    def _project_entry(self, entry, fields=None):
+        """
+        Return a cache entry for the list with only the given spec fields.
+
+        The require field, which identifies each nbextension, is always
+        included. Projections are cached along with the full list entry.
+        """
+        if not fields:
+            return entry
+        fields = tuple(sorted(set(fields).union(['require'])))
+        projections = entry['projections']
+        projected = projections.get(fields)
+        if projected is None:
+            extension_list = [
+                {field: extension[field]
+                 for field in fields if field in extension}
+                for extension in entry['extensions']]
+            list_json = _encode_json(extension_list)
+            # leave out anything else cached on the full entry
+            projected = {
+                key: entry[key]
+                for key in ('time', 'dir_mtimes', 'last_modified')}
+            projected.update(
+                json=list_json, extensions=extension_list, projections=None,
+                etag='"{}"'.format(hashlib.sha1(list_json).hexdigest()))
+            if len(projections) >= max(1, self.cache_size):
+                projections.clear()
+            projections[fields] = projected
+        return projected
+
+    @staticmethod
+    def get_search_index_json(entry):
+        """
+        Return the json-encoded search index for a full list cache entry.
+
+        See _build_search_index. It's cached along with the entry.
+        """
+        search_json = entry.get('search_json')
+        if search_json is None:
+            search_json = entry['search_json'] = _encode_json(
+                _build_search_index(entry['extensions']))
+        return search_json
+
+    def get_list_changes(self, entry, since=None, fields=None):
+        """
+        Return the changes to a full list cache entry since an earlier version.
+
+        A list's version is its ETag, without the quotes. Versions & changes
+        are found from the full specs, so that changes to fields left out of
+        a projection are still reported. The versions of the last cache_size
+        lists passed in are remembered, so that changes since any of them can
+        be found.
+
+        Returns a dict with keys
+          - added: the specs of nbextensions new since that version
+          - modified: the specs of nbextensions changed since that version
+          - removed: the require values of nbextensions since removed
+        or None if the earlier version isn't known. The added & modified
+        specs only have the given fields, as for _project_entry.
+        """
+        spec_hashes = entry.get('spec_hashes')
+        if spec_hashes is None:
+            spec_hashes = entry['spec_hashes'] = {
+                extension['require']: hashlib.sha1(
+                    _encode_json(extension)).hexdigest()
+                for extension in entry['extensions']}
+        self._list_versions[entry['etag'].strip('"')] = spec_hashes
+        self._list_versions.move_to_end(entry['etag'].strip('"'))
+        while len(self._list_versions) > max(1, self.cache_size):
+            self._list_versions.popitem(last=False)
+        old_hashes = self._list_versions.get(since)
+        if old_hashes is None:
+            return None
+        changes = {'added': [], 'modified': [], 'removed': sorted(
+            require for require in old_hashes if require not in spec_hashes)}
+        # projections keep the order of the full list
+        projected = self._project_entry(entry, fields)['extensions']
+        for position, extension in enumerate(entry['extensions']):
+            old_hash = old_hashes.get(extension['require'])
+            if old_hash is None:
+                changes['added'].append(projected[position])
+            elif old_hash != spec_hashes[extension['require']]:
+                changes['modified'].append(projected[position])
+        return changes
+
+    @staticmethod
+    def _find_asset(nbextension_dirs, url):
+        """
+        Return the path & stat of a file in the nbextensions namespace.
+
+        As for the nbextensions static file handler, url is looked up in
+        each of nbextension_dirs in turn. Returns (None, None) if there's no
+        such file.
+        """
+        if absolute_url_re.match(url):
+            return None, None
+        for nbext_dir in nbextension_dirs:
+            root = os.path.abspath(nbext_dir)
+            path = os.path.abspath(os.path.join(root, url))
+            if not path.startswith(root + os.sep):
+                break
+            try:
+                return path, os.stat(path)
+            except OSError:
+                continue
+        return None, None
+
+    def _get_asset_hash(self, nbextension_dirs, url):
+        """
+        Return a hash of the contents of a file in the nbextensions namespace.
+
+        Hashes are cached until the file's mtime or size changes.
+        Returns None if there's no such file.
+        """
+        path, stat = self._find_asset(nbextension_dirs, url)
+        if path is None:
+            return None
+        with self._asset_lock:
+            cached = self._asset_hashes.get(path)
+        if cached is not None and cached[:2] == (stat.st_mtime, stat.st_size):
+            return cached[2]
+        sha1 = hashlib.sha1()
+        try:
+            with io.open(path, 'rb') as stream:
+                for chunk in iter(lambda: stream.read(65536), b''):
+                    sha1.update(chunk)
+        except (OSError, IOError) as err:
+            self.log.warning('Failed to read {}: {}'.format(path, err))
+            return None
+        asset_hash = sha1.hexdigest()[:16]
+        with self._asset_lock:
+            self._asset_hashes[path] = (
+                stat.st_mtime, stat.st_size, asset_hash)
+        return asset_hash
+
+    async def get_asset_hash_async(self, nbextension_dirs, url):
+        """
+        Return the hash of a file's contents, without blocking the loop.
+
+        See _get_asset_hash.
+        """
+        return await IOLoop.current().run_in_executor(
+            self._get_executor(), self._get_asset_hash, nbextension_dirs, url)
+
+    def _add_asset_hashes(self, nbextension_dirs, extension_list):
+        """
+        Return the nbextensions list, with hashes of their readme & icons.
+
+        See ASSET_HASH_FIELDS. Specs with hashes to add are copied, rather
+        than changed in place, since they're shared with the descriptor
+        index. Any hashes already on the specs are replaced, so that those
+        of files which have gone are dropped.
+        """
+        if not self.asset_hashes:
+            return extension_list
+        hash_fields = set(hash_field for _, hash_field in ASSET_HASH_FIELDS)
+        hashed_list = []
+        for extension in extension_list:
+            hashes = {}
+            for url_field, hash_field in ASSET_HASH_FIELDS:
+                if extension.get(url_field):
+                    asset_hash = self._get_asset_hash(
+                        nbextension_dirs, extension[url_field])
+                    if asset_hash is not None:
+                        hashes[hash_field] = asset_hash
+            if hashes or not hash_fields.isdisjoint(extension):
+                extension = {key: val for key, val in extension.items()
+                             if key not in hash_fields}
+                extension.update(hashes)
+            hashed_list.append(extension)
+        return hashed_list
+
+    @staticmethod
+    def get_icon_bundle_hash(entry):
+        """
+        Return a hash identifying the icon bundle of a full list cache entry.
+
+        It's derived from the icons' hashes, so changes along with them.
+        Returns None if there are no icon hashes, as with asset_hashes off.
+        """
+        icon_hashes = sorted(
+            (extension['require'], extension['icon_hash'])
+            for extension in entry['extensions'] if 'icon_hash' in extension)
+        if not icon_hashes:
+            return None
+        return hashlib.sha1(_encode_json(icon_hashes)).hexdigest()[:16]
+
+    def get_icon_bundle(self, nbextension_dirs, entry):
+        """
+        Return the json-encoded icon bundle for a full list cache entry.
+
+        That's an object mapping the require of each nbextension with an icon
+        file to the icon as a data uri, so that a page can load every icon
+        in a single request. Icons larger than ICON_BUNDLE_MAX_SIZE, or with
+        an unknown mime type, are left out. It's cached along with the entry.
+        """
+        bundle_json = entry.get('icon_bundle_json')
+        if bundle_json is not None:
+            return bundle_json
+        bundle = {}
+        for extension in entry['extensions']:
+            if not extension.get('icon'):
+                continue
+            path, stat = self._find_asset(nbextension_dirs, extension['icon'])
+            if path is None or stat.st_size > ICON_BUNDLE_MAX_SIZE:
+                continue
+            mime_type = mimetypes.guess_type(path)[0]
+            if mime_type is None or not mime_type.startswith('image/'):
+                continue
+            try:
+                with io.open(path, 'rb') as stream:
+                    data = base64.b64encode(stream.read()).decode('ascii')
+            except (OSError, IOError) as err:
+                self.log.warning('Failed to read {}: {}'.format(path, err))
+                continue
+            bundle[extension['require']] = 'data:{};base64,{}'.format(
+                mime_type, data)
+        bundle_json = entry['icon_bundle_json'] = _encode_json(bundle)
+        return bundle_json
+
+    async def get_icon_bundle_async(self, nbextension_dirs):
+        """
+        Return the icon bundle hash & json, without blocking the loop.
+
+        See get_icon_bundle_hash & get_icon_bundle.
+        """
+        entry = await self.get_list_async(nbextension_dirs)
+        bundle_json = await IOLoop.current().run_in_executor(
+            self._get_executor(), self.get_icon_bundle,
+            nbextension_dirs, entry)
+        return self.get_icon_bundle_hash(entry), bundle_json
+
+    def _asset_changed(self, path):
+        """Discard cached lists if a watched readme or icon has changed."""
+        with self._asset_lock:
+            known = os.path.abspath(path) in self._asset_hashes
+        if known:
+            self.log.debug('Readme or icon {} changed'.format(path))
+            self.invalidate()
+
+    def _build_entry(self, key, previous=None):
+        """
+        Scan the nbextensions directories in key to build a new cache entry.
+
+        This doesn't touch the cache itself, so is safe to call from a
+        thread other than the one which owns the NBExtensionIndex.
+        """
+        dir_mtimes = self._get_dir_mtimes(key)
+        with self._index_lock:
+            extension_list = get_configurable_nbextensions(
+                nbextension_dirs=key, log=self.log,
+                index_path=self.index_path or None,
+                executor=self._get_parse_executor(), index=self._get_index(),
+                shared_roots=self._shared_roots, **self.scan_options())
+        extension_list = self._add_asset_hashes(key, extension_list)
+        return self._make_entry(key, extension_list, dir_mtimes, previous)
+
+    def _store(self, key, entry):
+        """Add a cache entry, discarding the least recently used if full."""
+        if self.cache_size > 0:
+            # store even if cache_ttl is 0, to keep last_modified
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def get_list(self, nbextension_dirs, fields=None):
+        """
+        Return the cache entry for the nbextensions list of nbextension_dirs.
+
+        The entry is a dict with keys
+          - json: the json-encoded nbextensions list, as utf-8 bytes
+          - etag: a strong ETag for json, derived from its sha1 hash
+          - last_modified: the timestamp at which json was last seen to
+            change
+
+        If fields is given, the list's specs only include those fields.
+
+        If there is no fresh cache entry, the scan happens synchronously, so
+        from the server's IOLoop, use get_list_async instead.
+        """
+        key = tuple(nbextension_dirs)
+        entry = self._get_fresh(key)
+        if entry is None:
+            entry = self._build_entry(key, self._cache.get(key))
+            self._store(key, entry)
+        return self._project_entry(entry, fields)
+
+    def get_list_json(self, nbextension_dirs, fields=None):
+        """Return the json-encoded nbextensions list, as utf-8 bytes."""
+        return self.get_list(nbextension_dirs, fields)['json']
+
+    async def get_list_async(self, nbextension_dirs, fields=None):
+        """
+        Return the cache entry for nbextension_dirs, without blocking the loop.
+
+        Any scan needed runs on the scan_threads executor. Concurrent calls
+        for the same nbextension_dirs share a single in-flight scan.
+        Must be called from the IOLoop's thread.
+        """
+        key = tuple(nbextension_dirs)
+        entry = self._get_fresh(key)
+        if entry is not None:
+            return self._project_entry(entry, fields)
+        future = self._in_flight.get(key)
+        if future is None:
+            future = IOLoop.current().run_in_executor(
+                self._get_executor(), self._build_entry,
+                key, self._cache.get(key))
+            self._in_flight[key] = future
+
+            def _scan_done(future):
+                self._in_flight.pop(key, None)
+                if not future.cancelled() and future.exception() is None:
+                    self._store(key, future.result())
+                    if self.watch:
+                        self.start_watching(key)
+            future.add_done_callback(_scan_done)
+        else:
+            self.log.debug('Waiting for in-flight scan of {}'.format(key))
+        return self._project_entry(await future, fields)
+
+    @staticmethod
+    def _find_extension(entry, require):
+        """Return the spec from a full list entry with the given require."""
+        by_require = entry.get('by_require')
+        if by_require is None:
+            by_require = entry['by_require'] = {
+                extension['require']: extension
+                for extension in entry['extensions']}
+        return by_require.get(require)
+
+    def get_extension(self, nbextension_dirs, require):
+        """Return the spec for the require url, or None if there isn't one."""
+        return self._find_extension(self.get_list(nbextension_dirs), require)
+
+    async def get_extension_async(self, nbextension_dirs, require):
+        """Return the spec for the require url, without blocking the loop."""
+        entry = await self.get_list_async(nbextension_dirs)
+        return self._find_extension(entry, require)
+
+    def can_render_markdown(self):
+        """Return whether readmes should be rendered on the server."""
+        if not self.render_markdown:
+            return False
+        if self._markdown_renderer is None:
+            self._markdown_renderer = _get_markdown_renderer() or False
+            if not self._markdown_renderer:
+                self.log.warning(
+                    'Server-side markdown rendering needs the mistune (2 or '
+                    'later) and bleach packages, falling back to rendering '
+                    'in browsers')
+        return bool(self._markdown_renderer)
+
+    def render_readme(self, nbextension_dirs, path, relative_url_root=None):
+        """
+        Return a markdown file in the nbextensions namespace, for browsers.
+
+        As for the nbextensions static file handler, path is looked up in
+        each of nbextension_dirs in turn. Returns a tuple of (body, is_html),
+        where body is bytes of the file rendered to html, if is_html is True,
+        or otherwise of the markdown itself, for browsers to render, as for
+        files which may contain math, or fail to render. Relative urls in the
+        markdown are made absolute by joining them to relative_url_root, if
+        it's given.
+        Returns None if there's no such file, or server-side rendering is
+        disabled.
+        """
+        if not self.can_render_markdown():
+            return None
+        for nbext_dir in nbextension_dirs:
+            root = os.path.abspath(nbext_dir)
+            md_path = os.path.abspath(os.path.join(root, path))
+            if not md_path.startswith(root + os.sep):
+                return None
+            try:
+                stat = os.stat(md_path)
+            except OSError:
+                continue
+            break
+        else:
+            return None
+        key = (md_path, relative_url_root)
+        with self._readme_lock:
+            cached = self._readme_cache.get(key)
+            if cached is not None and cached[:2] == (
+                    stat.st_mtime, stat.st_size):
+                self._readme_cache.move_to_end(key)
+                return cached[2:]
+        try:
+            with io.open(md_path, 'r', encoding='utf-8') as stream:
+                md_text = stream.read()
+        except (OSError, UnicodeDecodeError) as err:
+            self.log.warning('Failed to read {}: {}'.format(md_path, err))
+            return None
+        try:
+            if markdown_math_re.search(md_text):
+                body, is_html = md_text, False
+            else:
+                body = self._markdown_renderer(md_text, relative_url_root)
+                is_html = True
+        except Exception as err:
+            self.log.warning('Failed to render {}, leaving it to browsers: '
+                             '{}'.format(md_path, err))
+            body, is_html = md_text, False
+        body = body.encode('utf-8')
+        with self._readme_lock:
+            self._readme_cache[key] = (
+                stat.st_mtime, stat.st_size, body, is_html)
+            self._readme_cache.move_to_end(key)
+            while len(self._readme_cache) > max(0, self.readme_cache_size):
+                self._readme_cache.popitem(last=False)
+        return body, is_html
+
+    async def render_readme_async(self, nbextension_dirs, path,
+                                  relative_url_root=None):
+        """Return a rendered readme, without blocking the loop."""
+        return await IOLoop.current().run_in_executor(
+            self._get_executor(), self.render_readme,
+            nbextension_dirs, path, relative_url_root)
+
+    def schedule_warm_up(self, get_nbextension_dirs):
+        """
+        Scan nbextensions directories in the background, after a delay.
+
+        get_nbextension_dirs is called once warm_up_delay seconds are up, to
+        return the directories to scan, as the server's nbextensions_path
+        may not be settled until it has started.
+        Must be called from the IOLoop's thread. The delay only starts once
+        the loop is running, so this never holds up server startup.
+        """
+        if self._loop is None:
+            self._loop = IOLoop.current()
+        self.cancel_warm_up()
+        self._warm_up_cancelled.clear()
+        self._warm_up_handle = self._loop.call_later(
+            max(0, self.warm_up_delay), self._start_warm_up,
+            get_nbextension_dirs)
+
+    def _start_warm_up(self, get_nbextension_dirs):
+        """Start the scheduled warm-up scan, if there's anything to scan."""
+        self._warm_up_handle = None
+        nbextension_dirs = get_nbextension_dirs()
+        if nbextension_dirs:
+            return self.warm_up_async(nbextension_dirs)
+
+    def cancel_warm_up(self):
+        """Cancel any scheduled or running warm-up scan."""
+        self._warm_up_cancelled.set()
+        if self._warm_up_handle is not None:
+            self._loop.remove_timeout(self._warm_up_handle)
+            self._warm_up_handle = None
+
+    def _warm_index(self, key):
+        """
+        Bring the descriptor index up to date for the directories in key.
+
+        Directories are scanned one at a time, checking for cancellation
+        between them, so as not to hold up shutdown or block requests for
+        long. Returns False if cancelled, True otherwise.
+        """
+        for root_dir in key:
+            if self._warm_up_cancelled.is_set():
+                return False
+            with self._index_lock:
+                get_configurable_nbextensions(
+                    nbextension_dirs=[root_dir], log=self.log,
+                    index_path=self.index_path or None,
+                    executor=self._get_parse_executor(),
+                    index=self._get_index(), shared_roots=self._shared_roots,
+                    **self.scan_options())
+        return True
+
+    async def warm_up_async(self, nbextension_dirs):
+        """Build the cached nbextensions list for nbextension_dirs."""
+        key = tuple(nbextension_dirs)
+        if self._get_fresh(key) is not None:
+            return
+        self.log.debug('Warming up nbextensions list for {}'.format(key))
+        start = time.time()
+        try:
+            warmed = await IOLoop.current().run_in_executor(
+                self._get_executor(), self._warm_index, key)
+            if not warmed or self._warm_up_cancelled.is_set():
+                self.log.debug('Warm-up scan cancelled')
+                return
+            await self.get_list_async(key)
+        except Exception as err:
+            self.log.warning('Warm-up scan failed: {}'.format(err))
+            return
+        self.log.debug('Warmed up nbextensions list in {:.3f}s'.format(
+            time.time() - start))
+
+    def close(self):
+        """
+        Cancel background work, and shut down the executors.
+
+        Any queued updates from watching are applied first, so that the saved
+        index is up to date for the next server to start.
+        """
+        self.cancel_warm_up()
+        if self._loop is not None:
+            pending, self._pending = self._pending, {}
+            self.stop_watching()
+            if pending:
+                try:
+                    self._apply_updates(pending, {})
+                except Exception:
+                    self.log.exception('Failed to update nbextensions index')
+        for executor in (self._executor, self._parse_executor):
+            if executor is not None:
+                executor.shutdown(wait=False)
+        self._executor = self._parse_executor = None
+
+    def start_watching(self, nbextension_dirs):
+        """
+        Watch nbextension_dirs for changes to their yaml descriptor files.
+
+        Must be called from the IOLoop's thread. Directories which don't
+        exist can't be watched.
+        """
+        if self._loop is None:
+            self._loop = IOLoop.current()
+        for root_dir in nbextension_dirs:
+            if root_dir in self._watched or not os.path.isdir(root_dir):
+                continue
+            if self._observer is None and self._poller is None:
+                try:
+                    from watchdog.observers import Observer
+                except ImportError:
+                    self.log.debug(
+                        'watchdog unavailable, polling nbextensions '
+                        'directories every {}s'.format(self.poll_interval))
+                    self._poller = PeriodicCallback(
+                        self._poll, self.poll_interval * 1000)
+                    self._poller.start()
+                else:
+                    self._observer = Observer()
+                    self._observer.daemon = True
+                    self._observer.start()
+            if self._observer is not None:
+                self._observer.schedule(
+                    _NBExtensionDirEventHandler(self, root_dir), root_dir,
+                    recursive=True)
+            self.log.debug('Watching {} for changes'.format(root_dir))
+            self._watched.add(root_dir)
+
+    def stop_watching(self):
+        """Stop watching all nbextensions directories."""
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+        if self._poller is not None:
+            self._poller.stop()
+            self._poller = None
+        if self._flush_handle is not None:
+            self._loop.remove_timeout(self._flush_handle)
+            self._flush_handle = None
+        self._watched.clear()
+        self._pending.clear()
+
+    def _poll(self):
+        """Queue rescans of all watched nbextensions directories."""
+        for root_dir in self._watched:
+            self._queue_update(root_dir)
+
+    def _queue_update(self, root_dir, yaml_relpath=None):
+        """
+        Queue an update of a watched directory's index.
+
+        If yaml_relpath is given, only that descriptor is updated, otherwise
+        the whole directory is rescanned. Updates are applied in batches, to
+        cope with bursts of changes, such as installing an nbextension.
+        Must be called from the IOLoop's thread.
+        """
+        if root_dir not in self._watched:
+            return
+        self._pending.setdefault(root_dir, set()).add(yaml_relpath)
+        if self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(
+                0.5, self._flush_updates)
+
+    async def _flush_updates(self):
+        """Apply queued updates, then update any affected cached lists."""
+        self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        previous = OrderedDict(
+            (key, entry) for key, entry in self._cache.items()
+            if not pending.keys().isdisjoint(key))
+        try:
+            entries = await self._loop.run_in_executor(
+                self._get_executor(), self._apply_updates, pending, previous)
+        except Exception:
+            self.log.exception('Failed to update nbextensions index')
+            self.invalidate()
+            return
+        for key, entry in entries.items():
+            if key in self._cache:
+                self._cache[key] = entry
+
+    def _apply_updates(self, pending, previous):
+        """
+        Update the descriptor index, and rebuild cache entries from it.
+
+        pending maps nbextensions directories to sets of descriptor paths to
+        update, where None in the set means the whole directory.
+        previous maps the keys of cache entries to rebuild to their current
+        entries. Returns a dict of the rebuilt entries for any lists which
+        changed.
+        """
+        changed = set()
+        scan_options = self.scan_options()
+        with self._index_lock:
+            index = self._get_index()
+            for root_dir, yaml_relpaths in pending.items():
+                old_root_index = index['roots'].get(root_dir)
+                if old_root_index is None or None in yaml_relpaths:
+                    root_index = _index_nbextension_dir(
+                        root_dir, root_index=old_root_index, log=self.log,
+                        executor=self._get_parse_executor(),
+                        trust_unchanged_dirs=root_dir in self._shared_roots,
+                        **scan_options)
+                    if root_index != old_root_index:
+                        index['roots'][root_dir] = root_index
+                        changed.add(root_dir)
+                    continue
+                for yaml_relpath in sorted(yaml_relpaths):
+                    if not _in_scan_scope(
+                            yaml_relpath, scan_options['exclude_dirs'],
+                            scan_options['include_files'],
+                            scan_options['max_depth']):
+                        continue
+                    if _reindex_nbextension_yaml(
+                            root_dir, yaml_relpath, old_root_index,
+                            log=self.log):
+                        self.log.debug('Updated index for {}'.format(
+                            os.path.join(root_dir, yaml_relpath)))
+                        changed.add(root_dir)
+            # full rescans also recheck the hashes of readmes & icons
+            rehashed = set(
+                root_dir for root_dir, yaml_relpaths in pending.items()
+                if None in yaml_relpaths)
+            if not (changed or rehashed):
+                return {}
+            if changed and self.index_path:
+                _save_nbextension_index(
+                    self.index_path, _without_roots(index, self._shared_roots),
+                    log=self.log)
+            unique_dirs = scan_options['follow_symlinks'] == 'unique'
+            entries = {}
+            for key, entry in previous.items():
+                if not changed.isdisjoint(key):
+                    extension_dict = _merge_nbextension_index(
+                        key, index, log=self.log, unique_dirs=unique_dirs)
+                    extension_list = self._add_asset_hashes(key, [
+                        val['extension'] for val in extension_dict.values()])
+                elif not rehashed.isdisjoint(key):
+                    extension_list = self._add_asset_hashes(
+                        key, entry['extensions'])
+                    if extension_list == entry['extensions']:
+                        continue
+                else:
+                    continue
+                entries[key] = self._make_entry(
+                    key, extension_list, self._get_dir_mtimes(key), entry)
+        return entries
+
+
+class _NBExtensionDirEventHandler(object):
+    """
+    watchdog event handler queueing updates for a watched nbextensions dir.
+
+    Called from the watchdog observer's thread, so hands events over to the
+    NBExtensionIndex's IOLoop.
+    """
+
+    def __init__(self, nbext_index, root_dir):
+        self.nbext_index = nbext_index
+        self.root_dir = root_dir
+
+    def dispatch(self, event):
+        if event.event_type not in (
+                'created', 'deleted', 'modified', 'moved', 'closed'):
+            return
+        nbext_index = self.nbext_index
+        exclude_dirs = nbext_index.exclude_dirs
+        paths = [event.src_path, getattr(event, 'dest_path', '')]
+        for path in filter(None, paths):
+            if isinstance(path, bytes):
+                path = path.decode(sys.getfilesystemencoding())
+            relpath = os.path.relpath(path, self.root_dir)
+            parts = relpath.split(os.sep)
+            if relpath.startswith(os.pardir) or any(
+                    _dir_matches(os.sep.join(parts[:ii]), exclude_dirs)
+                    for ii in range(1, len(parts))):
+                continue
+            if event.is_directory or event.event_type == 'moved':
+                # rescan for anything which may move whole subtrees
+                if event.event_type != 'modified' and not _dir_matches(
+                        relpath, exclude_dirs):
+                    self._queue(None)
+            elif _in_scan_scope(relpath, exclude_dirs,
+                                nbext_index.include_files,
+                                nbext_index.max_depth):
+                self._queue(relpath)
+            else:
+                # readmes & icons aren't indexed, but their hashes are
+                nbext_index._loop.add_callback(
+                    nbext_index._asset_changed, path)
+
+    def _queue(self, yaml_relpath):
+        self.nbext_index._loop.add_callback(
+            self.nbext_index._queue_update, self.root_dir, yaml_relpath)
+
+
 class NBExtensionHandlerJSON(APIHandler):
     """
     Returns a json list describing the configurable nbextensions.
 
+    The fields query argument, a comma-separated list of spec keys, limits
+    the specs to those keys, while summary=true limits them to the
+    SUMMARY_FIELDS.
+
     Based on part of notebook.services.config.handlers.ConfigHandler
     """
 
+    # the configurator's json endpoints all need read access to config,
+    # since they serve what the page needs to read & write nbextension
+    # config, and bootstrap serves the config itself
+    auth_resource = 'config'
+
     @APIHandler.log.getter
     def log(self):
         return ConfiguratorLogger(super(NBExtensionHandlerJSON, self).log)
 
+    def _get_fields(self):
+        """Return the spec fields requested, or an empty list for all."""
+        if self.get_argument('summary', 'false').lower() not in (
+                'false', '0', ''):
+            return SUMMARY_FIELDS
+        return [
+            field.strip() for field in
+            ','.join(self.get_arguments('fields')).split(',')
+            if field.strip()]
+
+    def _is_not_modified(self, last_modified):
+        """
+        Check the request's conditional headers against the list's validators.
+
+        The ETag header must already have been set. As in RFC 7232,
+        If-Modified-Since is only used in the absence of If-None-Match.
+        """
+        if 'If-None-Match' in self.request.headers:
+            return self.check_etag_header()
+        ims_value = self.request.headers.get('If-Modified-Since')
+        if ims_value is not None:
+            date_tuple = email.utils.parsedate_tz(ims_value)
+            if date_tuple is not None:
+                if_since = email.utils.mktime_tz(date_tuple)
+                return int(last_modified) <= if_since
+        return False
+
     @web.authenticated
+    @authorized
     @json_errors
-    def get(self):
+    async def get(self):
+        self.set_header("Content-Type", 'application/json')
+        nbapp_webapp = self.application
+        nbextension_dirs = nbapp_webapp.settings['nbextensions_path']
+        nbext_index = nbapp_webapp.settings['nbextensions_configurator_index']
+        entry = await nbext_index.get_list_async(
+            nbextension_dirs, self._get_fields())
+        self.set_header('Etag', entry['etag'])
+        self.set_header(
+            'Last-Modified', httputil.format_timestamp(entry['last_modified']))
+        # allow browsers to cache the list, but make them revalidate it
+        self.set_header('Cache-Control', 'no-cache')
+        if self._is_not_modified(entry['last_modified']):
+            self.set_status(304)
+            return self.finish()
+        self.finish(entry['json'])
+
+
+class NBExtensionBootstrapHandler(NBExtensionHandlerJSON):
+    """
+    Returns everything the configurator page needs to start up, as json.
+
+    That's an object with keys
+      - configs: an object mapping each of the CONFIG_SECTIONS to its config,
+        including the enabled state of nbextensions, and parameter values
+      - extensions: the nbextensions list, as for NBExtensionHandlerJSON,
+        with the same fields & summary query arguments
+      - search: an inverted index of the list, used by the page's filter,
+        as described for _build_search_index
+      - version: the version of the list, as for get_list_changes
+      - icons_hash: the hash identifying the list's icon bundle, as for
+        get_icon_bundle_hash, to fetch it from NBExtensionIconsHandler
+
+    If the since query argument gives the version of a list served earlier,
+    the extensions and search keys are replaced by changes, the changes to
+    the list since then, as returned by get_list_changes.
+    """
+
+    @web.authenticated
+    @authorized
+    @json_errors
+    async def get(self):
+        self.set_header("Content-Type", 'application/json')
+        nbapp_webapp = self.application
+        nbextension_dirs = nbapp_webapp.settings['nbextensions_path']
+        nbext_index = nbapp_webapp.settings['nbextensions_configurator_index']
+        entry = await nbext_index.get_list_async(nbextension_dirs)
+        fields = self._get_fields()
+        projected = nbext_index._project_entry(entry, fields)
+        changes = nbext_index.get_list_changes(
+            entry, self.get_argument('since', None), fields)
+        configs_json = _encode_json({
+            section_name: self.config_manager.get(section_name)
+            for section_name in CONFIG_SECTIONS})
+        # tornado sets an ETag from the content, and handles If-None-Match
+        self.set_header('Cache-Control', 'no-cache')
+        # the version is the full list's, so that it changes along with any
+        # field, not just those projected
+        version_json = _encode_json(entry['etag'].strip('"'))
+        icons_hash_json = _encode_json(nbext_index.get_icon_bundle_hash(entry))
+        if changes is not None:
+            self.finish(b''.join([
+                b'{"changes":', _encode_json(changes),
+                b',"configs":', configs_json,
+                b',"icons_hash":', icons_hash_json,
+                b',"version":', version_json, b'}']))
+            return
+        # splice in the already-encoded list, rather than re-encoding it
+        self.finish(b''.join([
+            b'{"configs":', configs_json,
+            b',"extensions":', projected['json'],
+            b',"icons_hash":', icons_hash_json,
+            b',"search":', nbext_index.get_search_index_json(entry),
+            b',"version":', version_json, b'}']))
+
+
+class NBExtensionIconsHandler(APIHandler):
+    """
+    Returns the icons of all the nbextensions as data uris, in a json object.
+
+    See NBExtensionIndex.get_icon_bundle. If the v query argument is the
+    bundle's current hash, browsers may cache the response for long.
+    """
+
+    # as for NBExtensionHandlerJSON
+    auth_resource = 'config'
+
+    @APIHandler.log.getter
+    def log(self):
+        return ConfiguratorLogger(super(NBExtensionIconsHandler, self).log)
+
+    @web.authenticated
+    @authorized
+    @json_errors
+    async def get(self):
+        self.set_header("Content-Type", 'application/json')
+        nbext_index = self.settings['nbextensions_configurator_index']
+        bundle_hash, bundle_json = await nbext_index.get_icon_bundle_async(
+            self.settings['nbextensions_path'])
+        if bundle_hash is not None and (
+                self.get_argument('v', '') == bundle_hash):
+            self.set_header(
+                'Cache-Control', 'max-age={}'.format(ASSET_CACHE_MAX_AGE))
+        else:
+            # tornado sets an ETag from the content, and handles If-None-Match
+            self.set_header('Cache-Control', 'no-cache')
+        self.finish(bundle_json)
+
+
+class NBExtensionDetailHandlerJSON(APIHandler):
+    """Returns json describing a single configurable nbextension."""
+
+    # as for NBExtensionHandlerJSON
+    auth_resource = 'config'
+
+    @APIHandler.log.getter
+    def log(self):
+        return ConfiguratorLogger(
+            super(NBExtensionDetailHandlerJSON, self).log)
+
+    @web.authenticated
+    @authorized
+    @json_errors
+    async def get(self, require):
         self.set_header("Content-Type", 'application/json')
         nbapp_webapp = self.application
         nbextension_dirs = nbapp_webapp.settings['nbextensions_path']
-        extension_list = get_configurable_nbextensions(
-            nbextension_dirs=nbextension_dirs, log=self.log)
-        self.finish(json.dumps(extension_list))
+        nbext_index = nbapp_webapp.settings['nbextensions_configurator_index']
+        extension = await nbext_index.get_extension_async(
+            nbextension_dirs, require)
+        if extension is None:
+            raise web.HTTPError(
+                404, 'no configurable nbextension {}'.format(require))
+        # tornado sets an ETag from the content, and handles If-None-Match
+        self.set_header('Cache-Control', 'no-cache')
+        self.finish(_encode_json(extension))
+
+
+class NBExtensionConfigHandler(APIHandler):
+    """
+    Reads & updates several frontend config sections in a single request.
+
+    GET returns an object mapping each section name to its config, for the
+    sections given in the comma-separated sections query argument, or the
+    CONFIG_SECTIONS by default.
+
+    PATCH takes an object mapping section names to updates, which are
+    applied to each section as for the PATCH method of the /api/config
+    handler, so null values remove keys. A section's update may also be a
+    list of updates, applied in order, as for several PATCH requests, since
+    some updates can't be merged into one (removing a key, then setting it
+    to an object, say). It returns the updated sections.
+    """
+
+    auth_resource = 'config'
+
+    @APIHandler.log.getter
+    def log(self):
+        return ConfiguratorLogger(super(NBExtensionConfigHandler, self).log)
+
+    def _check_section_names(self, section_names):
+        for section_name in section_names:
+            if not config_section_re.match(section_name):
+                raise web.HTTPError(
+                    400, 'invalid config section name {!r}'.format(
+                        section_name))
+
+    @web.authenticated
+    @authorized
+    @json_errors
+    def get(self):
+        section_names = [
+            name.strip() for name in
+            ','.join(self.get_arguments('sections')).split(',')
+            if name.strip()] or CONFIG_SECTIONS
+        self._check_section_names(section_names)
+        self.set_header("Content-Type", 'application/json')
+        self.finish(json.dumps({
+            section_name: self.config_manager.get(section_name)
+            for section_name in section_names}))
+
+    @web.authenticated
+    @authorized
+    @json_errors
+    def patch(self):
+        updates = self.get_json_body()
+        if isinstance(updates, dict):
+            updates = {
+                section_name: val if isinstance(val, list) else [val]
+                for section_name, val in updates.items()}
+        if not isinstance(updates, dict) or not all(
+                isinstance(update, dict)
+                for section_updates in updates.values()
+                for update in section_updates):
+            raise web.HTTPError(
+                400, 'body must map config section names to objects, or '
+                     'lists of objects')
+        self._check_section_names(updates)
+        sections = {}
+        for section_name, section_updates in updates.items():
+            data = None
+            for update in section_updates:
+                data = self.config_manager.update(section_name, update)
+            sections[section_name] = (
+                self.config_manager.get(section_name) if data is None
+                else data)
+        self.set_header("Content-Type", 'application/json')
+        self.finish(json.dumps(sections))
 
 
 class NBExtensionHandlerPage(JupyterHandler):
@@ -194,9 +2127,11 @@ class NBExtensionHandlerPage(JupyterHandler):
     @web.authenticated
     def get(self):
         """Render the nbextension configuration interface."""
+        nbext_index = self.settings['nbextensions_configurator_index']
         self.finish(self.render_template(
             'nbextensions_configurator.html',
             page_title='Nbextensions Configuration',
+            server_render_markdown=nbext_index.can_render_markdown(),
             **self.application.settings
         ))
 
@@ -209,21 +2144,137 @@ class RenderExtensionHandler(JupyterHandler):
         return ConfiguratorLogger(super(RenderExtensionHandler, self).log)
 
     @web.authenticated
-    def get(self, path):
+    async def get(self, path):
         """Render given markdown file."""
         if not path.endswith('.md'):
             # for all non-markdown items, we redirect to the actual file
             return self.redirect(self.base_url + path)
+        md_html = None
+        nbext_prefix = 'nbextensions/'
+        if path.startswith(nbext_prefix):
+            nbext_index = self.settings['nbextensions_configurator_index']
+            # make relative urls absolute, as browsers would resolve them
+            # relative to this page
+            relative_url_root = ujoin(
+                self.base_url, 'nbextensions', 'nbextensions_configurator',
+                'rendermd', url_escape(path))
+            rendered = await nbext_index.render_readme_async(
+                self.settings['nbextensions_path'], path[len(nbext_prefix):],
+                relative_url_root)
+            if rendered is not None and rendered[1]:
+                md_html = rendered[0]
         self.finish(self.render_template(
             'rendermd.html',
             md_url=path,
+            md_html=md_html and md_html.decode('utf-8'),
             page_title=path,
             **self.application.settings
         ))
 
 
+class RenderedReadmeHandler(JupyterHandler):
+    """
+    Returns markdown files in the nbextensions namespace as html.
+
+    Files which may contain math, or can't be rendered on the server, are
+    returned as markdown, with a text/markdown content type, for the browser
+    to render.
+    """
+
+    @JupyterHandler.log.getter
+    def log(self):
+        return ConfiguratorLogger(super(RenderedReadmeHandler, self).log)
+
+    @web.authenticated
+    async def get(self, path):
+        """Return the html for the given markdown file."""
+        nbext_index = self.settings['nbextensions_configurator_index']
+        if not (path.endswith('.md') and nbext_index.can_render_markdown()):
+            raise web.HTTPError(404)
+        relative_url_root = ujoin(
+            self.base_url, 'nbextensions', url_escape(path))
+        rendered = await nbext_index.render_readme_async(
+            self.settings['nbextensions_path'], path, relative_url_root)
+        if rendered is None:
+            raise web.HTTPError(404)
+        body, is_html = rendered
+        # markdown which failed to render is left to the browser
+        self.set_header('Content-Type', '{}; charset=UTF-8'.format(
+            'text/html' if is_html else 'text/markdown'))
+        # tornado sets an ETag from the content, and handles If-None-Match
+        if 'v' in self.request.arguments:
+            # a content hash, as for the nbextensions static file handler
+            self.set_header(
+                'Cache-Control', 'max-age={}'.format(ASSET_CACHE_MAX_AGE))
+        else:
+            self.set_header('Cache-Control', 'no-cache')
+        self.finish(body)
+
+
+class NBExtensionAssetHandler(FileFindHandler):
+    """
+    Serves readmes & icons from the nbextensions namespace.
+
+    Unlike the nbextensions static file handler, this lets browsers cache
+    responses for long, if the v query argument is the hash of the file's
+    contents, as added to the specs by NBExtensionIndex.
+    """
+
+    # cache search results separately from other FileFindHandlers, since
+    # they're shared by all subclasses which don't set their own
+    _static_paths = {}
+    _hash_matches = False
+
+    @JupyterHandler.log.getter
+    def log(self):
+        return ConfiguratorLogger(super(NBExtensionAssetHandler, self).log)
+
+    def initialize(self):
+        # nbextensions_path may be set after the server extension is loaded
+        super(NBExtensionAssetHandler, self).initialize(
+            self.settings['nbextensions_path'])
+
+    async def _check_hash(self, path):
+        """Find whether the v query argument is the file's hash."""
+        asset_hash = self.get_argument('v', '')
+        if asset_hash:
+            nbext_index = self.settings['nbextensions_configurator_index']
+            self._hash_matches = asset_hash == (
+                await nbext_index.get_asset_hash_async(
+                    self.settings['nbextensions_path'], path))
+
+    def _is_current(self):
+        """Return whether the v query argument is the file's hash."""
+        return self._hash_matches
+
+    def get_cache_time(self, path, modified, mime_type):
+        return ASSET_CACHE_MAX_AGE if self._is_current() else 0
+
+    def set_headers(self):
+        super(NBExtensionAssetHandler, self).set_headers()
+        if not self._is_current():
+            self.set_header('Cache-Control', 'no-cache')
+
+    @web.authenticated
+    async def get(self, path, include_body=True):
+        await self._check_hash(path)
+        await super(NBExtensionAssetHandler, self).get(path, include_body)
+
+    @web.authenticated
+    def head(self, path):
+        return super(NBExtensionAssetHandler, self).head(path)
+
+
 def load_jupyter_server_extension(nbapp):
     """Load and initialise the server extension."""
+    nbext_index = _load_configurator(nbapp)
+    # servers loading the extension from this function, rather than from
+    # its extension app, have no hook to call on shutdown
+    atexit.register(nbext_index.close)
+
+
+def _load_configurator(nbapp):
+    """Add the configurator to nbapp, returning its nbextensions index."""
     logger = ConfiguratorLogger(nbapp.log)
     logger.debug('Loading {}'.format(__version__))
     webapp = nbapp.web_app
@@ -239,6 +2290,18 @@ def load_jupyter_server_extension(nbapp):
 
     base_url = webapp.settings['base_url']
 
+    # cache nbextensions lists between requests, and persist the descriptor
+    # index between server restarts
+    nbext_index = NBExtensionIndex(parent=nbapp, log=logger)
+    logger.debug(
+        '  Using descriptor index file {}'.format(nbext_index.index_path))
+    webapp.settings['nbextensions_configurator_index'] = nbext_index
+    if nbext_index.warm_up:
+        logger.debug('  Scheduling warm-up scan in {}s'.format(
+            nbext_index.warm_up_delay))
+        nbext_index.schedule_warm_up(
+            lambda: webapp.settings.get('nbextensions_path'))
+
     # make sure our static files are available
     static_files_path = os.path.normpath(os.path.join(
         os.path.dirname(__file__), 'static'))
@@ -254,11 +2317,19 @@ def load_jupyter_server_extension(nbapp):
     new_handlers = [(ujoin(base_url, '/nbextensions/' + u), h) for u, h in [
         (r"?", NBExtensionHandlerPage),
         (r"nbextensions_configurator/list$", NBExtensionHandlerJSON),
+        (r"nbextensions_configurator/extension/(.*)",
+         NBExtensionDetailHandlerJSON),
         (r"nbextensions_configurator/rendermd/(.*)", RenderExtensionHandler),
+        (r"nbextensions_configurator/readme/(.*)", RenderedReadmeHandler),
+        (r"nbextensions_configurator/asset/(.*)", NBExtensionAssetHandler),
+        (r"nbextensions_configurator/icons$", NBExtensionIconsHandler),
+        (r"nbextensions_configurator/config$", NBExtensionConfigHandler),
+        (r"nbextensions_configurator/bootstrap$", NBExtensionBootstrapHandler),
     ]]
     webapp.add_handlers(".*$", new_handlers)
 
     logger.info('enabled {}'.format(__version__))
+    return nbext_index
 
 def _jupyter_nbextension_paths():
     return [
@@ -276,6 +2347,17 @@ def _jupyter_nbextension_paths():
         ),
     ]
 
+def _jupyter_server_extension_points():
+    # imported here, as only jupyter_server uses extension apps
+    from jupyter_nbextensions_configurator.extension_app import (
+        NBExtensionsConfiguratorApp,
+    )
+    return [{
+        'module': __name__,
+        'app': NBExtensionsConfiguratorApp,
+    }]
+
+
 def _jupyter_server_extension_paths():
     return [{
         'module': __name__
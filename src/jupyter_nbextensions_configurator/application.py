@@ -7,38 +7,89 @@
 from __future__ import print_function
 
 import copy
+import os
 import sys
+import time
 
-from jupyter_contrib_core.notebook_compat import nbextensions, serverextensions
+import jupyter_core.paths
+from jupyter_core.application import JupyterApp
+from traitlets import Bool, Unicode
 
-from jupyter_nbextensions_configurator import __version__
+from jupyter_nbextensions_configurator import (
+    INDEX_FILENAME, NBExtensionIndex, __version__,
+    _index_nbextension_dir, _load_nbextension_index,
+    _merge_nbextension_index, build_shared_nbextension_index,
+    get_configurable_nbextensions,
+)
 
 
-class ToggleJupyterNbextensionsConfiguratorApp(
-        serverextensions.ToggleServerExtensionApp):
-    """App to toggle server extension jupyter_nbextensions_configurator."""
+def _check_conflicting_flags(argv):
+    """Raise ArgumentConflict if argv has more than one location flag."""
+    conflicting_flags = set(['--user', '--system', '--sys-prefix'])
+
+    if len(conflicting_flags.intersection(set(argv or []))) > 1:
+        # notebook_compat imports notebook, so only import it when needed
+        from jupyter_contrib_core.notebook_compat.serverextensions import (
+            ArgumentConflict,
+        )
+        raise ArgumentConflict(
+            'cannot specify more than one of user, sys_prefix, or system')
+
+
+class BaseConfiguratorApp(JupyterApp):
+    """
+    Base app for the jupyter_nbextensions_configurator commands.
 
-    flags = copy.deepcopy(serverextensions.ToggleServerExtensionApp.flags)
-    flags['sys-prefix'] = ({
-        'ToggleServerExtensionApp': {
-            'sys_prefix': True,
-            'user': False,
-        }},
-        'Use sys.prefix as the prefix for configuring the server extension')
-    for f in ('py', 'python'):
+    Like notebook's BaseExtensionApp, but jupyter_contrib_core.notebook_compat,
+    which imports notebook, is only imported by the commands which use it.
+    """
+
+    version = __version__
+    flags = copy.deepcopy(JupyterApp.flags)
+    for f in ('y', 'generate-config'):
         flags.pop(f, None)
 
+    user = Bool(False, config=True, help='Whether to do a user install')
+    sys_prefix = Bool(
+        False, config=True, help='Use the sys.prefix as the prefix')
+
+    def _log_format_default(self):
+        """A default format for messages"""
+        return '%(message)s'
+
+
+class ToggleJupyterNbextensionsConfiguratorApp(BaseConfiguratorApp):
+    """App to toggle server extension jupyter_nbextensions_configurator."""
+
+    flags = copy.deepcopy(BaseConfiguratorApp.flags)
+    flags.update({
+        'user': ({
+            'ToggleJupyterNbextensionsConfiguratorApp': {
+                'user': True,
+            }}, 'Perform the operation for the current user'),
+        'system': ({
+            'ToggleJupyterNbextensionsConfiguratorApp': {
+                'user': False,
+                'sys_prefix': False,
+            }}, 'Perform the operation system-wide'),
+        'sys-prefix': ({
+            'ToggleJupyterNbextensionsConfiguratorApp': {
+                'sys_prefix': True,
+                'user': False,
+            }},
+            'Use sys.prefix as the prefix for configuring the server '
+            'extension'),
+    })
+
+    user = Bool(True, config=True, help='Whether to do a user install')
+
     def parse_command_line(self, argv=None):
         """
         Overriden to check for conflicting flags
 
         Since notebook version doesn't do it well (or, indeed, at all)
         """
-        conflicting_flags = set(['--user', '--system', '--sys-prefix'])
-
-        if len(conflicting_flags.intersection(set(argv))) > 1:
-            raise serverextensions.ArgumentConflict(
-                'cannot specify more than one of user, sys_prefix, or system')
+        _check_conflicting_flags(argv)
         return super(ToggleJupyterNbextensionsConfiguratorApp,
                      self).parse_command_line(argv)
 
@@ -62,8 +113,13 @@ Usage
         if self.extra_args:
             sys.exit('{} takes no extra arguments'.format(self.name))
         else:
-            self.toggle_server_extension_python(
-                'jupyter_nbextensions_configurator')
+            from jupyter_contrib_core.notebook_compat import (
+                nbextensions, serverextensions,
+            )
+            serverextensions.toggle_serverextension_python(
+                'jupyter_nbextensions_configurator', self._toggle_value,
+                parent=self, user=self.user, sys_prefix=self.sys_prefix,
+                logger=self.log)
             nbexts = [
                 ('notebook', 'nbextensions_configurator/config_menu/main'),
                 ('tree', 'nbextensions_configurator/tree_tab/main'),
@@ -91,7 +147,226 @@ class DisableJupyterNbextensionsConfiguratorApp(
     _toggle_value = False
 
 
-class JupyterNbextensionsConfiguratorApp(nbextensions.BaseNBExtensionApp):
+class BaseIndexApp(BaseConfiguratorApp):
+    """
+    Base app for commands acting on a descriptor index.
+
+    Subclasses define run(nbextension_dirs, index_path), which start calls
+    to act on the index at index_path, for nbextension_dirs.
+    """
+
+    flags = {
+        'debug': BaseConfiguratorApp.flags['debug'],
+        'user': ({'BaseIndexApp': {'user': True, 'sys_prefix': False}},
+                 'Index all nbextensions directories into the user\'s '
+                 'index, in the jupyter runtime directory (the default)'),
+        'sys-prefix': ({'BaseIndexApp': {'user': False, 'sys_prefix': True}},
+                       'Index the sys.prefix & system-wide nbextensions '
+                       'directories into a shared index in sys.prefix'),
+        'system': ({'BaseIndexApp': {'user': False, 'sys_prefix': False}},
+                   'Index the system-wide nbextensions directories into a '
+                   'shared index in the system-wide data directory'),
+    }
+    aliases = {'index-path': 'BaseIndexApp.index_path'}
+    classes = [NBExtensionIndex]
+
+    user = Bool(True, config=True, help='Whether to use the user\'s index')
+    index_path = Unicode(
+        '', config=True,
+        help='Path of the index file, overriding the one implied by the '
+             '--user, --sys-prefix or --system flags.')
+
+    def parse_command_line(self, argv=None):
+        """Overriden to check for conflicting flags."""
+        _check_conflicting_flags(argv)
+        return super(BaseIndexApp, self).parse_command_line(argv)
+
+    def get_nbextension_dirs(self):
+        """Return the nbextensions directories covered by the index."""
+        system_dirs = [os.path.join(path, 'nbextensions')
+                       for path in jupyter_core.paths.SYSTEM_JUPYTER_PATH]
+        if self.user:
+            # as the server sees them, including this package's own
+            static_dir = os.path.normpath(os.path.join(
+                os.path.dirname(__file__), 'static'))
+            return jupyter_core.paths.jupyter_path('nbextensions') + [
+                static_dir]
+        elif self.sys_prefix:
+            return [os.path.join(path, 'nbextensions')
+                    for path in jupyter_core.paths.ENV_JUPYTER_PATH
+                    ] + system_dirs
+        return system_dirs
+
+    def get_index_path(self):
+        """Return the path of the index file."""
+        if self.index_path:
+            return self.index_path
+        elif self.user:
+            return self.nbext_index.index_path
+        elif self.sys_prefix:
+            return os.path.join(
+                jupyter_core.paths.ENV_JUPYTER_PATH[0], INDEX_FILENAME)
+        return os.path.join(
+            jupyter_core.paths.SYSTEM_JUPYTER_PATH[0], INDEX_FILENAME)
+
+    def start(self):
+        """Perform the App's actions as configured."""
+        if self.extra_args:
+            sys.exit('{} takes no extra arguments'.format(self.name))
+        # scan as configured for the server, e.g. --NBExtensionIndex.max_depth
+        self.nbext_index = NBExtensionIndex(parent=self)
+        self.scan_options = self.nbext_index.scan_options()
+        self.run(self.get_nbextension_dirs(), self.get_index_path())
+
+
+class BuildIndexApp(BaseIndexApp):
+    """App to build a descriptor index."""
+
+    name = 'jupyter nbextensions_configurator index build'
+    description = """
+Scan nbextensions directories, writing their descriptor index.
+
+Usage
+    jupyter nbextensions_configurator index build
+        [--system|--sys-prefix|--user] [--index-path=<path>]
+
+The index is written atomically, so servers never load a partial one.
+A --sys-prefix or --system index should be rebuilt after installing or
+upgrading nbextensions, and is used by servers whose
+NBExtensionIndex.shared_index_path points at it.
+"""
+
+    def run(self, nbextension_dirs, index_path):
+        written = build_shared_nbextension_index(
+            index_path=index_path, nbextension_dirs=nbextension_dirs,
+            log=self.log, **self.scan_options)
+        if written is None:
+            sys.exit('Failed to write descriptor index {}'.format(index_path))
+        self.log.info('Wrote descriptor index {}'.format(written))
+
+
+class VerifyIndexApp(BaseIndexApp):
+    """App to check a descriptor index is up to date."""
+
+    name = 'jupyter nbextensions_configurator index verify'
+    description = """
+Check a descriptor index against the nbextensions directories it covers.
+
+Usage
+    jupyter nbextensions_configurator index verify
+        [--system|--sys-prefix|--user] [--index-path=<path>]
+
+Reports any stale entries, exiting with a non-zero status if there are any.
+"""
+
+    def run(self, nbextension_dirs, index_path):
+        index = _load_nbextension_index(index_path, log=self.log)
+        stale = []
+        for root_dir in nbextension_dirs:
+            root_index = index['roots'].get(root_dir)
+            if root_index is None:
+                if os.path.isdir(root_dir):
+                    stale.append('{} is not indexed'.format(root_dir))
+                continue
+            saved_files = root_index['files']
+            fresh_files = _index_nbextension_dir(
+                root_dir, log=self.log, **self.scan_options)['files']
+            for yaml_relpath in sorted(set(saved_files) | set(fresh_files)):
+                yaml_path = os.path.join(root_dir, yaml_relpath)
+                if yaml_relpath not in saved_files:
+                    stale.append('{} is not indexed'.format(yaml_path))
+                elif yaml_relpath not in fresh_files:
+                    stale.append('{} no longer exists'.format(yaml_path))
+                elif saved_files[yaml_relpath] != fresh_files[yaml_relpath]:
+                    stale.append('{} has changed'.format(yaml_path))
+        for msg in stale:
+            self.log.warning(msg)
+        if stale:
+            sys.exit('Descriptor index {} has {} stale entries'.format(
+                index_path, len(stale)))
+        self.log.info('Descriptor index {} is up to date'.format(index_path))
+
+
+class IndexStatsApp(BaseIndexApp):
+    """App to report on nbextension descriptor discovery."""
+
+    name = 'jupyter nbextensions_configurator index stats'
+    description = """
+Report scan timings, file counts and duplicate nbextensions.
+
+Usage
+    jupyter nbextensions_configurator index stats
+        [--system|--sys-prefix|--user] [--index-path=<path>]
+
+Times a full scan of the nbextensions directories, and a scan using the
+descriptor index, without writing to the index.
+"""
+
+    def run(self, nbextension_dirs, index_path):
+        start = time.time()
+        fresh = {'roots': {}}
+        for root_dir in nbextension_dirs:
+            fresh['roots'][root_dir] = _index_nbextension_dir(
+                root_dir, **self.scan_options)
+        full_time = time.time() - start
+
+        index = _load_nbextension_index(index_path, log=self.log)
+        num_indexed = len(set(index['roots']) & set(nbextension_dirs))
+        start = time.time()
+        get_configurable_nbextensions(
+            nbextension_dirs, index=index, **self.scan_options)
+        indexed_time = time.time() - start
+
+        num_dirs = num_files = num_valid = 0
+        requires = {}
+        for root_dir, root_index in fresh['roots'].items():
+            num_dirs += len(root_index['dirs'])
+            for yaml_relpath, entry in root_index['files'].items():
+                num_files += 1
+                if entry['spec'] is not None:
+                    num_valid += 1
+                    requires.setdefault(entry['spec']['require'], []).append(
+                        os.path.join(root_dir, yaml_relpath))
+        num_unique = len(_merge_nbextension_index(
+            nbextension_dirs, fresh,
+            unique_dirs=self.scan_options['follow_symlinks'] == 'unique'))
+
+        print('index file:           {} ({} of {} roots indexed)'.format(
+            index_path, num_indexed, len(nbextension_dirs)))
+        print('directories scanned:  {}'.format(num_dirs))
+        print('yaml files:           {}'.format(num_files))
+        print('valid descriptors:    {}'.format(num_valid))
+        print('unique nbextensions:  {}'.format(num_unique))
+        print('full scan time:       {:.3f}s'.format(full_time))
+        print('indexed scan time:    {:.3f}s'.format(indexed_time))
+        duplicates = {require: paths for require, paths in requires.items()
+                      if len(paths) > 1}
+        print('duplicates:           {}'.format(len(duplicates)))
+        for require, paths in sorted(duplicates.items()):
+            print('  {}'.format(require))
+            for path in paths:
+                print('    {}'.format(path))
+
+
+class IndexApp(BaseConfiguratorApp):
+    """App grouping the descriptor index commands."""
+
+    name = 'jupyter nbextensions_configurator index'
+    description = 'Build, verify or report on an nbextension descriptor index'
+    subcommands = dict(
+        build=(BuildIndexApp, 'Write a descriptor index.'),
+        verify=(VerifyIndexApp, 'Check a descriptor index is up to date.'),
+        stats=(IndexStatsApp, 'Report scan timings, counts and duplicates.'),
+    )
+
+    def start(self):
+        """Perform the App's actions as configured"""
+        super(IndexApp, self).start()
+        subcmds = ", ".join(sorted(self.subcommands))
+        sys.exit("Please supply at least one subcommand: %s" % subcmds)
+
+
+class JupyterNbextensionsConfiguratorApp(BaseConfiguratorApp):
     """Root level jupyter_nbextensions_configurator app."""
 
     name = 'jupyter nbextensions_configurator'
@@ -106,10 +381,14 @@ class JupyterNbextensionsConfiguratorApp(nbextensions.BaseNBExtensionApp):
         disable=(
             DisableJupyterNbextensionsConfiguratorApp,
             'Disable the jupyter_nbextensions_configurator server extension.'),
+        index=(
+            IndexApp,
+            'Build, verify or report on the nbextension descriptor index.'),
     )
     examples = '\n'.join([
         'jupyter nbextensions_configurator enable  # Enable the jupyter_nbextensions_configurator server extension.',  # noqa
         'jupyter nbextensions_configurator disable # Disable the jupyter_nbextensions_configurator server extension.',  # noqa
+        'jupyter nbextensions_configurator index build --sys-prefix # Index the nbextensions shared by all users.',  # noqa
     ])
 
     def start(self):
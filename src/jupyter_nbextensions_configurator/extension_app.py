@@ -0,0 +1,30 @@
+# coding: utf-8
+"""
+Extension app loading the configurator server extension in jupyter_server.
+
+jupyter_server only calls a shutdown hook for extensions provided as
+ExtensionApps, so this loads the extension as the module-level
+load_jupyter_server_extension does, and closes its nbextensions index in
+stop_extension.
+"""
+
+from __future__ import unicode_literals
+
+from jupyter_server.extension.application import ExtensionApp
+
+from jupyter_nbextensions_configurator import _load_configurator
+
+
+class NBExtensionsConfiguratorApp(ExtensionApp):
+    """Server extension app for the nbextensions configurator."""
+
+    name = 'jupyter_nbextensions_configurator'
+    load_other_extensions = True
+
+    def initialize_handlers(self):
+        """Add the configurator's handlers & settings to the server."""
+        self.nbext_index = _load_configurator(self.serverapp)
+
+    async def stop_extension(self):
+        """Stop any scan, file watching & executors of the index."""
+        self.nbext_index.close()
@@ -30,6 +30,28 @@ define([
     var first_load_done = false; // flag used to not push history on first load
     var extensions_dict = {}; // dictionary storing nbextensions by their 'require' value
     var filter_timeout_id = null; // timeout ref used to prevent lots of consecutive requests
+    var last_bootstrap; // the last bootstrap response, reused when the server says it's unchanged
+    var last_configs_json; // the configs from the last bootstrap response, as json
+    var list_version; // version of the nbextensions list in the page, used to fetch changes to it
+    var selector_extensions = []; // nbextensions in the order of their selector links
+    var selector_links_rendered = 0; // how many of those links are in the page
+    var selector_batch_size = 60; // how many links to add to the page at once
+    var selector_observer = null; // adds more links as the selector is scrolled
+    var selector_hide_incompat = true; // whether incompatible links are disabled
+    var selected_extension; // the nbextension whose ui is open
+    var readme_prefetch_count = 10; // how many visible nbextensions' readmes to fetch in advance
+    var readme_prefetch_handle = null; // ref for the idle callback used to prefetch readmes
+    var icon_bundle = {}; // icons as data uris, by nbextension require
+    var icon_bundle_hash = null; // hash of the icon bundle loaded or loading
+    // inverted index used by the filter, mapping words, sections & tags to
+    // sets of nbextension requires. See search_index_build
+    var search_index = new_search_index();
+    var search_word_cache = Object.create(null); // matches for filter words typed so far
+    // separates words in the filter & search index, same as the server's
+    var search_split_re = /[\s!-\/:-@\[-^`{-~]+/;
+    // spec fields fetched for the whole list. The rest are fetched for each
+    // nbextension when its ui is first opened
+    var list_fields = ['Name', 'Section', 'Compatibility', 'Description', 'tags', 'readme', 'readme_hash'];
 
     /**
      * function for comparing arbitrary version numbers, taken from
@@ -60,6 +82,32 @@ define([
         'common'   : new configmod.ConfigSection('common', {base_url: base_url}),
     };
 
+    // config updates waiting to be written to the server, by section, each a
+    // list of updates to apply in order. See queue_config_update
+    var pending_config_updates = {};
+    // the scheduled write of pending_config_updates, or null
+    var pending_config_flush = null;
+    // promise for the most recent write of config updates
+    var pending_config_write = Promise.resolve();
+    // number of config update requests awaiting a response
+    var config_writes_in_flight = 0;
+    // milliseconds to wait for further config updates before writing them
+    var config_write_delay = 500;
+    // maximum milliseconds for which to delay writing a config update
+    var config_write_max_delay = 2000;
+    // don't lose config updates still waiting to be written on navigation
+    window.addEventListener('pagehide', flush_config_updates_on_unload);
+    window.addEventListener('beforeunload', flush_config_updates_on_unload);
+
+    /**
+     * url of the configurator's endpoint for reading & writing several
+     * config sections at once
+     */
+    function configs_api_url () {
+        return utils.url_path_join(
+            base_url, 'nbextensions/nbextensions_configurator/config');
+    }
+
     // tags used to filter visible nbextensions
     var tags = [];
 
@@ -105,13 +153,217 @@ define([
         return obj;
     }
 
+    /**
+     * apply a config update to config data in place, as the server does:
+     * null values remove keys, objects are merged recursively, with any left
+     * empty removed, and other values (including arrays) replace those in
+     * the data.
+     */
+    function apply_config_update (data, update) {
+        for (var key in update) {
+            if ($.isPlainObject(update[key])) {
+                if (!$.isPlainObject(data[key])) {
+                    data[key] = {};
+                }
+                apply_config_update(data[key], update[key]);
+                if ($.isEmptyObject(data[key])) {
+                    delete data[key];
+                }
+            }
+            else if (update[key] === null) {
+                delete data[key];
+            }
+            else {
+                data[key] = update[key];
+            }
+        }
+        return data;
+    }
+
+    /**
+     * return whether merging a config update into an earlier one, using
+     * merge_config_update, is equivalent to applying them in turn. It isn't
+     * where the later update sets an object at a key which the earlier one
+     * removes or sets to some other value, since the object would then be
+     * merged with, rather than replace, the existing data.
+     */
+    function can_merge_config_update (target, update) {
+        for (var key in update) {
+            if ($.isPlainObject(update[key]) && target.hasOwnProperty(key) &&
+                    !($.isPlainObject(target[key]) && can_merge_config_update(target[key], update[key]))) {
+                return false;
+            }
+        }
+        return true;
+    }
+
+    /**
+     * recursively merge a config update into an earlier one. Unlike
+     * $.extend, arrays in the update replace those in the target, rather
+     * than being merged with them, and null values are kept, so that they
+     * still remove keys.
+     */
+    function merge_config_update (target, update) {
+        for (var key in update) {
+            if ($.isPlainObject(update[key]) && $.isPlainObject(target[key])) {
+                merge_config_update(target[key], update[key]);
+            }
+            else {
+                target[key] = $.isPlainObject(update[key]) ? merge_config_update({}, update[key]) : update[key];
+            }
+        }
+        return target;
+    }
+
+    /**
+     * Show or hide the indicator for config updates not yet written
+     */
+    function update_config_pending_indicator () {
+        var pending = (pending_config_flush !== null) || (config_writes_in_flight > 0);
+        $('.nbext-config-pending').toggle(pending);
+    }
+
+    /**
+     * Write any queued config updates to the server now, rather than waiting
+     * for more updates to coalesce with them.
+     *
+     * @return a promise, resolved once the updates have been written
+     */
+    function flush_config_updates () {
+        if (pending_config_flush !== null) {
+            clearTimeout(pending_config_flush.timeout_id);
+            pending_config_flush.resolve();
+        }
+        return pending_config_write;
+    }
+
+    /**
+     * Write any queued config updates as the page unloads. Since the page
+     * won't be around to handle a response, use a keepalive fetch where
+     * supported, otherwise a synchronous request.
+     */
+    function flush_config_updates_on_unload () {
+        if (pending_config_flush === null) {
+            return;
+        }
+        clearTimeout(pending_config_flush.timeout_id);
+        var body = JSON.stringify(pending_config_updates);
+        pending_config_updates = {};
+        pending_config_flush.resolve();
+        if (window.fetch !== undefined) {
+            var headers = {'Content-Type': 'application/json'};
+            var xsrf_token = document.cookie.match('\\b_xsrf=([^;]*)\\b');
+            if (xsrf_token) {
+                headers['X-XSRFToken'] = xsrf_token[1];
+            }
+            window.fetch(configs_api_url(), {
+                method: 'PATCH',
+                body: body,
+                headers: headers,
+                credentials: 'same-origin',
+                keepalive: true,
+            });
+        }
+        else {
+            utils.ajax(configs_api_url(), {
+                async: false,
+                processData: false,
+                type : "PATCH",
+                data: body,
+                contentType: 'application/json',
+            });
+        }
+    }
+
+    /**
+     * Queue an update to a config section. Update the local data
+     * immediately, and once no more updates have been queued for
+     * config_write_delay milliseconds, send all of the queued updates to the
+     * server at once, in a single request to the configurator's config
+     * endpoint. Once written, use the updated data from the server.
+     *
+     * @param {string} section - the name of the config section to update
+     * @param {Object} update - the changes to make. null removes a key
+     * @return a promise, resolved once the update has been written
+     */
+    function queue_config_update (section, update) {
+        apply_config_update(configs[section].data, update);
+        // coalesce with the last queued update, unless that would change
+        // the result of applying them
+        var section_updates = pending_config_updates[section] = pending_config_updates[section] || [];
+        var last_update = section_updates[section_updates.length - 1];
+        if (last_update !== undefined && can_merge_config_update(last_update, update)) {
+            merge_config_update(last_update, update);
+        }
+        else {
+            section_updates.push(merge_config_update({}, update));
+        }
+        var now = Date.now();
+        if (pending_config_flush === null) {
+            var flush = pending_config_flush = {first_queued: now};
+            var flushed = new Promise(function (resolve) {
+                flush.resolve = function () {
+                    if (pending_config_flush === flush) {
+                        pending_config_flush = null;
+                    }
+                    resolve();
+                };
+            });
+            // chain writes, so that they reach the server in order
+            pending_config_write = Promise.all([flushed, pending_config_write.catch(function () {})]).then(function () {
+                var updates = pending_config_updates;
+                pending_config_updates = {};
+                if ($.isEmptyObject(updates)) {
+                    // already written by flush_config_updates_on_unload
+                    return {};
+                }
+                config_writes_in_flight++;
+                return utils.promising_ajax(configs_api_url(), {
+                    processData: false,
+                    type : "PATCH",
+                    data: JSON.stringify(updates),
+                    dataType : "json",
+                    contentType: 'application/json',
+                }).then(function (data) {
+                    for (var sect in data) {
+                        if (configs[sect] !== undefined) {
+                            // keep any updates queued since this write
+                            var queued = pending_config_updates[sect] || [];
+                            for (var ii = 0; ii < queued.length; ii++) {
+                                apply_config_update(data[sect], queued[ii]);
+                            }
+                            configs[sect].data = data[sect];
+                        }
+                    }
+                    config_writes_in_flight--;
+                    update_config_pending_indicator();
+                    return data;
+                }, function (err) {
+                    config_writes_in_flight--;
+                    update_config_pending_indicator();
+                    throw err;
+                });
+            });
+        }
+        else {
+            clearTimeout(pending_config_flush.timeout_id);
+        }
+        // wait for a pause in updates, but not indefinitely
+        var delay = Math.max(0, Math.min(
+            config_write_delay,
+            pending_config_flush.first_queued + config_write_max_delay - now));
+        pending_config_flush.timeout_id = setTimeout(pending_config_flush.resolve, delay);
+        update_config_pending_indicator();
+        return pending_config_write;
+    }
+
     /**
      * update the value for a dot-notation key in a given ConfigSection object
      *
      * @param {ConfigSection} conf - the config section to update
      * @param {string} key - the (dot-notation) key to update the value of
      * @param value - the new value to set. null results in removal of the key
-     * @return - the return value of the ConfigSection.update call
+     * @return - a promise, resolved once the update has been written
      */
     function conf_dot_update (conf, key, value) {
         key = key.split('.');
@@ -121,7 +373,7 @@ define([
             curr = curr[key.shift()] = {};
         }
         curr[key.shift()] = value;
-        return conf.update(root);
+        return queue_config_update(conf.section_name, root);
     }
 
     /**
@@ -131,7 +383,10 @@ define([
      * @param {string[]} dotted_keys - the (dot-notation) keys to remove
      */
     function conf_dot_delete_keys(conf, dotted_keys) {
-        return conf.load().then(function (data) {
+        // write queued updates first, so they don't overwrite the deletions
+        return flush_config_updates().catch(function () {}).then(function () {
+            return conf.load();
+        }).then(function (data) {
             for (var ii = 0; ii < dotted_keys.length; ii++) {
                 var obj = data;
                 var key_parts = dotted_keys[ii].split('.');
@@ -173,7 +428,7 @@ define([
         }
         var to_load = {};
         to_load[extension.require] = state;
-        configs[extension.Section].update({load_extensions: to_load});
+        queue_config_update(extension.Section, {load_extensions: to_load});
     }
 
     /**
@@ -198,7 +453,10 @@ define([
     function set_buttons_enabled (extension, state) {
         state = (state === true);
 
-        extension.selector_link.find('.nbext-enable-toggle').toggleClass('nbext-enabled', state);
+        extension.is_enabled = state;
+        if (extension.selector_link !== undefined) {
+            extension.selector_link.find('.nbext-enable-toggle').toggleClass('nbext-enabled', state);
+        }
 
         var btns = $(extension.ui).find('.nbext-enable-btns').children();
         btns.eq(0)
@@ -517,15 +775,142 @@ define([
      * show/hide compatibility text, along with en/disabling the nav link
      */
     function set_hide_incompat (hide_incompat) {
+        selector_hide_incompat = hide_incompat;
         $('.nbext-compat-div').toggle(!hide_incompat);
-        $('.nbext-selector .nbext-incompatible')
+        // links which haven't been built yet are disabled as they're built
+        $(selector_extensions.filter(function (ext) {
+            return ext.selector_link !== undefined && !ext.is_compatible;
+        }).map(function (ext) {
+            return ext.selector_link[0].parentNode;
+        }))
             .toggleClass('disabled', hide_incompat)
             .attr('title', hide_incompat ? 'possibly incompatible' : '');
         set_input_value($('#nbext_hide_incompat'), hide_incompat);
 
-        var selector = $('.nbext-selector');
-        if (selector.find('li.active').first().hasClass('disabled')) {
-            selector.find('li:not(.disabled):visible a').first().click();
+        if (selected_extension !== undefined && selected_extension.selector_link.parent().hasClass('disabled')) {
+            $('.nbext-selector').find('li:not(.disabled):visible a').first().click();
+        }
+    }
+
+    /**
+     * Return the url for a file in the nbextensions namespace. Given a hash
+     * of its contents from the server, that's a url browsers may cache for
+     * long, from the configurator's asset handler.
+     */
+    function get_asset_url (path, hash) {
+        if (!hash) {
+            return utils.url_path_join(base_url, 'nbextensions', utils.encode_uri_components(path));
+        }
+        return utils.url_path_join(
+            base_url, 'nbextensions/nbextensions_configurator/asset',
+            utils.encode_uri_components(path)) + '?v=' + encodeURIComponent(hash);
+    }
+
+    /**
+     * Load the server's bundle of all nbextensions' icons, as data uris, if
+     * the given hash says it differs from the one already loaded
+     */
+    function load_icon_bundle (hash) {
+        if (!hash || hash === icon_bundle_hash) {
+            return;
+        }
+        icon_bundle_hash = hash;
+        var api_url = utils.url_path_join(
+            base_url, 'nbextensions/nbextensions_configurator/icons') +
+            '?v=' + encodeURIComponent(hash);
+        utils.promising_ajax(api_url, {
+            type: "GET",
+            dataType: "json",
+        }).then(function (bundle) {
+            if (hash === icon_bundle_hash) {
+                icon_bundle = bundle;
+            }
+        }).catch(function (err) {
+            // icons are loaded individually instead
+            console.warn(log_prefix, 'error loading icon bundle', err);
+            if (hash === icon_bundle_hash) {
+                icon_bundle_hash = null;
+            }
+        });
+    }
+
+    /**
+     * Return whether the nbextension's readme is a markdown file which can be
+     * rendered in the page, rather than just linked to
+     */
+    function readme_is_markdown (extension) {
+        var url = extension.readme;
+        return url !== undefined && !/^(f|ht)tps?:\/\//i.test(url) && utils.splitext(url)[1] === '.md';
+    }
+
+    /**
+     * Fetch the nbextension's markdown readme, or its html if the server
+     * renders markdown. Returns a promise for an object with keys contents
+     * and is_html, which is kept on the extension object, so that each readme
+     * is only fetched once. The server returns markdown which it couldn't
+     * render as is, for the browser to render.
+     */
+    function fetch_readme (extension) {
+        if (extension.readme_loading === undefined) {
+            var url = get_asset_url(extension.readme, extension.readme_hash);
+            if (utils.get_body_data('serverRenderMarkdown') === 'true') {
+                url = utils.url_path_join(
+                    base_url, 'nbextensions/nbextensions_configurator/readme',
+                    utils.encode_uri_components(extension.readme));
+                if (extension.readme_hash) {
+                    url += '?v=' + encodeURIComponent(extension.readme_hash);
+                }
+            }
+            extension.readme_loading = new Promise(function (resolve, reject) {
+                $.ajax({
+                    url: url,
+                    dataType: 'text',
+                    success: function (contents, textStatus, jqXHR) {
+                        resolve({
+                            contents: contents,
+                            is_html: /^text\/html\b/i.test(jqXHR.getResponseHeader('Content-Type') || '')
+                        });
+                    },
+                    error: function (jqXHR, textStatus, errorThrown) {
+                        // allow trying again later
+                        delete extension.readme_loading;
+                        reject({jqXHR: jqXHR, textStatus: textStatus, errorThrown: errorThrown});
+                    }
+                });
+            });
+        }
+        return extension.readme_loading;
+    }
+
+    /**
+     * When the browser is next idle, fetch the readmes of the first few
+     * visible nbextensions, so that they show immediately when selected
+     */
+    function schedule_readme_prefetch () {
+        if (readme_prefetch_handle !== null) {
+            if (window.cancelIdleCallback !== undefined) {
+                window.cancelIdleCallback(readme_prefetch_handle);
+            }
+            else {
+                clearTimeout(readme_prefetch_handle);
+            }
+        }
+        var prefetch = function () {
+            readme_prefetch_handle = null;
+            var count = 0;
+            for (var ii = 0; ii < selector_extensions.length && count < readme_prefetch_count; ii++) {
+                var extension = selector_extensions[ii];
+                if (extension.filter_visible && readme_is_markdown(extension)) {
+                    count++;
+                    fetch_readme(extension).catch(function () {});
+                }
+            }
+        };
+        if (window.requestIdleCallback !== undefined) {
+            readme_prefetch_handle = window.requestIdleCallback(prefetch, {timeout: 2000});
+        }
+        else {
+            readme_prefetch_handle = setTimeout(prefetch, 500);
         }
     }
 
@@ -539,6 +924,8 @@ define([
         var readme = $('.nbext-readme');
         var readme_contents = readme.children('.panel-body').empty();
         var readme_title = readme.children('.panel-heading').children('span').empty();
+        // readmes may load after another nbextension has been selected
+        readme.data('extension', extension);
 
         if (extension.readme === undefined) {
             readme.slideUp(100);
@@ -547,8 +934,7 @@ define([
         readme.slideDown(100);
 
         var url = extension.readme;
-        var is_absolute = /^(f|ht)tps?:\/\//i.test(url);
-        if (is_absolute || (utils.splitext(url)[1] !== '.md')) {
+        if (!readme_is_markdown(extension)) {
             // provide a link only
             var desc = extension.ui.find('.nbext-desc');
             var link = desc.find('.nbext-readme-more-link');
@@ -569,64 +955,61 @@ define([
         // remove search component, as it's just a datestamp from require.js
         url = $('<a>').attr('href', url)[0].pathname;
         readme_title.text(url);
-        // add rendered markdown to readme_contents. Use pre-fetched if present
-        if (extension.readme_content) {
-            rendermd.render_markdown(extension.readme_content, url)
-                .addClass('rendered_html')
-                .appendTo(readme_contents);
-            return;
-        }
-        $.ajax({
-            url: url,
-            dataType: 'text',
-            success: function (md_contents) {
-                rendermd.render_markdown(md_contents, url)
-                    .addClass('rendered_html')
-                    .appendTo(readme_contents);
-                // We can't rely on picking up the rendered html,
-                // since render_markdown returns
-                // before the actual rendering work is complete
-                extension.readme_content = md_contents;
-                if (! $('body').hasClass(page_class)) {
-                    return;
-                }
-                // attempt to scroll to a location hash, if there is one.
-                var hash = window.location.hash.replace(/^#/, '');
-                if (hash) {
-                    // Allow time for markdown to render
-                    setTimeout( function () {
-                        // use filter to avoid breaking jQuery selector syntax with weird id
-                        var hdr = readme_contents.find(':header').filter(function (idx, elem) {
-                            return elem.id === hash;
-                        });
-                        if (hdr.length > 0) {
-                            var site = $('#site');
-                            var adjust = hdr.offset().top - site.offset().top;
-                            if (adjust > 0) {
-                                site.animate(
-                                    {scrollTop: site.scrollTop() + adjust},
-                                    undefined, // time
-                                    undefined, // easing function
-                                    function () {
-                                        if (hdr.effect !== undefined) {
-                                            hdr.effect('highlight', {color: '#faf2cc'});
-                                        }
+        // if the server renders markdown, it's fetched as html
+        var build_readme = function (readme_data) {
+            var readme_div = readme_data.is_html ? $('<div/>').html(readme_data.contents) : rendermd.render_markdown(readme_data.contents, url);
+            return readme_div.addClass('rendered_html');
+        };
+        fetch_readme(extension).then(function (readme_data) {
+            if (readme.data('extension') !== extension) {
+                return;
+            }
+            build_readme(readme_data).appendTo(readme_contents);
+            if (! $('body').hasClass(page_class)) {
+                return;
+            }
+            // attempt to scroll to a location hash, if there is one.
+            var hash = window.location.hash.replace(/^#/, '');
+            if (hash) {
+                // Allow time for markdown to render
+                setTimeout( function () {
+                    // use filter to avoid breaking jQuery selector syntax with weird id
+                    var hdr = readme_contents.find(':header').filter(function (idx, elem) {
+                        return elem.id === hash;
+                    });
+                    if (hdr.length > 0) {
+                        var site = $('#site');
+                        var adjust = hdr.offset().top - site.offset().top;
+                        if (adjust > 0) {
+                            site.animate(
+                                {scrollTop: site.scrollTop() + adjust},
+                                undefined, // time
+                                undefined, // easing function
+                                function () {
+                                    if (hdr.effect !== undefined) {
+                                        hdr.effect('highlight', {color: '#faf2cc'});
                                     }
-                                );
-                            }
+                                }
+                            );
                         }
-                    }, 100);
-                }
-            },
-            error: function (jqXHR, textStatus, errorThrown) {
-                var error_div = $('<div class="text-danger bg-danger"/>')
-                    .text(textStatus + ' : ' + jqXHR.status + ' ' + errorThrown)
-                    .appendTo(readme_contents);
-                if (jqXHR.status === 404) {
-                    $('<p/>')
-                        .text('no markdown file at ' + url)
-                        .appendTo(error_div);
-                }
+                    }
+                }, 100);
+            }
+        }).catch(function (err) {
+            if (err.jqXHR === undefined) {
+                console.error(log_prefix, 'error showing readme for', extension.require, err);
+                return;
+            }
+            if (readme.data('extension') !== extension) {
+                return;
+            }
+            var error_div = $('<div class="text-danger bg-danger"/>')
+                .text(err.textStatus + ' : ' + err.jqXHR.status + ' ' + err.errorThrown)
+                .appendTo(readme_contents);
+            if (err.jqXHR.status === 404) {
+                $('<p/>')
+                    .text('no markdown file at ' + url)
+                    .appendTo(error_div);
             }
         });
     }
@@ -679,18 +1062,34 @@ define([
         // ensure extension.ui exists
         if (extension.ui === undefined) {
             // use display: none since hide(0) doesn't do anything
-            // for elements that aren't yet part of the DOM
-            extension.ui = build_extension_ui(extension)
+            // for elements that aren't yet part of the DOM.
+            // Until the full spec has loaded, show a placeholder
+            extension.ui = build_extension_placeholder_ui(extension)
                 .css('display', 'none')
                 .insertBefore('.nbext-readme');
 
-            var ext_enabled = extension.selector_link.find('.nbext-enable-toggle').hasClass('nbext-enabled');
-            set_buttons_enabled(extension, ext_enabled);
+            load_extension_details(extension).then(function () {
+                var placeholder = extension.ui;
+                extension.ui = build_extension_ui(extension)
+                    .css('display', placeholder.css('display'))
+                    .insertBefore(placeholder);
+                placeholder.remove();
+
+                set_buttons_enabled(extension, extension.is_enabled);
+                if (extension === selected_extension) {
+                    load_readme(extension);
+                }
+            });
         }
 
         $('.nbext-selector li')
             .removeClass('active');
-        extension.selector_link.closest('li').addClass('active');
+        if (selected_extension !== undefined) {
+            // its link may not be in the page yet
+            selected_extension.selector_link.closest('li').removeClass('active');
+        }
+        selected_extension = extension;
+        get_selector_link(extension).closest('li').addClass('active');
 
         $('.nbext-ext-row')
             .not(extension.ui)
@@ -840,6 +1239,59 @@ define([
         return div_param_list;
     }
 
+    /**
+     * Fetch the parts of an nbextension's spec which weren't included in the
+     * list, adding them to the extension object.
+     * Returns a promise, resolved once the spec is complete.
+     */
+    function load_extension_details (extension) {
+        if (extension.details_loading === undefined) {
+            if (extension.unconfigurable) {
+                extension.details_loading = Promise.resolve(extension);
+                return extension.details_loading;
+            }
+            var api_url = utils.url_path_join(
+                base_url, 'nbextensions/nbextensions_configurator/extension',
+                utils.encode_uri_components(extension.require));
+            extension.details_loading = utils.promising_ajax(api_url, {
+                type: "GET",
+                dataType: "json",
+            }).then(function (spec) {
+                // keep the normalized values set by build_extension_list
+                delete spec.Name;
+                delete spec.Section;
+                $.extend(extension, spec);
+                extension.Parameters = extension.Parameters || [];
+                return extension;
+            }).catch(function (err) {
+                console.error(log_prefix, 'error loading details for', extension.require, err);
+                extension.details_error = true;
+                return extension;
+            });
+        }
+        return extension.details_loading;
+    }
+
+    /**
+     * build and return placeholder UI elements for a single nbextension,
+     * shown while its full spec loads
+     */
+    function build_extension_placeholder_ui (extension) {
+        var ext_row = $('<div/>')
+            .data('extension', extension)
+            .addClass('row nbext-ext-row');
+        $('<h3>')
+            .addClass('col-xs-12')
+            .html(extension.Name)
+            .appendTo(ext_row);
+        $('<div/>')
+            .addClass('col-xs-12')
+            .append('<i class="fa fa-refresh fa-spin fa-fw"></i>')
+            .append('<span class="sr-only">Loading...</span>')
+            .appendTo(ext_row);
+        return ext_row;
+    }
+
     /**
      * build and return UI elements for a single nbextension
      */
@@ -884,13 +1336,24 @@ define([
                         $('<img>')
                             .attr({
                                 // extension.icon is in nbextensions namespace
-                                'src': utils.url_path_join(base_url, 'nbextensions', utils.encode_uri_components(extension.icon)),
+                                'src': icon_bundle[extension.require] || get_asset_url(extension.icon, extension.icon_hash),
                                 'alt': extension.Name + ' icon'
                             })
                     )
                     .appendTo(col_right);
             }
 
+            // Failed to load the full spec
+            if (extension.details_error) {
+                $('<div/>')
+                    .addClass('col-xs-12 alert alert-warning')
+                    .css('margin-top', '5px')
+                    .append($('<p/>').text(
+                        'Failed to load this nbextension\'s full details ' +
+                        'from the server, so its parameters may be missing.'))
+                    .appendTo(ext_row);
+            }
+
             // Duplicate warning
             if (extension.duplicate) {
                 var duplicate_warning_p = $('<p/>').text([
@@ -1024,46 +1487,176 @@ define([
         filter_timeout_id = setTimeout(filter_refresh_visible_nbexts, 100);
     }
 
+    /**
+     * Return an empty search index. Its maps have no prototype, so that
+     * words like constructor can't clash with inherited properties.
+     */
+    function new_search_index () {
+        return {
+            words: Object.create(null),
+            sections: Object.create(null),
+            tags: Object.create(null)
+        };
+    }
+
+    /**
+     * Build the filter's search index for the given nbextensions list.
+     *
+     * The server's index (see the bootstrap handler) refers to nbextensions
+     * by their position in the list it sent, so this must be called before
+     * the list is altered. Without one, the list is indexed here instead.
+     */
+    function search_index_build (extension_list, search) {
+        search_index = new_search_index();
+        search_word_cache = Object.create(null);
+        if (search === undefined) {
+            for (var i = 0; i < extension_list.length; i++) {
+                search_index_add_extension(extension_list[i]);
+            }
+            return;
+        }
+        $.each(search_index, function (key, group) {
+            $.each(search[key], function (value, positions) {
+                var requires = group[value] = Object.create(null);
+                for (var i = 0; i < positions.length; i++) {
+                    requires[extension_list[positions[i]].require] = true;
+                }
+            });
+        });
+    }
+
+    /**
+     * Add a single nbextension to the search index,
+     * as the server would have done
+     */
+    function search_index_add_extension (extension) {
+        var add = function (group, value) {
+            if (group[value] === undefined) {
+                group[value] = Object.create(null);
+            }
+            group[value][extension.require] = true;
+        };
+        var ext_tags = $.map([].concat(extension.tags || []), String);
+        var section = String(extension.Section || 'notebook');
+        var text = [
+            extension.Name || '', extension.Description || '',
+            ext_tags.join(' '), section, extension.Compatibility || ''
+        ].join(' ').toLowerCase();
+        $.each(ext_tags, function (idx, tag) { add(search_index.tags, tag); });
+        add(search_index.sections, section);
+        $.each(text.split(search_split_re), function (idx, word) {
+            if (word) add(search_index.words, word);
+        });
+        search_word_cache = Object.create(null);
+    }
+
+    /**
+     * Remove a single nbextension from the search index
+     */
+    function search_index_remove_extension (extension) {
+        $.each(search_index, function (key, group) {
+            $.each(group, function (value, requires) {
+                delete requires[extension.require];
+            });
+        });
+        search_word_cache = Object.create(null);
+    }
+
+    /**
+     * Return the set of nbextension requires with a word containing the
+     * given (lowercase) text.
+     */
+    function search_lookup_word (text) {
+        if (search_word_cache[text] !== undefined) {
+            return search_word_cache[text].requires;
+        }
+        // any word containing text also contains its prefixes, so only the
+        // matches of the longest already-looked-up prefix need checking
+        var words = Object.keys(search_index.words);
+        for (var len = text.length - 1; len > 0; len--) {
+            var prefix = text.substring(0, len);
+            if (search_word_cache[prefix] !== undefined) {
+                words = search_word_cache[prefix].words;
+                break;
+            }
+        }
+        var found = {words: [], requires: Object.create(null)};
+        for (var ii = 0; ii < words.length; ii++) {
+            if (words[ii].indexOf(text) >= 0) {
+                found.words.push(words[ii]);
+                $.extend(found.requires, search_index.words[words[ii]]);
+            }
+        }
+        search_word_cache[text] = found;
+        return found.requires;
+    }
+
     function filter_refresh_visible_nbexts () {
         var to_show = [], to_hide = [];
         var active_tags = $('.nbext-filter-tag').map(function (idx, tag_elem) {
             return $(tag_elem).data('nbext_tag_object');
         });
         var remaining_text = $('.nbext-filter-input-wrap input')[0].value;
-        $('.nbext-selector ul li a').each(function (idx, el) {
-            var ext = $(el).data('extension');
-            var show = true;
-            var ii;
-            for (ii = 0; ii < active_tags.length && show; ii++) {
-                var tag = active_tags[ii];
-                switch (tag.category) {
-                    case 'section':
-                        show = show && (tag.value === ext.Section);
-                        break;
-                    case 'tag':
-                        show = show && (ext.tags.indexOf(tag.value) >= 0);
-                        break;
+        // a set of the requires to show, with null meaning all of them
+        var matches = null;
+        var restrict = function (requires) {
+            if (matches === null) {
+                matches = requires || {};
+                return;
+            }
+            var restricted = Object.create(null);
+            for (var require in matches) {
+                if (requires && requires[require] === true) {
+                    restricted[require] = true;
                 }
             }
-            var words = remaining_text.split(/\s+/);
-            for (ii = 0; show && ii < words.length; ii++) {
-                show = show && ext.filter_txt.indexOf(words[ii]) >= 0;
+            matches = restricted;
+        };
+        var ii;
+        for (ii = 0; ii < active_tags.length; ii++) {
+            var tag = active_tags[ii];
+            var group = search_index[tag.category === 'section' ? 'sections' : 'tags'];
+            restrict(group[tag.value]);
+        }
+        var words = remaining_text.toLowerCase().split(search_split_re);
+        for (ii = 0; ii < words.length; ii++) {
+            if (words[ii]) {
+                restrict(search_lookup_word(words[ii]));
             }
-            (show ? to_show: to_hide).push(ext.selector_link.parent()[0]);
-        });
+        }
+        // only animate the links whose visibility has changed
+        var active_shown = false, candidate;
+        for (ii = 0; ii < selector_extensions.length; ii++) {
+            var ext = selector_extensions[ii];
+            var show = matches === null || matches[ext.require] === true;
+            if (show !== ext.filter_visible) {
+                ext.filter_visible = show;
+                if (ii < selector_links_rendered) {
+                    (show ? to_show : to_hide).push(ext.selector_link[0].parentNode);
+                }
+                else if (ext.selector_link !== undefined) {
+                    ext.selector_link.parent().toggle(show);
+                }
+            }
+            if (show && !active_shown) {
+                active_shown = (ext === selected_extension);
+                if (candidate === undefined && !(selector_hide_incompat && !ext.is_compatible)) {
+                    candidate = ext;
+                }
+            }
+        }
         $(to_hide).slideUp(100);
-        to_show = $(to_show); // convert to jquery obj
-        to_show.slideDown(100);
+        $(to_show).slideDown(100);
         // make sure a visible nbextensions is selected
-        if (!to_show.is('.active')) {
-            var candidate = to_show.filter(':not(.disabled)').first().children('a');
-            if (candidate.length > 0 ) {
-                candidate.click();
+        if (!active_shown) {
+            if (candidate !== undefined) {
+                get_selector_link(candidate).click();
             }
             else {
                 open_ext_ui(undefined);
             }
         }
+        schedule_readme_prefetch();
         filter_timeout_id = null;
     }
 
@@ -1227,6 +1820,14 @@ define([
             .addClass('btn-group')
             .appendTo(button_sets);
 
+        $('<span/>')
+            .addClass('nbext-config-pending text-muted')
+            .attr('title', 'Saving config changes to the server')
+            .css('display', 'none') // revealed while there are config changes to write
+            .append('<i class="fa fa-circle-o-notch fa-spin fa-fw"/>')
+            .append(' saving ')
+            .prependTo(button_sets);
+
         var refresh_button = $('<button/>')
             .on('click', refresh_configurable_extensions_list)
             .attr('title', 'Refresh list of nbextensions')
@@ -1285,32 +1886,51 @@ define([
     function load_all_configs() {
         // clear existing warnings:
         $('.nbext-filter-grp ~ .alert').remove();
-        var config_promises = [];
+        // write any queued updates first, so they aren't lost, then load all
+        // sections in a single request
+        return flush_config_updates().catch(function () {}).then(function () {
+            return utils.promising_ajax(configs_api_url(), {
+                cache: false,
+                type: "GET",
+                dataType: "json",
+                data: {sections: Object.keys(configs).join(',')},
+            });
+        }).then(set_all_configs_data).catch(function (err) {
+            show_load_error('config sections "' + Object.keys(configs).join('", "') + '"', err);
+            return {};
+        });
+    }
+
+    /**
+     * Set the data for all config sections from an object mapping section
+     * names to their config, as returned by the configurator's endpoints.
+     * The sections are never loaded individually, so their loaded promises
+     * aren't fulfilled: wait on load_all_configs instead.
+     */
+    function set_all_configs_data (data) {
         for (var section in configs) {
-            config_promises.push(
-                // IIFE to get correct section value
-                (function (sect) {
-                    return configs[sect].load().catch(function (err) {
-                        var alert = $('<div role="alert" class="alert alert-warning alert-dismissable"/>').insertAfter('.nbext-filter-grp');
-                        $('<button type="button" class="close" data-dismiss="alert" aria-label="Close"><span aria-hidden="true">&times;</span></button>').appendTo(alert);
-                        var desc =  $('<p/>').appendTo(alert)
-                        $('<strong>Snap! </strong>').appendTo(desc);
-                        $('<span>').text('Failed to load config section "' + sect + '"').appendTo(desc);
-                        var deets = $('<details>').appendTo(alert);
-                        if (err.xhr_error && err.message) {
-                            $('<span>').text(err.xhr_error).appendTo(deets);
-                            $('<pre/>').text(err.message).appendTo(deets);
-                        }
-                        else {
-                            $('<pre/>').text(err).appendTo(deets);
-                        }
-                        return {};
-                    })
-                })(section)
-            );
-            configs[section].load();
+            configs[section].data = data[section] || {};
+        }
+        return data;
+    }
+
+    /**
+     * Show a warning about failing to load something from the server
+     */
+    function show_load_error (what, err) {
+        var alert = $('<div role="alert" class="alert alert-warning alert-dismissable"/>').insertAfter('.nbext-filter-grp');
+        $('<button type="button" class="close" data-dismiss="alert" aria-label="Close"><span aria-hidden="true">&times;</span></button>').appendTo(alert);
+        var desc =  $('<p/>').appendTo(alert)
+        $('<strong>Snap! </strong>').appendTo(desc);
+        $('<span>').text('Failed to load ' + what).appendTo(desc);
+        var deets = $('<details>').appendTo(alert);
+        if (err.xhr_error && err.message) {
+            $('<span>').text(err.xhr_error).appendTo(deets);
+            $('<pre/>').text(err.message).appendTo(deets);
+        }
+        else {
+            $('<pre/>').text(err).appendTo(deets);
         }
-        return Promise.all(config_promises);
     }
 
     /**
@@ -1371,8 +1991,8 @@ define([
             require_url = evt.state;
         }
         var selected_link;
-        if (extensions_dict[require_url] === undefined || extensions_dict[require_url].selector_link.hasClass('disabled')) {
-            selected_link = $('.nbext-selector').find('li:not(.disabled)').last().children('a');
+        if (extensions_dict[require_url] === undefined || get_selector_link(extensions_dict[require_url]).parent().hasClass('disabled')) {
+            selected_link = $('.nbext-selector').find('li:not(.disabled)').children('a').last();
         }
         else {
             selected_link = extensions_dict[require_url].selector_link;
@@ -1381,33 +2001,34 @@ define([
     }
 
     /**
-     * build html body listing all nbextensions.
-     *
-     * Since this function uses the contents of config.data,
-     * it should only be called after config.load() has been executed
+     * Fill in the Section & Name of an nbextension from the list, if missing
      */
-    function build_extension_list (extension_list) {
-        // add enabled-but-unconfigurable nbextensions to the list
+    function normalize_extension (extension) {
+        extension.Section = (extension.Section || 'notebook').toString();
+        extension.Name = (extension.Name || (extension.Section + ':' + extension.require)).toString();
+    }
+
+    /**
+     * Return stubs for the nbextensions which are enabled or disabled in the
+     * json configs, but missing from the given (normalized) list of
+     * configurable ones.
+     */
+    function build_unconfigurable_stubs (extension_list) {
         // construct a set of enabled nbextension urls from the configs
-        // this is used later to add unconfigurable nbextensions to the list
         var unconfigurable_enabled_extensions = {};
         var section;
         for (section in configs) {
             unconfigurable_enabled_extensions[section] = $.extend({}, configs[section].data.load_extensions);
         }
-        var i, extension;
-        for (i = 0; i < extension_list.length; i++) {
-            extension = extension_list[i];
-            extension.Section = (extension.Section || 'notebook').toString();
-            extension.Name = (extension.Name || (extension.Section + ':' + extension.require)).toString();
+        for (var i = 0; i < extension_list.length; i++) {
             // nbextension *is* configurable
-            delete unconfigurable_enabled_extensions[extension.Section][extension.require];
+            delete unconfigurable_enabled_extensions[extension_list[i].Section][extension_list[i].require];
         }
-        // add any remaining unconfigurable nbextensions as stubs
+        var stubs = [];
         for (section in configs) {
             for (var require_url in unconfigurable_enabled_extensions[section]) {
                 var word = unconfigurable_enabled_extensions[section][require_url] ? 'enabled' : 'disabled';
-                extension_list.push({
+                stubs.push({
                     Name: require_url,
                     Description: 'This nbextension is ' + word + ' in the ' + section + ' json config, ' +
                         "but doesn't provide a yaml file to tell us how to configure it. " +
@@ -1418,10 +2039,13 @@ define([
                 });
             }
         }
+        return stubs;
+    }
 
-        var selector_nav = $('.nbext-selector ul');
-
-        // sort nbextensions alphabetically
+    /**
+     * sort nbextensions alphabetically
+     */
+    function sort_extension_list (extension_list) {
         extension_list.sort(function (a, b) {
             var an = (a.Name || '').toLowerCase();
             var bn = (b.Name || '').toLowerCase();
@@ -1429,54 +2053,12 @@ define([
             if (an > bn) return 1;
             return 0;
         });
+    }
 
-        // fill the selector with nav links
-        for (i = 0; i < extension_list.length; i++) {
-            extension = extension_list[i];
-            extensions_dict[extension.require] = extension;
-            console.log(log_prefix, 'Found nbextension', extension.require);
-
-            extension.is_compatible = (extension.Compatibility || '?.x').toLowerCase().indexOf(
-                ((typeof sys_info === 'undefined') ? Jupyter.version : sys_info.notebook_version).substring(0, 2) + 'x') >= 0;
-            extension.Parameters = extension.Parameters || [];
-            if (!extension.is_compatible) {
-                // reveal the checkbox since we've found an incompatible nbext
-                $('.nbext-showhide-incompat').show();
-            }
-            extension.selector_link = $('<a/>')
-                .attr('href', '#')
-                .data('extension', extension)
-                .html(extension.Name)
-                .toggleClass('text-warning bg-warning', extension.unconfigurable === true)
-                .prepend(
-                    $('<i>')
-                        .addClass('fa fa-fw nbext-enable-toggle')
-                );
-            $('<li/>')
-                .addClass('col-lg-3 col-md-4 col-sm-6 col-xs-12')
-                .toggleClass('nbext-incompatible', !extension.is_compatible)
-                .append(extension.selector_link)
-                .appendTo(selector_nav);
-
-            var ext_enabled = false;
-            var conf = configs[extension.Section];
-            if (conf === undefined) {
-                console.warn(log_prefix, extension.require,
-                    "specifies unknown Section of '" + extension.Section + "'. Can't determine enable status.");
-            }
-            else if (conf.data.hasOwnProperty('load_extensions')) {
-                ext_enabled = (conf.data.load_extensions[extension.require] === true);
-            }
-            set_buttons_enabled(extension, ext_enabled);
-
-            filter_register_new_tag({category: 'section', value: extension.Section});
-            extension.tags = (extension.tags || []);
-            for (var tt=0; tt < extension.tags.length; tt++) {
-                filter_register_new_tag({category: 'tag', value: extension.tags[tt]});
-            }
-            extension.filter_txt = (extension.Description + ' ' + extension.Name).toLowerCase();
-        }
-        // sort tags
+    /**
+     * sort the filter's tags
+     */
+    function sort_filter_tags () {
         tags.sort(function (a, b) {
             var cat_order = ['section', 'tag'];
             var an = cat_order.indexOf(a.category);
@@ -1490,12 +2072,87 @@ define([
             if (an > bn) return 1;
             return 0;
         });
+    }
 
-        // attach click handlers
-        $('.nbext-enable-toggle')
-            .on('click', selector_checkbox_callback)
-            .closest('a')
-            .on('click', selector_nav_link_callback);
+    /**
+     * Return whether an nbextension is enabled in the json configs
+     */
+    function get_config_enabled (extension) {
+        var conf = configs[extension.Section];
+        if (conf === undefined) {
+            console.warn(log_prefix, extension.require,
+                "specifies unknown Section of '" + extension.Section + "'. Can't determine enable status.");
+        }
+        else if (conf.data.hasOwnProperty('load_extensions')) {
+            return (conf.data.load_extensions[extension.require] === true);
+        }
+        return false;
+    }
+
+    /**
+     * prepare an nbextension for its nav link, which is only built when
+     * needed, see get_selector_link
+     */
+    function prepare_extension (extension) {
+        extensions_dict[extension.require] = extension;
+        console.log(log_prefix, 'Found nbextension', extension.require);
+
+        extension.is_compatible = (extension.Compatibility || '?.x').toLowerCase().indexOf(
+            ((typeof sys_info === 'undefined') ? Jupyter.version : sys_info.notebook_version).substring(0, 2) + 'x') >= 0;
+        extension.Parameters = extension.Parameters || [];
+        if (!extension.is_compatible) {
+            // reveal the checkbox since we've found an incompatible nbext
+            $('.nbext-showhide-incompat').show();
+        }
+        set_buttons_enabled(extension, get_config_enabled(extension));
+
+        filter_register_new_tag({category: 'section', value: extension.Section});
+        extension.tags = (extension.tags || []);
+        for (var tt=0; tt < extension.tags.length; tt++) {
+            filter_register_new_tag({category: 'tag', value: extension.tags[tt]});
+        }
+        extension.filter_visible = true;
+    }
+
+    /**
+     * (re)start adding the given number of nav links to the page, followed
+     * by the rest as they're scrolled to
+     */
+    function start_selector_links (count) {
+        selector_links_rendered = 0;
+        $('<li/>')
+            .addClass('col-xs-12 nbext-selector-more')
+            .appendTo('.nbext-selector ul');
+        render_selector_links(count);
+        observe_selector_links();
+    }
+
+    /**
+     * build html body listing all nbextensions.
+     *
+     * Since this function uses the contents of config.data,
+     * it should only be called after config.load() has been executed
+     */
+    function build_extension_list (extension_list, search) {
+        search_index_build(extension_list, search);
+        var i;
+        for (i = 0; i < extension_list.length; i++) {
+            normalize_extension(extension_list[i]);
+        }
+        // add enabled-but-unconfigurable nbextensions to the list
+        var stubs = build_unconfigurable_stubs(extension_list);
+        for (i = 0; i < stubs.length; i++) {
+            extension_list.push(stubs[i]);
+            search_index_add_extension(stubs[i]);
+        }
+
+        sort_extension_list(extension_list);
+        selector_extensions = extension_list;
+        selected_extension = undefined;
+        for (i = 0; i < extension_list.length; i++) {
+            prepare_extension(extension_list[i]);
+        }
+        sort_filter_tags();
 
         // en/disable incompatible nbextensions
         var hide_incompat = true;
@@ -1508,35 +2165,279 @@ define([
         }
         set_hide_incompat(hide_incompat);
 
+        start_selector_links(selector_batch_size);
+
         // select a link
-        selector_nav.children('li:not(.disabled)').last().children('a').click();
+        for (i = extension_list.length - 1; i >= 0; i--) {
+            if (extension_list[i].is_compatible || !hide_incompat) {
+                get_selector_link(extension_list[i]).click();
+                break;
+            }
+        }
+        schedule_readme_prefetch();
     }
 
     /**
-     * Refresh the list of configurable nbextensions
+     * Apply changes to the nbextensions list, as returned by the bootstrap
+     * handler, to the page.
+     *
+     * Only the nav links & uis of added, removed or modified nbextensions
+     * are replaced, so that open uis, the scroll position & the filter are
+     * kept. Like build_extension_list, this uses the contents of
+     * config.data, so must be called after they're updated.
      */
-    function refresh_configurable_extensions_list () {
-        // remove/unload any existing nbextensions, readme etc
+    function patch_extension_list (changes, configs_changed) {
+        var ii, extension;
+        if (!configs_changed && changes.added.length + changes.modified.length + changes.removed.length < 1) {
+            return;
+        }
+        var replaced = Object.create(null);
+        for (ii = 0; ii < changes.removed.length; ii++) {
+            replaced[changes.removed[ii]] = true;
+        }
+        for (ii = 0; ii < changes.modified.length; ii++) {
+            replaced[changes.modified[ii].require] = true;
+        }
+        var extension_list = selector_extensions.filter(function (ext) {
+            return !ext.unconfigurable && !replaced[ext.require];
+        });
+        var incoming = $.extend(true, [], changes.added.concat(changes.modified));
+        for (ii = 0; ii < incoming.length; ii++) {
+            normalize_extension(incoming[ii]);
+            extension_list.push(incoming[ii]);
+        }
+        // keep any stubs which haven't changed
+        var old_by_require = Object.create(null);
+        for (ii = 0; ii < selector_extensions.length; ii++) {
+            old_by_require[selector_extensions[ii].require] = selector_extensions[ii];
+        }
+        var stubs = build_unconfigurable_stubs(extension_list);
+        for (ii = 0; ii < stubs.length; ii++) {
+            extension = old_by_require[stubs[ii].require];
+            var unchanged = (extension !== undefined && extension.unconfigurable &&
+                extension.Description === stubs[ii].Description);
+            extension_list.push(unchanged ? extension : stubs[ii]);
+        }
+
+        var new_by_require = Object.create(null);
+        for (ii = 0; ii < extension_list.length; ii++) {
+            new_by_require[extension_list[ii].require] = extension_list[ii];
+        }
+        // remove the links & uis of nbextensions which have gone or changed
+        var reselect;
+        for (ii = 0; ii < selector_extensions.length; ii++) {
+            extension = selector_extensions[ii];
+            if (new_by_require[extension.require] === extension) {
+                continue;
+            }
+            if (extension.selector_link !== undefined) {
+                extension.selector_link.parent().remove();
+            }
+            if (extension.ui !== undefined) {
+                extension.ui.remove();
+                delete extension.ui;
+            }
+            // don't reuse details loaded for the old spec
+            delete extension.details_loading;
+            search_index_remove_extension(extension);
+            delete extensions_dict[extension.require];
+            if (extension === selected_extension) {
+                reselect = new_by_require[extension.require];
+            }
+        }
+        // prepare new nbextensions, & update existing ones from the configs
+        for (ii = 0; ii < extension_list.length; ii++) {
+            extension = extension_list[ii];
+            if (old_by_require[extension.require] !== extension) {
+                prepare_extension(extension);
+                search_index_add_extension(extension);
+                continue;
+            }
+            set_buttons_enabled(extension, get_config_enabled(extension));
+            if (configs_changed && extension.ui !== undefined) {
+                extension.ui.find('.nbext-params > .list-group')
+                    .replaceWith(build_params_ui(extension.Parameters));
+            }
+        }
+        sort_filter_tags();
+        sort_extension_list(extension_list);
+        console.log(log_prefix, 'nbextensions list changes applied:',
+            changes.added.length, 'added,', changes.modified.length, 'modified,',
+            changes.removed.length, 'removed');
+
+        // put the links back in the page in their new order, keeping as many
+        // as there were, so that the scroll position doesn't change
+        var selector_nav = $('.nbext-selector ul');
+        var count = Math.max(selector_links_rendered, selector_batch_size);
+        selector_nav.children('.nbext-selector-more').remove();
+        selector_nav.children('li').detach();
+        selector_extensions = extension_list;
+        start_selector_links(count);
+
+        if (reselect !== undefined) {
+            get_selector_link(reselect).click();
+        }
+        // apply the filter to any new links. If the selected nbextension has
+        // gone, this also selects another one
+        filter_refresh_visible_nbexts();
+    }
+
+    /**
+     * Return the nav link for an nbextension, building it if necessary.
+     * Links are only added to the page by render_selector_links, in order,
+     * so that large lists don't have to be built all at once.
+     */
+    function get_selector_link (extension) {
+        if (extension.selector_link !== undefined) {
+            return extension.selector_link;
+        }
+        var disabled = selector_hide_incompat && !extension.is_compatible;
+        extension.selector_link = $('<a/>')
+            .attr('href', '#')
+            .data('extension', extension)
+            .html(extension.Name)
+            .toggleClass('text-warning bg-warning', extension.unconfigurable === true)
+            .on('click', selector_nav_link_callback)
+            .prepend(
+                $('<i>')
+                    .addClass('fa fa-fw nbext-enable-toggle')
+                    .toggleClass('nbext-enabled', extension.is_enabled === true)
+                    .on('click', selector_checkbox_callback)
+            );
+        $('<li/>')
+            .addClass('col-lg-3 col-md-4 col-sm-6 col-xs-12')
+            .toggleClass('nbext-incompatible', !extension.is_compatible)
+            .toggleClass('disabled', disabled)
+            .attr('title', disabled ? 'possibly incompatible' : '')
+            .toggle(extension.filter_visible !== false)
+            .append(extension.selector_link);
+        return extension.selector_link;
+    }
+
+    /**
+     * Add up to count more nav links to the page
+     */
+    function render_selector_links (count) {
+        var more = $('.nbext-selector .nbext-selector-more');
+        var stop = Math.min(selector_extensions.length, selector_links_rendered + count);
+        var items = [];
+        for (; selector_links_rendered < stop; selector_links_rendered++) {
+            items.push(get_selector_link(selector_extensions[selector_links_rendered]).parent()[0]);
+        }
+        $(items).insertBefore(more);
+        if (selector_links_rendered >= selector_extensions.length) {
+            more.remove();
+        }
+    }
+
+    /**
+     * Add more nav links to the page whenever the end of the rendered ones
+     * is scrolled into view. Without IntersectionObserver, add them all.
+     */
+    function observe_selector_links () {
+        if (selector_observer !== null) {
+            selector_observer.disconnect();
+            selector_observer = null;
+        }
+        var more = $('.nbext-selector .nbext-selector-more');
+        if (more.length < 1) {
+            return;
+        }
+        if (window.IntersectionObserver === undefined) {
+            render_selector_links(Infinity);
+            return;
+        }
+        var site = $('#site');
+        selector_observer = new IntersectionObserver(function (entries) {
+            if (!entries[entries.length - 1].isIntersecting) {
+                return;
+            }
+            render_selector_links(selector_batch_size);
+            if (more.parent().length < 1) {
+                selector_observer.disconnect();
+                selector_observer = null;
+            }
+            else {
+                // re-observing checks again, in case it's still in view
+                selector_observer.unobserve(more[0]);
+                selector_observer.observe(more[0]);
+            }
+        }, {root: site.length > 0 ? site[0] : null, rootMargin: '200px'});
+        selector_observer.observe(more[0]);
+    }
+
+    /**
+     * remove/unload any existing nbextensions, readme etc,
+     * and show a loading indicator
+     */
+    function clear_extension_list () {
         var selector_nav = $('.nbext-selector ul').empty();
         $('.nbext-ext-row').remove();
         load_readme({readme: undefined});
-        // add a loading indicator
         $('<div>')
             .addClass('col-xs-12 nbext-selector-loading')
             .append('<i class="fa fa-refresh fa-spin fa-3x fa-fw"></i>')
             .append('<span class="sr-only">Loading...</span>')
             .appendTo(selector_nav);
-        // do the actual work
-        return load_all_configs().then(function () {
+    }
+
+    /**
+     * Refresh the list of configurable nbextensions
+     */
+    function refresh_configurable_extensions_list () {
+        // once there's a list in the page, only fetch the changes to it
+        var since = list_version;
+        if (since === undefined) {
+            clear_extension_list();
+        }
+        // clear existing warnings:
+        $('.nbext-filter-grp ~ .alert').remove();
+        // do the actual work, fetching the configs and the list in a single
+        // request, once any queued config updates have been written
+        return flush_config_updates().catch(function () {}).then(function () {
             var api_url = utils.url_path_join(
-                base_url, 'nbextensions/nbextensions_configurator/list');
+                base_url, 'nbextensions/nbextensions_configurator/bootstrap') +
+                '?fields=' + encodeURIComponent(list_fields.join(','));
+            if (since !== undefined) {
+                api_url += '&since=' + encodeURIComponent(since);
+            }
+            // revalidate using the ETag from the last response, so that an
+            // unchanged response isn't downloaded again
             return utils.promising_ajax(api_url, {
-                cache: false,
+                ifModified: true,
                 type: "GET",
                 dataType: "json",
             });
-        }).then(function (extension_list) {
-            build_extension_list(extension_list);
+        }).then(function (bootstrap) {
+            if (bootstrap === undefined) {
+                // 304 Not Modified
+                console.log(log_prefix, 'nbextensions list & configs unchanged on server');
+                if (since !== undefined) {
+                    return;
+                }
+                bootstrap = last_bootstrap;
+            }
+            var configs_json = JSON.stringify(bootstrap.configs);
+            var configs_changed = (configs_json !== last_configs_json);
+            last_configs_json = configs_json;
+            set_all_configs_data($.extend(true, {}, bootstrap.configs));
+            if (bootstrap.changes !== undefined) {
+                patch_extension_list(bootstrap.changes, configs_changed);
+            }
+            else {
+                last_bootstrap = bootstrap;
+                if (since !== undefined) {
+                    // the server didn't know our version, so start afresh
+                    clear_extension_list();
+                }
+                // build_extension_list alters the list, so give it a copy
+                build_extension_list(
+                    $.extend(true, [], bootstrap.extensions), bootstrap.search);
+            }
+            list_version = bootstrap.version;
+            load_icon_bundle(bootstrap.icons_hash);
+        }).catch(function (err) {
+            show_load_error('the nbextensions list and config sections', err);
         }).then(function () {
             // remove loading indicator
             $('.nbext-selector ul .nbext-selector-loading').remove();
@@ -1560,6 +2461,7 @@ define([
         build_page : build_page,
         build_configurator_ui : build_configurator_ui,
         build_extension_list : build_extension_list,
+        flush_config_updates : flush_config_updates,
         load_all_configs : load_all_configs,
         refresh_configurable_extensions_list : refresh_configurable_extensions_list
     };
@@ -199,6 +199,14 @@ define([
         var encoded_md_url = utils.get_body_data('mdUrl');
         var url = utils.url_path_join(base_url, encoded_md_url);
 
+        if (utils.get_body_data('mdRendered') === 'true') {
+            // the server has already rendered the markdown into the page
+            page.show();
+            var hash_el = $(window.location.hash);
+            if (hash_el.length > 0) hash_el[0].scrollIntoView();
+            return;
+        }
+
         $.ajax({
             url: url,
             dataType: 'text', // or 'html', 'xml', 'more'
@@ -8,6 +8,7 @@ from __future__ import (
 import logging
 import os
 import sys
+import time
 from threading import Event, Thread
 
 from jupyter_contrib_core.notebook_compat import serverextensions
@@ -329,6 +330,27 @@ class SeleniumNbextensionTestBase(NbextensionTestBase):
         return cls.wait_for_element((By.PARTIAL_LINK_TEXT, link_text),
                                     message=message, timeout=timeout)
 
+    @classmethod
+    def wait_for_selector_link(cls, link_text, message='', timeout=5):
+        """
+        Wait for a configurator selector link, fail test on timeout.
+
+        The configurator only builds links as they're scrolled into view, so
+        keep scrolling the end of the rendered links into view until a link
+        matching the partial link text appears.
+        """
+        end_time = time.time() + timeout
+        while time.time() < end_time:
+            links = cls.driver.find_elements_by_partial_link_text(link_text)
+            if links:
+                return links[0]
+            for more in cls.driver.find_elements_by_css_selector(
+                    '.nbext-selector-more'):
+                cls.driver.execute_script(
+                    'arguments[0].scrollIntoView();', more)
+            time.sleep(0.1)
+        return cls.wait_for_partial_link_text(link_text, message, timeout=0)
+
     @classmethod
     def wait_for_xpath(cls, xpath, message='', timeout=5):
         """WebDriverWait for a selector to appear, fail test on timeout."""
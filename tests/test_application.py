@@ -5,14 +5,17 @@ from __future__ import (
     absolute_import, division, print_function, unicode_literals,
 )
 
+import io
 import itertools
 import json
 import logging
 import os
+from contextlib import redirect_stdout
 from unittest import TestCase
 
 import jupyter_core.paths
 import nose.tools as nt
+import yaml
 from jupyter_contrib_core.notebook_compat import serverextensions
 from jupyter_contrib_core.testing_utils import (
     get_logger, patch_traitlets_app_logs,
@@ -21,16 +24,18 @@ from jupyter_contrib_core.testing_utils.jupyter_env import patch_jupyter_dirs
 from traitlets.config import Config
 from traitlets.tests.utils import check_help_all_output, check_help_output
 
+from jupyter_nbextensions_configurator import INDEX_FILENAME
 from jupyter_nbextensions_configurator.application import main as main_app
 from jupyter_nbextensions_configurator.application import (
-    DisableJupyterNbextensionsConfiguratorApp,
-    EnableJupyterNbextensionsConfiguratorApp,
-    JupyterNbextensionsConfiguratorApp,
+    BuildIndexApp, DisableJupyterNbextensionsConfiguratorApp,
+    EnableJupyterNbextensionsConfiguratorApp, IndexApp, IndexStatsApp,
+    JupyterNbextensionsConfiguratorApp, VerifyIndexApp,
 )
 
 app_classes = (DisableJupyterNbextensionsConfiguratorApp,
                EnableJupyterNbextensionsConfiguratorApp,
-               JupyterNbextensionsConfiguratorApp)
+               JupyterNbextensionsConfiguratorApp,
+               IndexApp, BuildIndexApp, VerifyIndexApp, IndexStatsApp)
 
 
 def reset_app_class(app_class):
@@ -65,6 +70,28 @@ class AppTest(TestCase):
             patch_traitlets_app_logs(klass)
             klass.log_level.default_value = logging.DEBUG
 
+    @staticmethod
+    def get_enabled_states(conf_dir):
+        """Return the states the config files in conf_dir set, by file."""
+        def read_json(*relpath):
+            path = os.path.join(conf_dir, *relpath)
+            if not os.path.exists(path):
+                return {}
+            with io.open(path, 'r') as f:
+                return json.load(f)
+        return {
+            'jupyter_notebook_config.json': read_json(
+                'jupyter_notebook_config.json').get('NotebookApp', {}).get(
+                'nbserver_extensions', {}).get(
+                'jupyter_nbextensions_configurator'),
+            'nbconfig/notebook.json': read_json(
+                'nbconfig', 'notebook.json').get('load_extensions', {}).get(
+                'nbextensions_configurator/config_menu/main'),
+            'nbconfig/tree.json': read_json(
+                'nbconfig', 'tree.json').get('load_extensions', {}).get(
+                'nbextensions_configurator/tree_tab/main'),
+        }
+
     def check_enable(self, argv=None, dirs=None):
         """Check files were enabled in the correct place."""
         if argv is None:
@@ -86,6 +113,20 @@ class AppTest(TestCase):
         nt.assert_true(
             created_files,
             'enable should create files in {}'.format(dirs['conf']))
+        # the server extension & both nbextensions are enabled there
+        nt.assert_equal(self.get_enabled_states(conf_dir), {
+            'jupyter_notebook_config.json': True,
+            'nbconfig/notebook.json': True,
+            'nbconfig/tree.json': True,
+        })
+        # and nothing is written anywhere else
+        for root, subdirs, files in os.walk(self.jupyter_dirs['root']):
+            for fname in files:
+                path = os.path.join(root, fname)
+                nt.assert_true(
+                    path.startswith(conf_dir + os.sep),
+                    'enable should only write files in {}, not {}'.format(
+                        conf_dir, path))
 
         # a bit of a hack to allow initializing a new app instance
         for klass in app_classes:
@@ -112,6 +153,11 @@ class AppTest(TestCase):
                 {k: v for k, v in nbservext.items() if v},
                 'disable command should disable all '
                 'nbserver_extensions in file {}'.format(path))
+        nt.assert_equal(self.get_enabled_states(conf_dir), {
+            'jupyter_notebook_config.json': False,
+            'nbconfig/notebook.json': False,
+            'nbconfig/tree.json': False,
+        })
 
         reset_app_class(DisableJupyterNbextensionsConfiguratorApp)
 
@@ -127,7 +173,8 @@ class AppTest(TestCase):
     def test_01_help_output(self):
         """Check that app help works."""
         app_module = 'jupyter_nbextensions_configurator.application'
-        for argv in (['enable'], ['disable']):
+        for argv in (['enable'], ['disable'], ['index'], ['index', 'build'],
+                     ['index', 'verify'], ['index', 'stats']):
             check_help_output(app_module, argv)
             check_help_all_output(app_module, argv)
         # sys.exit should be called if no argv specified
@@ -162,3 +209,73 @@ class AppTest(TestCase):
             self.log.info('testing conflicting flagset {}'.format(flagset))
             nt.assert_raises(serverextensions.ArgumentConflict,
                              main_app, ['enable'] + list(flagset))
+            for klass in app_classes:
+                reset_app_class(klass)
+            nt.assert_raises(serverextensions.ArgumentConflict,
+                             main_app, ['index', 'build'] + list(flagset))
+
+    def write_nbextension_yaml(self, yaml_path, require):
+        """Write a valid descriptor file for require to yaml_path."""
+        if not os.path.isdir(os.path.dirname(yaml_path)):
+            os.makedirs(os.path.dirname(yaml_path))
+        with io.open(yaml_path, 'w') as f:
+            yaml.safe_dump({
+                'Type': 'Jupyter Notebook Extension',
+                'Main': require + '.js',
+            }, f)
+
+    def run_index_app(self, argv):
+        """Run an index subcommand, returning what it printed."""
+        stdout = io.StringIO()
+        try:
+            with redirect_stdout(stdout):
+                main_app(['index'] + argv)
+        finally:
+            for klass in app_classes:
+                reset_app_class(klass)
+        return stdout.getvalue()
+
+    def test_07_index_build_verify(self):
+        """Check that index build writes an index which verify accepts."""
+        data_dir = self.jupyter_dirs['sys_prefix']['data']
+        nbext_dir = os.path.join(data_dir, 'nbextensions')
+        self.write_nbextension_yaml(
+            os.path.join(nbext_dir, 'myext', 'myext.yaml'), 'main')
+
+        self.run_index_app(['build', '--sys-prefix'])
+        index_path = os.path.join(data_dir, INDEX_FILENAME)
+        with io.open(index_path, 'r') as f:
+            index = json.load(f)
+        nt.assert_equal(
+            index['roots'][nbext_dir]['files'][
+                os.path.join('myext', 'myext.yaml')]['spec']['require'],
+            'myext/main')
+        self.run_index_app(['verify', '--sys-prefix'])
+
+        # a new descriptor makes the index stale
+        self.write_nbextension_yaml(
+            os.path.join(nbext_dir, 'other', 'other.yaml'), 'main')
+        with nt.assert_raises(SystemExit):
+            self.run_index_app(['verify', '--sys-prefix'])
+        # as is an out of date index file
+        with nt.assert_raises(SystemExit):
+            self.run_index_app([
+                'verify', '--sys-prefix', '--index-path',
+                os.path.join(self.jupyter_dirs['root'], 'missing.json')])
+        self.run_index_app(['build', '--sys-prefix'])
+        self.run_index_app(['verify', '--sys-prefix'])
+
+    def test_08_index_stats(self):
+        """Check that index stats reports counts and duplicates."""
+        nbext_dir = os.path.join(
+            self.jupyter_dirs['system']['data'], 'nbextensions')
+        for name in ('myext', 'copied'):
+            self.write_nbextension_yaml(
+                os.path.join(nbext_dir, name, 'myext.yaml'), '../myext/main')
+        output = self.run_index_app(['stats', '--system'])
+        self.log.info(output)
+        nt.assert_in('(0 of 1 roots indexed)', output)
+        nt.assert_in('valid descriptors:    2', output)
+        nt.assert_in('unique nbextensions:  1', output)
+        nt.assert_in('duplicates:           1', output)
+        nt.assert_in(os.path.join(nbext_dir, 'copied', 'myext.yaml'), output)
@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+"""Tests for the server extension's http handlers."""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals,
+)
+
+import io
+import json
+import logging
+import os
+
+import nose.tools as nt
+from jupyter_contrib_core.testing_utils.jupyter_env import patch_jupyter_dirs
+from jupyter_server.auth.authorizer import Authorizer
+from jupyter_server.base.handlers import FileFindHandler
+from jupyter_server.serverapp import ServerApp
+from tornado.testing import AsyncHTTPTestCase
+
+from jupyter_nbextensions_configurator import NBExtensionAssetHandler
+from test_index import NbextDirTestBase, make_spec
+
+
+class HandlerTestBase(AsyncHTTPTestCase, NbextDirTestBase):
+    """
+    Base class for tests of the handlers, in a server without a listener.
+
+    The server's nbextensions path is just the temporary nbextensions
+    directory set up by NbextDirTestBase.
+    """
+
+    def setUp(self):
+        (jupyter_patches, self.jupyter_dirs,
+         remove_jupyter_dirs) = patch_jupyter_dirs()
+        for ptch in jupyter_patches:
+            ptch.start()
+            self.addCleanup(ptch.stop)
+        self.addCleanup(remove_jupyter_dirs)
+        NbextDirTestBase.setUp(self)
+        AsyncHTTPTestCase.setUp(self)
+
+    def get_server_kwargs(self):
+        return dict(
+            jpserver_extensions={
+                'nbclassic': True, 'jupyter_nbextensions_configurator': True},
+            token='', password='', disable_check_xsrf=True,
+            open_browser=False, log_level=logging.WARNING)
+
+    def get_app(self):
+        self.serverapp = app = ServerApp(**self.get_server_kwargs())
+        app.init_configurables()
+        app.init_components()
+        app.init_webapp()
+        app.init_server_extensions()
+        app.load_server_extensions()
+        app.web_app.settings['nbextensions_path'] = [self.nbext_dir]
+        self.nbext_index = app.web_app.settings[
+            'nbextensions_configurator_index']
+        self.addCleanup(self.nbext_index.close)
+        return app.web_app
+
+    def fetch_configurator(self, path, **kwargs):
+        """Fetch a url below /nbextensions/nbextensions_configurator."""
+        return self.fetch(
+            '/nbextensions/nbextensions_configurator/' + path, **kwargs)
+
+    def fetch_json(self, path, **kwargs):
+        """Fetch a url below /nbextensions, returning the decoded json."""
+        if 'body' in kwargs and not isinstance(kwargs['body'], bytes):
+            kwargs['body'] = json.dumps(kwargs['body'])
+        response = self.fetch_configurator(path, **kwargs)
+        nt.assert_equal(response.code, 200, response.body)
+        return json.loads(response.body.decode('utf-8'))
+
+
+class ConfigHandlerTest(HandlerTestBase):
+    """Tests for the batched config read & write endpoint."""
+
+    def patch_configs(self, updates):
+        return self.fetch_json('config', method='PATCH', body=updates)
+
+    def test_read_configs(self):
+        """Check that all sections, or those requested, are read at once."""
+        self.serverapp.config_manager.update(
+            'notebook', {'load_extensions': {'alpha/alpha': True}})
+        nt.assert_equal(self.fetch_json('config'), {
+            'notebook': {'load_extensions': {'alpha/alpha': True}},
+            'edit': {}, 'tree': {}, 'common': {}})
+        nt.assert_equal(
+            self.fetch_json('config?sections=tree,notebook&sections=edit'), {
+                'notebook': {'load_extensions': {'alpha/alpha': True}},
+                'edit': {}, 'tree': {}})
+        response = self.fetch_configurator('config?sections=../x')
+        nt.assert_equal(response.code, 400)
+
+    def test_update_configs(self):
+        """Check that updates to several sections are applied at once."""
+        nt.assert_equal(self.patch_configs({
+            'notebook': {'load_extensions': {'alpha/alpha': True}},
+            'tree': {'alpha': {'x': 1, 'y': [1, 2]}},
+        }), {
+            'notebook': {'load_extensions': {'alpha/alpha': True}},
+            'tree': {'alpha': {'x': 1, 'y': [1, 2]}},
+        })
+        # null removes keys, and lists replace rather than merge
+        nt.assert_equal(self.patch_configs({
+            'tree': {'alpha': {'x': None, 'y': [3]}},
+        }), {'tree': {'alpha': {'y': [3]}}})
+        nt.assert_equal(self.serverapp.config_manager.get('tree'),
+                        {'alpha': {'y': [3]}})
+        for body in ([], {'notebook': 1}, {'notebook': [{}, 2]},
+                     {'../x': {}}):
+            response = self.fetch_configurator(
+                'config', method='PATCH', body=json.dumps(body))
+            nt.assert_equal(response.code, 400)
+
+    def test_update_configs_in_order(self):
+        """Check that lists of updates are applied in turn."""
+        self.patch_configs({'notebook': {'alpha': {'x': 1, 'y': 2}}})
+        # removing alpha then setting alpha.x leaves no alpha.y, which
+        # merging the updates into {'alpha': {'x': 3}} wouldn't
+        nt.assert_equal(self.patch_configs({
+            'notebook': [{'alpha': None}, {'alpha': {'x': 3}}],
+        }), {'notebook': {'alpha': {'x': 3}}})
+        nt.assert_equal(self.patch_configs({'notebook': []}),
+                        {'notebook': {'alpha': {'x': 3}}})
+
+
+class ListHandlerTest(HandlerTestBase):
+    """Tests for the nbextensions list & detail endpoints."""
+
+    def test_list(self):
+        """Check the list, and its summary & fields projections."""
+        extensions = self.fetch_json('list')
+        nt.assert_equal(
+            sorted(ext['require'] for ext in extensions),
+            ['alpha/alpha', 'beta/beta', 'gamma/gamma'])
+        for ext in self.fetch_json('list?summary=1'):
+            nt.assert_true(set(ext).issubset(
+                ['require', 'Name', 'Section', 'Compatibility']), ext)
+        for ext in self.fetch_json('list?fields=Name'):
+            nt.assert_equal(set(ext), {'require', 'Name'})
+
+    def test_list_not_modified(self):
+        """Check that the list is revalidated by ETag or Last-Modified."""
+        response = self.fetch_configurator('list')
+        nt.assert_equal(response.code, 200)
+        nt.assert_equal(response.headers['Cache-Control'], 'no-cache')
+        etag = response.headers['Etag']
+        last_modified = response.headers['Last-Modified']
+        response = self.fetch_configurator(
+            'list', headers={'If-None-Match': etag})
+        nt.assert_equal(response.code, 304)
+        response = self.fetch_configurator(
+            'list', headers={'If-Modified-Since': last_modified})
+        nt.assert_equal(response.code, 304)
+        # If-None-Match takes precedence over If-Modified-Since
+        response = self.fetch_configurator('list', headers={
+            'If-None-Match': '"stale"', 'If-Modified-Since': last_modified})
+        nt.assert_equal(response.code, 200)
+        # projections have their own ETag
+        response = self.fetch_configurator(
+            'list?summary=1', headers={'If-None-Match': etag})
+        nt.assert_equal(response.code, 200)
+        nt.assert_not_equal(response.headers['Etag'], etag)
+
+    def test_detail(self):
+        """Check that a single nbextension is returned, or a 404."""
+        extension = self.fetch_json('extension/alpha/alpha')
+        nt.assert_equal(extension['require'], 'alpha/alpha')
+        nt.assert_equal(extension['Name'], 'alpha/alpha')
+        response = self.fetch_configurator('extension/nonexistent/ext')
+        nt.assert_equal(response.code, 404)
+
+
+class BootstrapHandlerTest(HandlerTestBase):
+    """Tests for the endpoint the configurator page starts up from."""
+
+    def test_bootstrap(self):
+        """Check that configs, list & search index are returned at once."""
+        self.serverapp.config_manager.update(
+            'notebook', {'load_extensions': {'alpha/alpha': True}})
+        bootstrap = self.fetch_json('bootstrap')
+        nt.assert_equal(sorted(bootstrap), [
+            'configs', 'extensions', 'icons_hash', 'search', 'version'])
+        nt.assert_equal(bootstrap['configs'], {
+            'notebook': {'load_extensions': {'alpha/alpha': True}},
+            'edit': {}, 'tree': {}, 'common': {}})
+        nt.assert_equal(bootstrap['extensions'], self.fetch_json('list'))
+        nt.assert_in('alpha', bootstrap['search']['words'])
+        # the version is the list's ETag
+        response = self.fetch_configurator('list')
+        nt.assert_equal(
+            response.headers['Etag'], '"{}"'.format(bootstrap['version']))
+
+    def test_bootstrap_since(self):
+        """Check that only the changes since a known version are returned."""
+        self.nbext_index.cache_ttl = 0
+        version = self.fetch_json('bootstrap')['version']
+        unchanged = self.fetch_json('bootstrap?since=' + version)
+        nt.assert_equal(sorted(unchanged), [
+            'changes', 'configs', 'icons_hash', 'version'])
+        nt.assert_equal(unchanged['changes'], {
+            'added': [], 'modified': [], 'removed': []})
+        nt.assert_equal(unchanged['version'], version)
+
+        self.write_yaml(os.path.join('delta', 'delta.yaml'),
+                        make_spec('delta/delta'))
+        self.write_yaml(os.path.join('alpha', 'alpha.yaml'),
+                        make_spec('alpha/alpha', Description='changed'))
+        changed = self.fetch_json('bootstrap?since=' + version)
+        nt.assert_equal(
+            [ext['require'] for ext in changed['changes']['added']],
+            ['delta/delta'])
+        nt.assert_equal(
+            [ext['require'] for ext in changed['changes']['modified']],
+            ['alpha/alpha'])
+        nt.assert_equal(changed['changes']['removed'], [])
+        nt.assert_not_equal(changed['version'], version)
+
+        # a change to a field which isn't requested is still reported
+        fields = 'fields=Name,Section,Description'
+        response = self.fetch_configurator('bootstrap?' + fields)
+        version, etag = (json.loads(response.body.decode('utf-8'))['version'],
+                         response.headers['Etag'])
+        self.write_yaml(os.path.join('gamma', 'gamma.yaml'), make_spec(
+            'gamma/gamma',
+            Parameters=[{'name': 'gamma.x', 'input_type': 'number'}]))
+        response = self.fetch_configurator(
+            'bootstrap?{}&since={}'.format(fields, version),
+            headers={'If-None-Match': etag})
+        nt.assert_equal(response.code, 200)
+        changed = json.loads(response.body.decode('utf-8'))
+        nt.assert_equal(changed['changes']['modified'], [
+            {'require': 'gamma/gamma', 'Name': 'gamma/gamma',
+             'Section': 'notebook'}])
+        nt.assert_not_equal(changed['version'], version)
+
+        # an unknown version gets the full list
+        full = self.fetch_json('bootstrap?since=unknown')
+        nt.assert_in('extensions', full)
+        nt.assert_not_in('changes', full)
+
+
+class AssetHandlerTestBase(HandlerTestBase):
+    """Base class for tests of handlers serving readmes & icons."""
+
+    icon_bytes = b'\x89PNG\r\n\x1a\nnot really a png'
+
+    def setUp(self):
+        super(AssetHandlerTestBase, self).setUp()
+        # don't find files in earlier tests' nbextensions directories
+        NBExtensionAssetHandler._static_paths.clear()
+        self.write_yaml(os.path.join('alpha', 'alpha.yaml'), make_spec(
+            'alpha/alpha', Link='readme.md', Icon='icon.png'))
+        with io.open(os.path.join(
+                self.nbext_dir, 'alpha', 'readme.md'), 'w') as f:
+            f.write('# alpha\n')
+        with io.open(os.path.join(
+                self.nbext_dir, 'alpha', 'icon.png'), 'wb') as f:
+            f.write(self.icon_bytes)
+
+
+class AssetHandlerTest(AssetHandlerTestBase):
+    """Tests for the handler serving readmes & icons, with their hashes."""
+
+    def test_asset(self):
+        """Check that assets are cached for long only when versioned."""
+        extension = self.fetch_json('extension/alpha/alpha')
+        nt.assert_equal(extension['icon'], 'alpha/icon.png')
+        nt.assert_in('icon_hash', extension)
+        nt.assert_in('readme_hash', extension)
+        response = self.fetch_configurator(
+            'asset/alpha/icon.png?v=' + extension['icon_hash'])
+        nt.assert_equal(response.code, 200)
+        nt.assert_equal(response.body, self.icon_bytes)
+        nt.assert_in('max-age=', response.headers['Cache-Control'])
+        nt.assert_not_equal(response.headers['Cache-Control'], 'no-cache')
+        for query in ('', '?v=stale'):
+            response = self.fetch_configurator('asset/alpha/icon.png' + query)
+            nt.assert_equal(response.code, 200)
+            nt.assert_equal(response.headers['Cache-Control'], 'no-cache')
+        response = self.fetch_configurator(
+            'asset/alpha/readme.md?v=' + extension['readme_hash'])
+        nt.assert_equal(response.code, 200)
+        nt.assert_equal(response.body, b'# alpha\n')
+        response = self.fetch_configurator('asset/alpha/missing.png')
+        nt.assert_equal(response.code, 404)
+
+    def test_asset_head(self):
+        """Check that HEAD requests get the same caching headers."""
+        extension = self.fetch_json('extension/alpha/alpha')
+        response = self.fetch_configurator(
+            'asset/alpha/icon.png?v=' + extension['icon_hash'],
+            method='HEAD')
+        nt.assert_equal(response.code, 200)
+        nt.assert_in('max-age=', response.headers['Cache-Control'])
+        response = self.fetch_configurator(
+            'asset/alpha/icon.png', method='HEAD')
+        nt.assert_equal(response.code, 200)
+        nt.assert_equal(response.headers['Cache-Control'], 'no-cache')
+
+    def test_asset_search_cache(self):
+        """Check that found files aren't cached with other handlers' files."""
+        self.fetch_configurator('asset/alpha/icon.png')
+        nt.assert_in('alpha/icon.png', NBExtensionAssetHandler._static_paths)
+        nt.assert_not_in('alpha/icon.png', FileFindHandler._static_paths)
+
+
+class IconsHandlerTest(AssetHandlerTestBase):
+    """Tests for the handler serving all the icons at once."""
+
+    def test_icons(self):
+        """Check the icon bundle, and that it's cached only when versioned."""
+        icons_hash = self.fetch_json('bootstrap')['icons_hash']
+        nt.assert_true(icons_hash)
+        response = self.fetch_configurator('icons?v=' + icons_hash)
+        nt.assert_equal(response.code, 200)
+        nt.assert_in('max-age=', response.headers['Cache-Control'])
+        bundle = json.loads(response.body.decode('utf-8'))
+        nt.assert_equal(sorted(bundle), ['alpha/alpha'])
+        nt.assert_true(bundle['alpha/alpha'].startswith(
+            'data:image/png;base64,'))
+        response = self.fetch_configurator('icons?v=stale')
+        nt.assert_equal(response.code, 200)
+        nt.assert_equal(response.headers['Cache-Control'], 'no-cache')
+
+
+class ShutdownTest(HandlerTestBase):
+    """Tests for cleaning up the nbextensions index with the server."""
+
+    def test_index_closed_on_shutdown(self):
+        """Check that the index is closed as the server app cleans up."""
+        self.fetch_json('list')
+        nt.assert_is_not_none(self.nbext_index._executor)
+        self.io_loop.run_sync(self.serverapp.cleanup_extensions)
+        nt.assert_true(self.nbext_index._warm_up_cancelled.is_set())
+        nt.assert_is_none(self.nbext_index._executor)
+
+    def test_watched_updates_flushed_on_shutdown(self):
+        """Check that queued updates are saved & watching stops on stop."""
+        self.nbext_index.watch = True
+        self.fetch_json('list')
+        nt.assert_equal(self.nbext_index._watched, {self.nbext_dir})
+        self.write_yaml(os.path.join('delta', 'delta.yaml'),
+                        make_spec('delta/delta'))
+        self.io_loop.run_sync(lambda: self.nbext_index._queue_update(
+            self.nbext_dir, os.path.join('delta', 'delta.yaml')))
+        self.io_loop.run_sync(self.serverapp.cleanup_extensions)
+        nt.assert_is_none(self.nbext_index._flush_handle)
+        nt.assert_is_none(self.nbext_index._observer)
+        nt.assert_is_none(self.nbext_index._poller)
+        nt.assert_equal(self.nbext_index._watched, set())
+        with io.open(self.nbext_index.index_path, 'r',
+                     encoding='utf-8') as f:
+            nt.assert_in(os.path.join('delta', 'delta.yaml'),
+                         json.load(f)['roots'][self.nbext_dir]['files'])
+
+
+class NoConfigAuthorizer(Authorizer):
+    """Authorizer denying all access to config."""
+
+    def is_authorized(self, handler, user, action, resource):
+        return resource != 'config'
+
+
+class AuthorizationTest(HandlerTestBase):
+    """Tests for the authorization of the json endpoints."""
+
+    def get_server_kwargs(self):
+        kwargs = super(AuthorizationTest, self).get_server_kwargs()
+        kwargs['authorizer_class'] = NoConfigAuthorizer
+        return kwargs
+
+    def test_config_access_required(self):
+        """Check that all the json endpoints need read access to config."""
+        for path in ('list', 'bootstrap', 'extension/alpha/alpha', 'icons',
+                     'config'):
+            response = self.fetch_configurator(path)
+            nt.assert_equal(response.code, 403, path)
@@ -0,0 +1,719 @@
+# -*- coding: utf-8 -*-
+"""Tests for nbextension yaml descriptor discovery and indexing."""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals,
+)
+
+import base64
+import io
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase, skipIf
+
+import nose.tools as nt
+import yaml
+from tornado import gen
+from tornado.testing import AsyncTestCase, gen_test
+
+import jupyter_nbextensions_configurator
+from jupyter_nbextensions_configurator import (
+    SUMMARY_FIELDS, NBExtensionIndex, _get_markdown_renderer,
+    build_shared_nbextension_index, get_configurable_nbextensions,
+)
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch  # py2
+
+
+def make_spec(require, **kwargs):
+    """Return a minimal valid nbextension spec."""
+    spec = {
+        str('Type'): str('Jupyter Notebook Extension'),
+        str('Main'): str(require.rsplit('/', 1)[-1] + '.js'),
+        str('Name'): str(require),
+    }
+    spec.update(kwargs)
+    return spec
+
+
+class NbextDirTestBase(TestCase):
+    """Base class for tests using a temporary nbextensions directory."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.nbext_dir = os.path.join(self.tmp_dir, 'nbextensions')
+        self.index_path = os.path.join(self.tmp_dir, 'index.json')
+        for name in ('alpha', 'beta', 'gamma'):
+            self.write_yaml(os.path.join(name, name + '.yaml'),
+                            make_spec(name + '/' + name))
+        self.write_yaml(os.path.join('mathjax', 'excluded.yaml'),
+                        make_spec('mathjax/excluded'))
+
+    def write_yaml(self, relpath, obj):
+        yaml_path = os.path.join(self.nbext_dir, relpath)
+        if not os.path.isdir(os.path.dirname(yaml_path)):
+            os.makedirs(os.path.dirname(yaml_path))
+        with io.open(yaml_path, 'w') as f:
+            yaml.dump(obj, f, default_flow_style=False)
+        return yaml_path
+
+    def get_nbexts(self, **kwargs):
+        kwargs.setdefault('index_path', self.index_path)
+        return get_configurable_nbextensions(
+            [self.nbext_dir], as_dict=True, **kwargs)
+
+
+class DescriptorIndexTest(NbextDirTestBase):
+    """Tests for the on-disk descriptor index."""
+
+    def test_00_index_matches_unindexed(self):
+        """Check that indexing doesn't change the nbextensions found."""
+        unindexed = self.get_nbexts(index_path=None)
+        nt.assert_equal(
+            sorted(unindexed), ['alpha/alpha', 'beta/beta', 'gamma/gamma'])
+        nt.assert_equal(self.get_nbexts(), unindexed)
+        nt.assert_equal(self.get_nbexts(), unindexed)
+
+    def test_01_index_saved(self):
+        """Check that the index gets written to disk."""
+        nt.assert_false(os.path.exists(self.index_path))
+        self.get_nbexts()
+        with io.open(self.index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        nt.assert_in(self.nbext_dir, index['roots'])
+        nt.assert_in(os.path.join('alpha', 'alpha.yaml'),
+                     index['roots'][self.nbext_dir]['files'])
+
+    def test_02_unchanged_not_reparsed(self):
+        """Check that unchanged files are not parsed again."""
+        self.get_nbexts()
+        with patch.object(yaml, 'load',
+                          side_effect=AssertionError('reparsed')):
+            nt.assert_equal(len(self.get_nbexts()), 3)
+
+    def test_03_changed_reparsed(self):
+        """Check that changed, added and removed files are picked up."""
+        self.get_nbexts()
+        yaml_path = self.write_yaml(
+            os.path.join('beta', 'beta.yaml'),
+            make_spec('beta/beta', Description=str('a longer description')))
+        # ensure the mtime changes, even on coarse-grained filesystems
+        stat = os.stat(yaml_path)
+        os.utime(yaml_path, (stat.st_atime, stat.st_mtime + 10))
+        self.write_yaml(os.path.join('delta', 'delta.yml'),
+                        make_spec('delta/delta'))
+        shutil.rmtree(os.path.join(self.nbext_dir, 'gamma'))
+        nbexts = self.get_nbexts()
+        nt.assert_equal(
+            sorted(nbexts), ['alpha/alpha', 'beta/beta', 'delta/delta'])
+        nt.assert_equal(nbexts['beta/beta']['extension']['Description'],
+                        'a longer description')
+
+    def test_04a_parallel_parsing(self):
+        """Check that parsing in parallel gives the same results."""
+        for ii in range(20):
+            self.write_yaml(os.path.join('many', str(ii), 'nbext.yaml'),
+                            make_spec('nbext'))
+        # shadow an nbextension from a second directory, to check that the
+        # same duplicate wins
+        shadow_dir = os.path.join(self.tmp_dir, 'shadow')
+        os.makedirs(os.path.join(shadow_dir, 'beta'))
+        shutil.copy(os.path.join(self.nbext_dir, 'beta', 'beta.yaml'),
+                    os.path.join(shadow_dir, 'beta', 'beta.yaml'))
+        nbext_dirs = [self.nbext_dir, shadow_dir]
+        serial = get_configurable_nbextensions(nbext_dirs, as_dict=True)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            parallel = get_configurable_nbextensions(
+                nbext_dirs, as_dict=True, executor=executor)
+        nt.assert_equal(parallel, serial)
+        nt.assert_equal(
+            list(parallel), list(serial), 'order should be preserved')
+        nt.assert_equal(len(parallel), 23)
+        nt.assert_equal(parallel['beta/beta']['yaml_path'],
+                        os.path.join(shadow_dir, 'beta', 'beta.yaml'))
+
+    def test_04_corrupt_index(self):
+        """Check that a corrupt index file is ignored and replaced."""
+        with io.open(self.index_path, 'w', encoding='utf-8') as f:
+            f.write('{"not": "valid json",')
+        nt.assert_equal(len(self.get_nbexts()), 3)
+        with io.open(self.index_path, 'r', encoding='utf-8') as f:
+            nt.assert_in(self.nbext_dir, json.load(f)['roots'])
+
+    def test_04b_scan_scope(self):
+        """Check that exclude & include patterns and max_depth apply."""
+        self.write_yaml(os.path.join('alpha', 'node_modules', 'dep.yaml'),
+                        make_spec('alpha/dep'))
+        self.write_yaml(os.path.join('deep', 'er', 'deeper.yaml'),
+                        make_spec('deep/deeper'))
+        self.write_yaml(os.path.join('beta', 'beta.nbext.yml'),
+                        make_spec('beta/other'))
+        nt.assert_equal(sorted(self.get_nbexts(
+            exclude_dirs=('mathjax', 'node_modules', 'gam*'))), [
+                'alpha/alpha', 'beta/beta', 'beta/other', 'deep/er/deeper'])
+        # the same index copes with the patterns changing
+        nt.assert_equal(sorted(self.get_nbexts(
+            exclude_dirs=('mathjax', 'alpha/*', 'deep/er'),
+            include_files=('*.nbext.yml', 'alpha.yaml'))), [
+                'alpha/alpha', 'beta/other'])
+        nt.assert_equal(sorted(self.get_nbexts(max_depth=1)), [
+            'alpha/alpha', 'beta/beta', 'beta/other', 'gamma/gamma'])
+        nt.assert_equal(self.get_nbexts(max_depth=0), {})
+
+    @skipIf(not hasattr(os, 'symlink'), 'symlinks unsupported')
+    def test_04c_symlink_policy(self):
+        """Check that symlinked directories are followed as configured."""
+        os.symlink(os.path.join(self.nbext_dir, 'alpha'),
+                   os.path.join(self.nbext_dir, 'linked'))
+        os.symlink(self.nbext_dir,
+                   os.path.join(self.nbext_dir, 'beta', 'cycle'))
+        nt.assert_equal(
+            self.get_nbexts(index_path=None, follow_symlinks='none'),
+            self.get_nbexts(index_path=None, exclude_dirs=(
+                'mathjax', 'linked', 'cycle')))
+        # only the first path found to each directory is used
+        nbexts = self.get_nbexts(follow_symlinks='unique')
+        nt.assert_equal(
+            sorted(nbexts), ['alpha/alpha', 'beta/beta', 'gamma/gamma'])
+        nbexts = self.get_nbexts(
+            follow_symlinks='all', exclude_dirs=('mathjax', 'cycle'))
+        nt.assert_equal(sorted(nbexts), [
+            'alpha/alpha', 'beta/beta', 'gamma/gamma', 'linked/alpha'])
+
+    @skipIf(not hasattr(os, 'symlink'), 'symlinks unsupported')
+    def test_04d_repeated_dirs(self):
+        """Check that directories found several times are only used once."""
+        alias_dir = os.path.join(self.tmp_dir, 'alias')
+        os.symlink(self.nbext_dir, alias_dir)
+        os.symlink(self.nbext_dir,
+                   os.path.join(self.nbext_dir, 'beta', 'cycle'))
+        log = logging.getLogger(__name__)
+        with self.assertLogs(log, logging.DEBUG) as logs:
+            nbexts = get_configurable_nbextensions(
+                [self.nbext_dir, alias_dir], as_dict=True, log=log)
+        nt.assert_equal(
+            sorted(nbexts), ['alpha/alpha', 'beta/beta', 'gamma/gamma'])
+        nt.assert_equal(
+            nbexts['alpha/alpha']['yaml_path'],
+            os.path.join(self.nbext_dir, 'alpha', 'alpha.yaml'))
+        nt.assert_false(any('duplicate' in msg for msg in logs.output))
+        nt.assert_true(any('Skipping symlink cycle at {}'.format(
+            os.path.join(self.nbext_dir, 'beta', 'cycle')) in msg
+            for msg in logs.output))
+        nt.assert_true(any('Skipping 4 directories in {}'.format(alias_dir)
+                           in msg for msg in logs.output))
+        # whereas following all symlinks finds the same descriptors again
+        nbexts = get_configurable_nbextensions(
+            [self.nbext_dir, alias_dir], as_dict=True,
+            exclude_dirs=('mathjax', 'cycle'), follow_symlinks='all')
+        nt.assert_equal(
+            nbexts['alpha/alpha']['yaml_path'],
+            os.path.join(alias_dir, 'alpha', 'alpha.yaml'))
+
+    @skipIf(not hasattr(os, 'symlink'), 'symlinks unsupported')
+    def test_04e_retargeted_symlink(self):
+        """Check that a symlink retargeted to a same-mtime dir is relisted."""
+        mtime = time.time() - 100
+        for name in ('old', 'new'):
+            target = os.path.join(self.tmp_dir, name)
+            os.makedirs(target)
+            self.write_yaml(os.path.join('..', name, name + '.yaml'),
+                            make_spec('linked/' + name))
+            os.utime(target, (mtime, mtime))
+        link = os.path.join(self.nbext_dir, 'linked')
+        os.symlink(os.path.join(self.tmp_dir, 'old'), link)
+        nt.assert_in('linked/old', self.get_nbexts())
+        os.remove(link)
+        os.symlink(os.path.join(self.tmp_dir, 'new'), link)
+        nbexts = self.get_nbexts()
+        nt.assert_in('linked/new', nbexts)
+        nt.assert_not_in('linked/old', nbexts)
+
+    def test_04f_racy_listings(self):
+        """Check that only listings taken after their mtime tick are reused."""
+        self.get_nbexts()
+        beta_dir = os.path.join(self.nbext_dir, 'beta')
+        stat = os.stat(beta_dir)
+        self.write_yaml(os.path.join('beta', 'other.yaml'),
+                        make_spec('beta/other'))
+        # as if the file was added in the same mtime tick as the scan
+        os.utime(beta_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        nt.assert_in('beta/other', self.get_nbexts())
+        # whereas listings of directories last changed long before are
+        mtime = time.time() - 100
+        for dirpath, _, _ in os.walk(self.nbext_dir):
+            os.utime(dirpath, (mtime, mtime))
+        nbexts = self.get_nbexts()
+        with patch.object(os, 'scandir',
+                          side_effect=AssertionError('relisted')):
+            nt.assert_equal(self.get_nbexts(), nbexts)
+
+
+class NBExtensionIndexCacheTest(NbextDirTestBase):
+    """Tests for the in-process cache of encoded nbextensions lists."""
+
+    def setUp(self):
+        super(NBExtensionIndexCacheTest, self).setUp()
+        self.nbext_index = NBExtensionIndex(index_path=self.index_path)
+
+    def test_05_cache_hit(self):
+        """Check that cache hits don't rescan."""
+        list_json = self.nbext_index.get_list_json([self.nbext_dir])
+        nt.assert_equal(len(json.loads(list_json.decode('utf-8'))), 3)
+        with patch.object(jupyter_nbextensions_configurator,
+                          'get_configurable_nbextensions',
+                          side_effect=AssertionError('rescanned')):
+            nt.assert_is(
+                self.nbext_index.get_list_json([self.nbext_dir]), list_json)
+
+    def test_06_cache_invalidated(self):
+        """Check that installs, ttl expiry and size bound invalidate."""
+        self.nbext_index.get_list_json([self.nbext_dir])
+        self.write_yaml(os.path.join('delta', 'delta.yml'),
+                        make_spec('delta/delta'))
+        stat = os.stat(self.nbext_dir)
+        os.utime(self.nbext_dir, (stat.st_atime, stat.st_mtime + 10))
+        list_json = self.nbext_index.get_list_json([self.nbext_dir])
+        nt.assert_equal(len(json.loads(list_json.decode('utf-8'))), 4)
+
+        self.nbext_index.cache_ttl = 0
+        nt.assert_is_not(
+            self.nbext_index.get_list_json([self.nbext_dir]), list_json)
+
+        self.nbext_index.cache_ttl = 60
+        self.nbext_index.cache_size = 1
+        self.nbext_index.get_list_json([self.nbext_dir])
+        self.nbext_index.get_list_json([self.nbext_dir, self.tmp_dir])
+        nt.assert_equal(list(self.nbext_index._cache),
+                        [(self.nbext_dir, self.tmp_dir)])
+
+    def test_07_validators(self):
+        """Check that the etag & last-modified only change with the list."""
+        self.nbext_index.cache_ttl = 0
+        entry = self.nbext_index.get_list([self.nbext_dir])
+        unchanged = self.nbext_index.get_list([self.nbext_dir])
+        nt.assert_equal(unchanged['etag'], entry['etag'])
+        nt.assert_equal(unchanged['last_modified'], entry['last_modified'])
+        self.write_yaml(os.path.join('delta', 'delta.yml'),
+                        make_spec('delta/delta'))
+        changed = self.nbext_index.get_list([self.nbext_dir])
+        nt.assert_not_equal(changed['etag'], entry['etag'])
+        nt.assert_greater_equal(
+            changed['last_modified'], entry['last_modified'])
+
+    def test_07c_shared_index(self):
+        """Check that shared directories are loaded from the shared index."""
+        shared_dir = os.path.join(self.tmp_dir, 'shared')
+        os.makedirs(os.path.join(shared_dir, 'epsilon'))
+        with io.open(os.path.join(
+                shared_dir, 'epsilon', 'epsilon.yaml'), 'w') as f:
+            yaml.dump(make_spec('epsilon/epsilon'), f)
+        shared_index_path = build_shared_nbextension_index(
+            os.path.join(self.tmp_dir, 'shared.json'), [shared_dir])
+        nbext_index = NBExtensionIndex(
+            index_path=self.index_path, shared_index_path=shared_index_path)
+        nbext_dirs = [self.nbext_dir, shared_dir]
+        nbexts = json.loads(
+            nbext_index.get_list_json(nbext_dirs).decode('utf-8'))
+        nt.assert_in('epsilon/epsilon', [nbext['require'] for nbext in nbexts])
+        with io.open(self.index_path, 'r', encoding='utf-8') as f:
+            nt.assert_equal(list(json.load(f)['roots']), [self.nbext_dir])
+
+        # shared specs aren't parsed again, even with a fresh server
+        nbext_index = NBExtensionIndex(
+            index_path=self.index_path, shared_index_path=shared_index_path)
+        with patch.object(yaml, 'load',
+                          side_effect=AssertionError('reparsed')):
+            nt.assert_equal(nbext_index.get_list(nbext_dirs)['json'],
+                            json.dumps(nbexts, separators=(',', ':'),
+                                       sort_keys=True).encode('utf-8'))
+        # but newly installed nbextensions are still found
+        os.makedirs(os.path.join(shared_dir, 'zeta'))
+        with io.open(os.path.join(shared_dir, 'zeta', 'zeta.yaml'), 'w') as f:
+            yaml.dump(make_spec('zeta/zeta'), f)
+        stat = os.stat(shared_dir)
+        os.utime(shared_dir, (stat.st_atime, stat.st_mtime + 10))
+        nbexts = json.loads(
+            nbext_index.get_list_json(nbext_dirs).decode('utf-8'))
+        nt.assert_in('zeta/zeta', [nbext['require'] for nbext in nbexts])
+
+    def test_07a_projections(self):
+        """Check that projected lists only hold the requested fields."""
+        entry = self.nbext_index.get_list([self.nbext_dir])
+        summary = self.nbext_index.get_list(
+            [self.nbext_dir], fields=SUMMARY_FIELDS)
+        nbexts = json.loads(summary['json'].decode('utf-8'))
+        nt.assert_equal(len(nbexts), 3)
+        for nbext in nbexts:
+            nt.assert_equal(sorted(nbext), sorted(SUMMARY_FIELDS))
+        nt.assert_not_equal(summary['etag'], entry['etag'])
+        nt.assert_is(summary, self.nbext_index.get_list(
+            [self.nbext_dir], fields=['Section', 'Compatibility', 'Name']))
+        # require is always included, and missing fields are skipped
+        nbexts = json.loads(self.nbext_index.get_list_json(
+            [self.nbext_dir], fields=['Main', 'Parameters']).decode('utf-8'))
+        nt.assert_equal(nbexts[0], {'require': 'alpha/alpha',
+                                    'Main': 'alpha.js'})
+        # compact, with a stable key order
+        nt.assert_not_in(b' ', summary['json'])
+        keys = list(json.loads(entry['json'].decode('utf-8'))[0])
+        nt.assert_equal(keys, sorted(keys))
+
+    def test_07b_single_extension(self):
+        """Check that single specs are served from the cached list."""
+        nbexts = self.get_nbexts()
+        with patch.object(jupyter_nbextensions_configurator,
+                          'get_configurable_nbextensions',
+                          wraps=get_configurable_nbextensions) as mock_get:
+            nt.assert_equal(
+                self.nbext_index.get_extension([self.nbext_dir], 'beta/beta'),
+                nbexts['beta/beta']['extension'])
+            nt.assert_is_none(self.nbext_index.get_extension(
+                [self.nbext_dir], 'beta/nonexistent'))
+        nt.assert_equal(mock_get.call_count, 1)
+
+    def test_07d_search_index(self):
+        """Check the inverted index used by the page's filter."""
+        self.write_yaml(os.path.join('beta', 'beta.yaml'), make_spec(
+            'beta/beta', Description='Saves, auto-matically!',
+            Section='tree', tags=['Saving', 'misc']))
+        entry = self.nbext_index.get_list([self.nbext_dir])
+        search_json = self.nbext_index.get_search_index_json(entry)
+        nt.assert_is(search_json,
+                     self.nbext_index.get_search_index_json(entry))
+        search = json.loads(search_json.decode('utf-8'))
+        requires = [nbext['require'] for nbext in
+                    json.loads(entry['json'].decode('utf-8'))]
+        beta = requires.index('beta/beta')
+        for word in ('saves', 'auto', 'matically', 'saving', 'tree'):
+            nt.assert_equal(search['words'][word], [beta])
+        nt.assert_equal(sorted(search['words']['alpha']),
+                        [requires.index('alpha/alpha')])
+        nt.assert_equal(search['tags'], {'Saving': [beta], 'misc': [beta]})
+        nt.assert_equal(search['sections']['tree'], [beta])
+        nt.assert_equal(len(search['sections']['notebook']), 2)
+
+    def test_07e_list_changes(self):
+        """Check the changes to a list since an earlier version."""
+        nt.assert_is_none(self.nbext_index.get_list_changes(
+            self.nbext_index.get_list([self.nbext_dir]), 'unknown'))
+        entry = self.nbext_index.get_list([self.nbext_dir])
+        nt.assert_is_none(self.nbext_index.get_list_changes(entry))
+        since = entry['etag'].strip('"')
+        nt.assert_equal(
+            self.nbext_index.get_list_changes(entry, since, SUMMARY_FIELDS),
+            {'added': [], 'modified': [], 'removed': []})
+        shutil.rmtree(os.path.join(self.nbext_dir, 'alpha'))
+        self.write_yaml(os.path.join('beta', 'beta.yaml'), make_spec(
+            'beta/beta', Name='Beta'))
+        self.write_yaml(os.path.join('delta', 'delta.yaml'),
+                        make_spec('delta/delta'))
+        self.nbext_index.invalidate()
+        entry = self.nbext_index.get_list([self.nbext_dir])
+        changes = self.nbext_index.get_list_changes(
+            entry, since, SUMMARY_FIELDS)
+        nt.assert_equal(changes['removed'], ['alpha/alpha'])
+        nt.assert_equal(changes['modified'], [{
+            'require': 'beta/beta', 'Name': 'Beta', 'Section': 'notebook',
+            'Compatibility': '?.x'}])
+        nt.assert_equal([nbext['require'] for nbext in changes['added']],
+                        ['delta/delta'])
+        # changes to fields left out of the projection count, too
+        since = entry['etag'].strip('"')
+        self.write_yaml(os.path.join('gamma', 'gamma.yaml'), make_spec(
+            'gamma/gamma',
+            Parameters=[{'name': 'gamma.x', 'input_type': 'number'}]))
+        self.nbext_index.invalidate()
+        entry = self.nbext_index.get_list([self.nbext_dir])
+        nt.assert_not_equal(entry['etag'].strip('"'), since)
+        changes = self.nbext_index.get_list_changes(
+            entry, since, SUMMARY_FIELDS)
+        nt.assert_equal(changes, {'added': [], 'removed': [], 'modified': [{
+            'require': 'gamma/gamma', 'Name': 'gamma/gamma',
+            'Section': 'notebook', 'Compatibility': '?.x'}]})
+        # only the last cache_size versions are remembered
+        self.nbext_index.cache_size = 1
+        self.nbext_index.get_list_changes(entry)
+        nt.assert_is_none(self.nbext_index.get_list_changes(entry, since))
+
+    def test_07f_asset_hashes(self):
+        """Check that readme & icon hashes change with their contents."""
+        self.write_yaml(os.path.join('beta', 'beta.yaml'), make_spec(
+            'beta/beta', Link='readme.md', Icon='missing.png'))
+        readme_path = os.path.join(self.nbext_dir, 'beta', 'readme.md')
+        with io.open(readme_path, 'w') as f:
+            f.write('# Beta\n')
+        beta = self.nbext_index.get_extension([self.nbext_dir], 'beta/beta')
+        nt.assert_equal(beta['readme'], 'beta/readme.md')
+        readme_hash = beta['readme_hash']
+        nt.assert_not_in('icon_hash', beta)
+        # the descriptor index isn't changed
+        nt.assert_not_in('readme_hash', self.get_nbexts()['beta/beta'][
+            'extension'])
+        with io.open(readme_path, 'a') as f:
+            f.write('more text\n')
+        self.nbext_index.invalidate()
+        beta = self.nbext_index.get_extension([self.nbext_dir], 'beta/beta')
+        nt.assert_not_equal(beta['readme_hash'], readme_hash)
+        self.nbext_index.asset_hashes = False
+        self.nbext_index.invalidate()
+        nt.assert_not_in('readme_hash', self.nbext_index.get_extension(
+            [self.nbext_dir], 'beta/beta'))
+
+    def test_07g_icon_bundle(self):
+        """Check that icons are bundled as data uris."""
+        for name, size in (('beta', 10), ('gamma', 100 * 1024)):
+            self.write_yaml(os.path.join(name, name + '.yaml'), make_spec(
+                name + '/' + name, Icon='icon.png'))
+            with io.open(os.path.join(
+                    self.nbext_dir, name, 'icon.png'), 'wb') as f:
+                f.write(b'\x89PNG' * (size // 4))
+        entry = self.nbext_index.get_list([self.nbext_dir])
+        bundle_hash = self.nbext_index.get_icon_bundle_hash(entry)
+        bundle_json = self.nbext_index.get_icon_bundle(
+            [self.nbext_dir], entry)
+        nt.assert_is(bundle_json, self.nbext_index.get_icon_bundle(
+            [self.nbext_dir], entry))
+        # too-large icons are left out
+        nt.assert_equal(json.loads(bundle_json.decode('utf-8')), {
+            'beta/beta': 'data:image/png;base64,' + base64.b64encode(
+                b'\x89PNG\x89PNG').decode('ascii')})
+        # changing an icon changes the hash
+        with io.open(os.path.join(
+                self.nbext_dir, 'beta', 'icon.png'), 'ab') as f:
+            f.write(b'more')
+        self.nbext_index.invalidate()
+        nt.assert_not_equal(self.nbext_index.get_icon_bundle_hash(
+            self.nbext_index.get_list([self.nbext_dir])), bundle_hash)
+        self.nbext_index.asset_hashes = False
+        self.nbext_index.invalidate()
+        nt.assert_is_none(self.nbext_index.get_icon_bundle_hash(
+            self.nbext_index.get_list([self.nbext_dir])))
+
+
+@skipIf(_get_markdown_renderer() is None, 'needs mistune and bleach')
+class ReadmeRenderTest(NbextDirTestBase):
+    """Tests for server-side rendering of markdown readmes."""
+
+    def setUp(self):
+        super(ReadmeRenderTest, self).setUp()
+        self.nbext_index = NBExtensionIndex(
+            index_path=self.index_path, render_markdown=True)
+        self.md_path = os.path.join(self.nbext_dir, 'alpha', 'readme.md')
+        with io.open(self.md_path, 'w') as f:
+            f.write('# A heading\n\n[link](other.md) ![img](img.png)\n'
+                    '<script>alert("hi")</script>\n')
+
+    def render(self, path='alpha/readme.md', is_html=True):
+        rendered = self.nbext_index.render_readme(
+            [self.nbext_dir], path, '/base/nbextensions/alpha/readme.md')
+        if rendered is None:
+            return None
+        nt.assert_equal(rendered[1], is_html)
+        return rendered[0]
+
+    def test_render_readme(self):
+        """Check that readmes are rendered, sanitized and cached."""
+        html = self.render().decode('utf-8')
+        nt.assert_in('<h1 id="A-heading">', html)
+        nt.assert_in('href="/base/nbextensions/alpha/other.md"', html)
+        nt.assert_in('src="/base/nbextensions/alpha/img.png"', html)
+        nt.assert_not_in('<script>', html)
+        with patch.object(self.nbext_index, '_markdown_renderer',
+                          side_effect=AssertionError('rerendered')):
+            nt.assert_equal(self.render().decode('utf-8'), html)
+        # changing the file invalidates the cached html
+        with io.open(self.md_path, 'a') as f:
+            f.write('more text\n')
+        nt.assert_in('more text', self.render().decode('utf-8'))
+
+    def test_render_readme_missing(self):
+        """Check that missing & out-of-tree files aren't rendered."""
+        nt.assert_is_none(self.render('alpha/nonexistent.md'))
+        nt.assert_is_none(self.render('../index.json'))
+        self.nbext_index.render_markdown = False
+        nt.assert_is_none(self.render())
+
+    def test_render_readme_fallback(self):
+        """Check that readmes failing to render are left to browsers."""
+        with patch.object(self.nbext_index, '_markdown_renderer',
+                          side_effect=AttributeError('no mistune.html')):
+            with io.open(self.md_path, 'rb') as f:
+                nt.assert_equal(self.render(is_html=False), f.read())
+        # math is left to browsers, which protect it from the renderer
+        for md_text in ('$x_1 * y_1$\n', '$$\na_b\n$$\n',
+                        '\\begin{align} a_b \\end{align}\n', '\\\\(a_b\\\\)'):
+            with io.open(self.md_path, 'w') as f:
+                f.write(md_text)
+            nt.assert_equal(
+                self.render(is_html=False).decode('utf-8'), md_text)
+        # mistune < 2 can't be used at all
+        with patch.dict(sys.modules, {'mistune': types.ModuleType('mistune')}):
+            nt.assert_is_none(_get_markdown_renderer())
+
+
+class NBExtensionIndexAsyncTest(AsyncTestCase, NbextDirTestBase):
+    """Tests for scanning off the IOLoop."""
+
+    def setUp(self):
+        AsyncTestCase.setUp(self)
+        NbextDirTestBase.setUp(self)
+        self.nbext_index = NBExtensionIndex(index_path=self.index_path)
+
+    @gen_test
+    def test_08_coalesced_scans(self):
+        """Check that concurrent requests share a single scan."""
+        release = threading.Event()
+        build_entry = self.nbext_index._build_entry
+        calls = []
+
+        def slow_build_entry(*args):
+            calls.append(threading.current_thread())
+            release.wait(5)
+            return build_entry(*args)
+
+        with patch.object(self.nbext_index, '_build_entry',
+                          side_effect=slow_build_entry):
+            futures = [self.nbext_index.get_list_async([self.nbext_dir])
+                       for ii in range(3)]
+            gathered = gen.multi(futures)
+            yield gen.sleep(0.1)
+            release.set()
+            entries = yield gathered
+        nt.assert_equal(len(calls), 1)
+        nt.assert_is_not(calls[0], threading.current_thread())
+        nt.assert_true(all(entry is entries[0] for entry in entries))
+        # the result should now be cached
+        entry = yield self.nbext_index.get_list_async([self.nbext_dir])
+        nt.assert_is(entry, entries[0])
+
+    @gen_test
+    def test_09_watched_updates(self):
+        """Check that watched lists are updated without rescanning."""
+        self.nbext_index.watch = True
+        self.nbext_index.poll_interval = 0.1
+        self.addCleanup(self.nbext_index.stop_watching)
+        entry = yield self.nbext_index.get_list_async([self.nbext_dir])
+        nt.assert_equal(
+            self.nbext_index._watched, {self.nbext_dir})
+        self.write_yaml(os.path.join('delta', 'delta.yml'),
+                        make_spec('delta/delta'))
+        with patch.object(jupyter_nbextensions_configurator,
+                          'get_configurable_nbextensions',
+                          side_effect=AssertionError('rescanned')):
+            for ii in range(50):
+                yield gen.sleep(0.1)
+                updated = yield self.nbext_index.get_list_async(
+                    [self.nbext_dir])
+                if updated is not entry:
+                    break
+        nbexts = json.loads(updated['json'].decode('utf-8'))
+        nt.assert_in('delta/delta', [nbext['require'] for nbext in nbexts])
+        nt.assert_not_equal(updated['etag'], entry['etag'])
+
+    @gen_test
+    def test_10_single_descriptor_update(self):
+        """Check that a changed descriptor is updated on its own."""
+        self.nbext_index.watch = True
+        self.addCleanup(self.nbext_index.stop_watching)
+        entry = yield self.nbext_index.get_list_async([self.nbext_dir])
+        shutil.rmtree(os.path.join(self.nbext_dir, 'gamma'))
+        with patch.object(jupyter_nbextensions_configurator,
+                          '_index_nbextension_dir',
+                          side_effect=AssertionError('rescanned')):
+            self.nbext_index._queue_update(
+                self.nbext_dir, os.path.join('gamma', 'gamma.yaml'))
+            yield self.nbext_index._flush_updates()
+        updated = yield self.nbext_index.get_list_async([self.nbext_dir])
+        nbexts = json.loads(updated['json'].decode('utf-8'))
+        nt.assert_equal(
+            [nbext['require'] for nbext in nbexts],
+            ['alpha/alpha', 'beta/beta'])
+        nt.assert_not_equal(updated['etag'], entry['etag'])
+        with io.open(self.index_path, 'r', encoding='utf-8') as f:
+            nt.assert_not_in(os.path.join('gamma', 'gamma.yaml'),
+                             json.load(f)['roots'][self.nbext_dir]['files'])
+
+    @gen_test
+    def test_10a_rescan_rehashes_assets(self):
+        """Check that watched rescans pick up changed readmes."""
+        self.write_yaml(os.path.join('beta', 'beta.yaml'), make_spec(
+            'beta/beta', Link='readme.md'))
+        readme_path = os.path.join(self.nbext_dir, 'beta', 'readme.md')
+        with io.open(readme_path, 'w') as f:
+            f.write('# Beta\n')
+        self.nbext_index.watch = True
+        self.addCleanup(self.nbext_index.stop_watching)
+        entry = yield self.nbext_index.get_list_async([self.nbext_dir])
+        self.nbext_index._queue_update(self.nbext_dir)
+        yield self.nbext_index._flush_updates()
+        nt.assert_is(
+            (yield self.nbext_index.get_list_async([self.nbext_dir])), entry)
+        with io.open(readme_path, 'a') as f:
+            f.write('more text\n')
+        self.nbext_index._queue_update(self.nbext_dir)
+        yield self.nbext_index._flush_updates()
+        updated = yield self.nbext_index.get_list_async([self.nbext_dir])
+        nt.assert_not_equal(updated['etag'], entry['etag'])
+        # the hash of a readme which has gone is dropped
+        nt.assert_in('readme_hash', self.nbext_index.get_extension(
+            [self.nbext_dir], 'beta/beta'))
+        os.remove(readme_path)
+        self.nbext_index._queue_update(self.nbext_dir)
+        yield self.nbext_index._flush_updates()
+        nt.assert_not_in('readme_hash', self.nbext_index.get_extension(
+            [self.nbext_dir], 'beta/beta'))
+
+    @gen_test
+    def test_11_warm_up(self):
+        """Check that a warm-up scan fills the cache in the background."""
+        self.addCleanup(self.nbext_index.close)
+        self.nbext_index.warm_up_delay = 0.05
+        self.nbext_index.schedule_warm_up(lambda: [self.nbext_dir])
+        nt.assert_is_none(self.nbext_index._get_fresh((self.nbext_dir,)))
+        for ii in range(50):
+            yield gen.sleep(0.05)
+            entry = self.nbext_index._get_fresh((self.nbext_dir,))
+            if entry is not None:
+                break
+        nt.assert_is_not_none(entry, 'warm-up scan should fill the cache')
+        nt.assert_true(os.path.exists(self.index_path))
+
+    @gen_test
+    def test_12_warm_up_cancelled(self):
+        """Check that a cancelled warm-up scan doesn't happen."""
+        self.addCleanup(self.nbext_index.close)
+        self.nbext_index.warm_up_delay = 0.05
+        self.nbext_index.schedule_warm_up(lambda: [self.nbext_dir])
+        self.nbext_index.cancel_warm_up()
+        yield gen.sleep(0.2)
+        nt.assert_is_none(self.nbext_index._get_fresh((self.nbext_dir,)))
+        nt.assert_false(os.path.exists(self.index_path))
+        # nor does one cancelled part-way through
+        self.nbext_index.schedule_warm_up(
+            lambda: [self.nbext_dir, self.nbext_dir + '_other'])
+        calls = []
+
+        def cancelling_scan(*args, **kwargs):
+            calls.append(kwargs['nbextension_dirs'])
+            self.nbext_index._warm_up_cancelled.set()
+            return []
+
+        with patch.object(jupyter_nbextensions_configurator,
+                          'get_configurable_nbextensions',
+                          side_effect=cancelling_scan):
+            yield gen.sleep(0.3)
+        nt.assert_equal(calls, [[self.nbext_dir]])
+        nt.assert_is_none(self.nbext_index._get_fresh((self.nbext_dir,)))
@@ -2,6 +2,9 @@
 
 """Test the package"""
 
+import subprocess
+import sys
+
 from jupyter_contrib_core.testing_utils import raise_on_bad_version
 
 from jupyter_nbextensions_configurator import __version__
@@ -10,3 +13,44 @@ from jupyter_nbextensions_configurator import __version__
 def test_current_version():
     """check that version string complies with pep440"""
     raise_on_bad_version(__version__)
+
+
+# budget in microseconds for the time importing each of the package's modules
+# takes itself, excluding the modules it imports, which python -X importtime
+# reports as self time
+IMPORT_TIME_BUDGET = 100000
+
+
+def get_import_times(module_name):
+    """
+    Return self & cumulative import times in microseconds, by module name.
+
+    Imports module_name in a fresh interpreter, using python -X importtime.
+    """
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         'import {}'.format(module_name)],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True)
+    import_times = {}
+    for line in proc.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        self_time = int(fields[0].rsplit(':', 1)[-1])
+        import_times[fields[2].strip()] = (self_time, int(fields[1]))
+    return import_times
+
+
+def test_import_defers_slow_modules():
+    """check that importing the package doesn't import yaml or notebook"""
+    for app_module in ('jupyter_nbextensions_configurator',
+                       'jupyter_nbextensions_configurator.application'):
+        import_times = get_import_times(app_module)
+        for module_name in ('yaml', 'notebook'):
+            assert module_name not in import_times, (
+                '{} imported on importing {}'.format(module_name, app_module))
+        self_time = import_times[app_module][0]
+        assert self_time < IMPORT_TIME_BUDGET, (
+            'importing {} took {} us, over the budget of {} us'.format(
+                app_module, self_time, IMPORT_TIME_BUDGET))
@@ -4,6 +4,7 @@ from __future__ import (
     absolute_import, division, print_function, unicode_literals,
 )
 
+import copy
 import io
 import os
 import random
@@ -66,7 +67,7 @@ class ConfiguratorTest(SeleniumNbextensionTestBase):
 
     def test_04_readme_rendering(self):
         # load an nbextension UI whose readme contains an image to render
-        self.wait_for_partial_link_text('dashboard').click()
+        self.wait_for_selector_link('dashboard').click()
         self.wait_for_selector('.nbext-readme > .panel-body img',
                                'there should be an image in the readme')
 
@@ -80,7 +81,7 @@ class ConfiguratorTest(SeleniumNbextensionTestBase):
         self.wait_for_selector(
             '.nbext-ext-row', 'an nbextension ui should load')
         # now enable the appropriate nbextension
-        self.wait_for_partial_link_text(
+        self.wait_for_selector_link(
             'dashboard'
         ).find_element_by_css_selector('.nbext-enable-toggle').click()
         self.check_extension_enabled(
@@ -96,7 +97,7 @@ class ConfiguratorTest(SeleniumNbextensionTestBase):
 
     def test_08_disable_tree_tab(self):
         # now disable the appropriate nbextension & wait for update to config
-        self.wait_for_partial_link_text(
+        self.wait_for_selector_link(
             'dashboard'
         ).find_element_by_css_selector('.nbext-enable-toggle').click()
         self.check_extension_enabled(
@@ -121,7 +122,7 @@ class ConfiguratorTest(SeleniumNbextensionTestBase):
         self.set_extension_enabled(section, require, True)
         # refresh the list to check that it appears
         self.wait_for_selector('.nbext-button-refreshlist').click()
-        self.wait_for_partial_link_text(require)
+        self.wait_for_selector_link(require)
         selector = self.driver.find_element_by_css_selector('.nbext-selector')
         nt.assert_in(
             'daemon', selector.text,
@@ -135,7 +136,7 @@ class ConfiguratorTest(SeleniumNbextensionTestBase):
             'potentially incompatible nbextensions should show checkbox'
         ).click()
         # select it, now it's configurable
-        self.driver.find_element_by_partial_link_text(require).click()
+        self.wait_for_selector_link(require).click()
 
     def test_12_unconfigurable(self):
         section, require = 'notebook', 'balrog/daemon'
@@ -190,7 +191,7 @@ class ConfiguratorTest(SeleniumNbextensionTestBase):
         try:
             self.driver.get(self.nbext_configurator_url)
             self.wait_for_selector('.nbext-selector')
-            self.wait_for_partial_link_text('dummy').click()
+            self.wait_for_selector_link('dummy').click()
             dummy = self.wait_for_xpath('''
 //h3[contains(text(), "dummy")]
 //ancestor::div[
@@ -204,6 +205,38 @@ class ConfiguratorTest(SeleniumNbextensionTestBase):
         finally:
             self.notebook.web_app.settings['nbextensions_path'] = saved
 
+    def test_14_debounced_toggles(self):
+        """Check that toggles in quick succession still reach the server."""
+        section, require = 'tree', 'nbextensions_configurator/tree_tab/main'
+        self.driver.get(self.nbext_configurator_url)
+        self.wait_for_selector(
+            '.nbext-ext-row', 'an nbextension ui should load')
+        toggle = self.wait_for_selector_link(
+            'dashboard'
+        ).find_element_by_css_selector('.nbext-enable-toggle')
+        # toggle thrice within the write delay, so they're written together
+        for ii in range(3):
+            toggle.click()
+        nt.assert_true(
+            self.driver.find_element_by_css_selector(
+                '.nbext-config-pending').is_displayed(),
+            'the indicator for unwritten config updates should show')
+        self.check_extension_enabled(section, require, expected_status=True)
+
+    def test_15_toggle_written_on_unload(self):
+        """Check that a toggle still waiting to be written isn't lost."""
+        section, require = 'tree', 'nbextensions_configurator/tree_tab/main'
+        self.wait_for_selector_link(
+            'dashboard'
+        ).find_element_by_css_selector('.nbext-enable-toggle').click()
+        nt.assert_true(
+            self.driver.find_element_by_css_selector(
+                '.nbext-config-pending').is_displayed(),
+            'the indicator for unwritten config updates should show')
+        # leave the page before the write delay is up
+        self.driver.get(self.base_url())
+        self.check_extension_enabled(section, require, expected_status=False)
+
     @classmethod
     def get_config_manager(cls):
         try:
@@ -302,3 +335,78 @@ class ConfiguratorTest(SeleniumNbextensionTestBase):
         if not os.path.exists(dst_dir):
             os.makedirs(dst_dir)
         shutil.copy(src, dst)
+
+
+class LazySelectorLinksTest(SeleniumNbextensionTestBase):
+    """Tests for building the selector links as they're scrolled into view."""
+
+    # enough nbextensions for several batches of selector links
+    num_extensions = 150
+
+    @property
+    def nbext_configurator_url(self):
+        return url_path_join(self.base_url(), 'nbextensions')
+
+    @staticmethod
+    def lazy_name(index):
+        return 'Lazy nbextension {:03d}'.format(index)
+
+    @classmethod
+    def pre_server_setup(cls):
+        """Add lots of nbextensions in an extra nbextensions dir."""
+        super(LazySelectorLinksTest, cls).pre_server_setup()
+        nbext_dir = os.path.join(cls.jupyter_dirs['root'], 'lazy', 'nbext')
+        if not os.path.exists(nbext_dir):
+            os.makedirs(nbext_dir)
+        # don't change the config shared with other test classes
+        cls.config = copy.deepcopy(cls.config)
+        cls.config.NotebookApp.setdefault(
+            'extra_nbextensions_path', []).append(nbext_dir)
+        for index in range(cls.num_extensions):
+            fname = 'lazy_{:03d}'.format(index)
+            yaml_obj = {
+                str('Main'): str(fname + '.js'),
+                str('Type'): str('Jupyter Notebook Extension'),
+                str('Name'): str(cls.lazy_name(index)),
+                str('Compatibility'): str('4.x 5.x'),
+            }
+            with io.open(os.path.join(nbext_dir, fname + '.yaml'), 'w') as f:
+                yaml.dump(yaml_obj, f, default_flow_style=False)
+
+    def test_00_load_nbextensions_page(self):
+        self.driver.get(self.nbext_configurator_url)
+        self.wait_for_selector(
+            '.nbext-ext-row', 'an nbextension ui should load')
+
+    def test_01_links_built_when_scrolled_to(self):
+        links = self.driver.find_elements_by_css_selector(
+            '.nbext-selector li a')
+        nt.assert_less(len(links), self.num_extensions,
+                       'off-screen links should not be built yet')
+        self.wait_for_selector(
+            '.nbext-selector-more', 'the end of the links should be marked')
+        last_name = self.lazy_name(self.num_extensions - 1)
+        nt.assert_equal(
+            self.driver.find_elements_by_partial_link_text(last_name), [],
+            'the last link should not be built yet')
+        # scroll to the end of the links until the last one is built
+        self.wait_for_selector_link(last_name, timeout=10)
+        links = self.driver.find_elements_by_css_selector(
+            '.nbext-selector li a')
+        nt.assert_greater_equal(len(links), self.num_extensions)
+        with nt.assert_raises(NoSuchElementException):
+            self.driver.find_element_by_css_selector('.nbext-selector-more')
+
+    def test_02_select_lazy_link(self):
+        self.driver.get(self.nbext_configurator_url)
+        self.wait_for_selector(
+            '.nbext-ext-row', 'an nbextension ui should load')
+        name = self.lazy_name(self.num_extensions // 2)
+        link = self.wait_for_selector_link(name, timeout=10)
+        link.click()
+        self.wait_for_xpath(
+            '//h3[contains(text(), "{}")]'.format(name),
+            'the selected nbextension ui should load')
+        nt.assert_in(
+            'active',
+            link.find_element_by_xpath('..').get_attribute('class'))